@@ -1,12 +1,14 @@
-from crewai import LLM
 from dotenv import load_dotenv
 import os
 
+from .llm_wrapper import TokenAccountingLLM
+from .model_router import ModelRouter
+
 load_dotenv()
 
-# Centralized LLM configuration
-llm = LLM(
-    model="gemini-2.5-flash",
-    temperature=0.1,  # Lower temp for research accuracy
-    max_tokens=4000
-)
+# Centralized LLM configuration. Each task is routed to a model profile
+# (agents/model_router.py, $MODEL_PROFILES_PATH); identical prompts are
+# served from the on-disk response cache ($LLM_CACHE_MODE). Token use is
+# recorded per task and oversized upstream context is trimmed to the
+# task's budget.
+llm = TokenAccountingLLM(ModelRouter())
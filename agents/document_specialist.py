@@ -11,12 +11,13 @@ class DocumentSpecialistAgent:
         self.agent = Agent(
             role="Document Intelligence Specialist",
             goal=(
-                "Extract structured insights from academic PDFs including "
-                "methodology, statistics, findings, and limitations."
+                "Extract structured insights from the provided PDF excerpts "
+                "including methodology, statistics, findings, and limitations."
             ),
             backstory=(
                 "You analyze academic documents carefully and extract "
-                "evidence-based structured insights."
+                "evidence-based structured insights. You never add findings "
+                "that the excerpts do not support."
             ),
             llm=llm,
             verbose=True
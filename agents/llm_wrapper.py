@@ -0,0 +1,462 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from crewai.llms.base_llm import BaseLLM
+
+from memory.evidence_packer import TokenCounter
+from tools.disk_cache import DiskCache
+
+
+class DelegatingLLM(BaseLLM):
+    """
+    Base for wrappers around a crewAI LLM.
+
+    Everything not overridden (model, stop words, token usage, function
+    calling support, ...) is read from and written to the wrapped LLM,
+    so agents can use a wrapper wherever they used the LLM itself.
+    """
+
+    def __init__(self, inner):
+        # No BaseLLM.__init__: all provider state lives on `inner`
+        object.__setattr__(self, "inner", inner)
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def __setattr__(self, name, value):
+        # crewAI sets e.g. llm.stop on the agent's LLM
+        if name not in self.__dict__ and hasattr(self.inner, name):
+            setattr(self.inner, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    # -------------------------------------------------
+    # BaseLLM methods that must reach the wrapped LLM
+    # -------------------------------------------------
+
+    @property
+    def provider(self) -> str:
+        return self.inner.provider
+
+    @property
+    def is_litellm(self) -> bool:
+        return getattr(self.inner, "is_litellm", False)
+
+    def call(self, messages, *args, **kwargs):
+        return self.inner.call(messages, *args, **kwargs)
+
+    async def acall(self, messages, *args, **kwargs):
+        return await self.inner.acall(messages, *args, **kwargs)
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def supports_multimodal(self) -> bool:
+        return self.inner.supports_multimodal()
+
+    def get_token_usage_summary(self):
+        return self.inner.get_token_usage_summary()
+
+
+# -------------------------------------------------
+# RESPONSE CACHE
+# -------------------------------------------------
+
+class LLMCache(DiskCache):
+    """
+    LLM responses on disk. TTL and size limit default to
+    $LLM_CACHE_TTL (seconds) and $LLM_CACHE_MAX_BYTES.
+    """
+
+    def __init__(
+        self,
+        path: str = "vector_db/llm_cache.sqlite",
+        ttl: float | None = None,
+        max_bytes: int | None = None
+    ):
+        super().__init__(
+            path,
+            ttl=ttl if ttl is not None else float(os.getenv("LLM_CACHE_TTL", 30 * 86400)),
+            max_bytes=(
+                max_bytes if max_bytes is not None
+                else int(os.getenv("LLM_CACHE_MAX_BYTES", 500_000_000))
+            )
+        )
+
+
+class CachedLLM(DelegatingLLM):
+    """
+    Serves repeated LLM calls from an on-disk cache.
+
+    The key hashes the full message list, model, temperature, max_tokens,
+    stop words, tool names and response model. Modes ($LLM_CACHE_MODE):
+
+    - read_through: answer from the cache, call the LLM on a miss and store
+    - record_only:  always call the LLM and store (refreshes entries)
+    - replay_only:  answer from the cache only; a miss raises
+    - off:          pass every call through
+
+    Calls that let the LLM execute tools (available_functions) and
+    non-text results are never cached.
+    """
+
+    MODES = ("read_through", "record_only", "replay_only", "off")
+
+    def __init__(self, inner, cache: LLMCache | None = None, mode: str | None = None):
+        super().__init__(inner)
+
+        mode = (mode or os.getenv("LLM_CACHE_MODE") or "read_through").lower()
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+
+        object.__setattr__(self, "mode", mode)
+        object.__setattr__(self, "cache", cache if cache is not None else LLMCache())
+        object.__setattr__(self, "_local", threading.local())
+
+    @property
+    def last_call_cached(self) -> bool:
+        """
+        Whether this thread's last call was answered from the cache.
+        """
+        return getattr(self._local, "hit", False)
+
+    def cache_key(self, messages, tools=None, response_model=None) -> str:
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        payload = {
+            "messages": messages,
+            "model": getattr(self.inner, "model", None),
+            "temperature": getattr(self.inner, "temperature", None),
+            "max_tokens": getattr(self.inner, "max_tokens", None),
+            "stop": sorted(getattr(self.inner, "stop", None) or []),
+            "tools": sorted(
+                str(t.get("name") or t.get("function", {}).get("name"))
+                if isinstance(t, dict) else str(getattr(t, "name", t))
+                for t in (tools or [])
+            ),
+            "response_model": getattr(response_model, "__name__", None),
+        }
+
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _lookup(self, messages, kwargs):
+
+        self._local.hit = False
+
+        if self.mode == "off" or kwargs.get("available_functions"):
+            return None, None
+
+        key = self.cache_key(
+            messages, kwargs.get("tools"), kwargs.get("response_model")
+        )
+
+        if self.mode == "record_only":
+            return key, None
+
+        cached = self.cache.get(key)
+
+        if cached is None and self.mode == "replay_only":
+            raise RuntimeError(f"LLM cache miss in replay_only mode (key {key[:12]})")
+
+        self._local.hit = cached is not None
+
+        return key, cached
+
+    def _store(self, key, response):
+        if key is not None and isinstance(response, str) and response:
+            self.cache.put(key, response)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+
+        kwargs = {
+            "tools": tools, "callbacks": callbacks,
+            "available_functions": available_functions,
+            "from_task": from_task, "from_agent": from_agent,
+            "response_model": response_model,
+        }
+
+        key, cached = self._lookup(messages, kwargs)
+        if cached is not None:
+            return cached
+
+        response = self.inner.call(messages, **kwargs)
+        self._store(key, response)
+
+        return response
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None,
+                    from_task=None, from_agent=None, response_model=None):
+
+        kwargs = {
+            "tools": tools, "callbacks": callbacks,
+            "available_functions": available_functions,
+            "from_task": from_task, "from_agent": from_agent,
+            "response_model": response_model,
+        }
+
+        key, cached = self._lookup(messages, kwargs)
+        if cached is not None:
+            return cached
+
+        response = await self.inner.acall(messages, **kwargs)
+        self._store(key, response)
+
+        return response
+
+
+# -------------------------------------------------
+# TOKEN ACCOUNTING + CONTEXT BUDGETS
+# -------------------------------------------------
+
+# crewAI appends upstream task outputs after the marker, joined by the divider
+CONTEXT_MARKER = "This is the context you're working with:\n"
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+
+class ContextBudget:
+    """
+    Keeps a task's prompt within its token budget.
+
+    Only the upstream context is trimmed: the message text after
+    CONTEXT_MARKER (or else after the first CONTEXT_DIVIDER), split into
+    segments on CONTEXT_DIVIDER. The longest
+    segments are cut first, down to a common cap, each keeping its
+    beginning and its last few tokens. Budgets default to
+    $TOKEN_BUDGET_<TASK> (e.g. TOKEN_BUDGET_REPORT).
+    """
+
+    DEFAULTS = {
+        "planning": 4000,
+        "web": 6000,
+        "document": 8000,
+        "conflict": 8000,
+        "report": 12000,
+    }
+
+    def __init__(self, budgets: dict | None = None, counter: TokenCounter | None = None):
+        self.counter = counter or TokenCounter()
+        self.budgets = budgets or {
+            task: int(os.getenv(f"TOKEN_BUDGET_{task.upper()}", default))
+            for task, default in self.DEFAULTS.items()
+        }
+
+    def _cap(self, sizes: list, target: int) -> int:
+        """
+        Largest per-segment cap c with sum(min(size, c)) <= target.
+        """
+
+        cap, remaining = 0, target
+        ordered = sorted(sizes)
+
+        for i, size in enumerate(ordered):
+            share = remaining // (len(ordered) - i)
+            if size > share:
+                return share
+            cap, remaining = size, remaining - size
+
+        return cap
+
+    def fit(self, task: str | None, messages):
+        """
+        Returns (messages, tokens trimmed). Messages are copied, not changed.
+        """
+
+        budget = self.budgets.get(task)
+
+        if budget is None or isinstance(messages, str):
+            return messages, 0
+
+        sizes = [
+            self.counter.count(m.get("content")) if isinstance(m.get("content"), str) else 0
+            for m in messages
+        ]
+
+        overflow = sum(sizes) - budget
+
+        candidates = [
+            i for i, m in enumerate(messages)
+            if isinstance(m.get("content"), str)
+            and (CONTEXT_MARKER in m["content"] or CONTEXT_DIVIDER in m["content"])
+        ]
+
+        if overflow <= 0 or not candidates:
+            return messages, 0
+
+        index = max(candidates, key=lambda i: sizes[i])
+        content = messages[index]["content"]
+
+        if CONTEXT_MARKER in content:
+            head, marker, rest = content.partition(CONTEXT_MARKER)
+            head += marker
+            segments = rest.split(CONTEXT_DIVIDER)
+        else:
+            head, *segments = content.split(CONTEXT_DIVIDER)
+
+        lengths = [self.counter.count(s) for s in segments]
+        cap = self._cap(lengths, max(0, sum(lengths) - overflow))
+
+        segments = [
+            self.counter.truncate_middle(s, cap) if n > cap else s
+            for s, n in zip(segments, lengths)
+        ]
+
+        if CONTEXT_MARKER in head:
+            content = head + CONTEXT_DIVIDER.join(segments)
+        else:
+            content = CONTEXT_DIVIDER.join([head] + segments)
+
+        messages = list(messages)
+        messages[index] = {**messages[index], "content": content}
+
+        return messages, sizes[index] - self.counter.count(content)
+
+
+class TokenAccountingLLM(DelegatingLLM):
+    """
+    Records prompt / completion tokens, latency, cache hits and estimated
+    cost per (iteration, task) and applies each task's ContextBudget.
+
+    The task is the crewAI task's name; the flow sets `iteration`.
+    Tokens are counted with TokenCounter (see memory/evidence_packer.py),
+    so without tiktoken they are estimates. Prices per million tokens
+    default to $LLM_PRICE_PROMPT and $LLM_PRICE_COMPLETION (USD);
+    cached responses cost nothing.
+    """
+
+    def __init__(
+        self,
+        inner,
+        budget: ContextBudget | None = None,
+        prompt_price: float | None = None,
+        completion_price: float | None = None
+    ):
+        super().__init__(inner)
+
+        budget = budget or ContextBudget()
+
+        object.__setattr__(self, "budget", budget)
+        object.__setattr__(self, "counter", budget.counter)
+        object.__setattr__(self, "prompt_price", (
+            prompt_price if prompt_price is not None
+            else float(os.getenv("LLM_PRICE_PROMPT", 0.30))
+        ))
+        object.__setattr__(self, "completion_price", (
+            completion_price if completion_price is not None
+            else float(os.getenv("LLM_PRICE_COMPLETION", 2.50))
+        ))
+        object.__setattr__(self, "iteration", 1)
+        object.__setattr__(self, "records", {})
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+        self.iteration = 1
+
+    def _count(self, messages) -> int:
+
+        if isinstance(messages, str):
+            return self.counter.count(messages)
+
+        return sum(
+            self.counter.count(m.get("content"))
+            for m in messages if isinstance(m.get("content"), str)
+        )
+
+    def _record(self, task, prompt_tokens, response, latency, trimmed):
+
+        completion_tokens = self.counter.count(response) if isinstance(response, str) else 0
+        cached = getattr(self.inner, "last_call_cached", False)
+
+        cost = 0.0 if cached else (
+            prompt_tokens * self.prompt_price + completion_tokens * self.completion_price
+        ) / 1_000_000
+
+        with self._lock:
+            record = self.records.setdefault((self.iteration, task), {
+                "iteration": self.iteration,
+                "task": task,
+                "calls": 0,
+                "cached_calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "trimmed_tokens": 0,
+                "latency_s": 0.0,
+                "cost_usd": 0.0,
+            })
+
+            record["calls"] += 1
+            record["cached_calls"] += int(cached)
+            record["prompt_tokens"] += prompt_tokens
+            record["completion_tokens"] += completion_tokens
+            record["trimmed_tokens"] += trimmed
+            record["latency_s"] += latency
+            record["cost_usd"] += cost
+
+    def call(self, messages, *args, from_task=None, **kwargs):
+
+        task = getattr(from_task, "name", None) or "unknown"
+        messages, trimmed = self.budget.fit(task, messages)
+
+        prompt_tokens = self._count(messages)
+
+        start = time.perf_counter()
+        response = self.inner.call(messages, *args, from_task=from_task, **kwargs)
+        self._record(task, prompt_tokens, response, time.perf_counter() - start, trimmed)
+
+        return response
+
+    async def acall(self, messages, *args, from_task=None, **kwargs):
+
+        task = getattr(from_task, "name", None) or "unknown"
+        messages, trimmed = self.budget.fit(task, messages)
+
+        prompt_tokens = self._count(messages)
+
+        start = time.perf_counter()
+        response = await self.inner.acall(messages, *args, from_task=from_task, **kwargs)
+        self._record(task, prompt_tokens, response, time.perf_counter() - start, trimmed)
+
+        return response
+
+    def usage_summary(self) -> dict:
+        """
+        Per-(iteration, task) records and their totals, for summary.json.
+        """
+
+        with self._lock:
+            records = sorted(
+                (dict(r) for r in self.records.values()),
+                key=lambda r: (r["iteration"], r["task"])
+            )
+
+        totals = {
+            field: sum(r[field] for r in records)
+            for field in (
+                "calls", "cached_calls", "prompt_tokens", "completion_tokens",
+                "trimmed_tokens", "latency_s", "cost_usd",
+            )
+        }
+
+        for row in records + [totals]:
+            row["latency_s"] = round(row["latency_s"], 3)
+            row["cost_usd"] = round(row["cost_usd"], 6)
+
+        return {
+            "estimated": not self.counter.exact,
+            "totals": totals,
+            "by_task": records,
+        }
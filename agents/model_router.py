@@ -0,0 +1,350 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from .llm_wrapper import CachedLLM, DelegatingLLM, LLMCache
+
+
+def default_llm_factory(cache: LLMCache | None = None):
+    """
+    Builds a cached crewAI LLM per profile; all profiles share one cache
+    (the cache key includes the model).
+    """
+
+    from crewai import LLM
+
+    def build(profile: dict):
+        return CachedLLM(
+            LLM(
+                model=profile["model"],
+                temperature=profile.get("temperature", 0.1),
+                max_tokens=profile["max_tokens"],
+                timeout=profile.get("timeout")
+            ),
+            cache=cache
+        )
+
+    return build
+
+
+class ModelRouter(DelegatingLLM):
+    """
+    Sends each call to the model profile of its task (or agent role).
+
+    A profile has a model, max_tokens, timeout and optional fallback
+    profile. Each profile keeps a window of its recent calls; when the
+    mean latency exceeds max_latency_s or the error rate exceeds
+    max_error_rate (after min_samples calls), its traffic goes to the
+    fallback profile for cooldown_s, then the profile is tried again.
+    Calls answered from the LLM cache say nothing about the provider and
+    are left out of the window. A call that raises is retried down the
+    fallback chain.
+
+    Profiles and routes can be replaced from a JSON file
+    ($MODEL_PROFILES_PATH, keys "profiles" and "routes"). llm_factory
+    turns a profile dict into an LLM. Routing decisions are queued for
+    the reasoning trace (drain_decisions()).
+    """
+
+    DEFAULT_PROFILES = {
+        "fast": {
+            "model": "gemini-2.5-flash-lite",
+            "max_tokens": 1500,
+            "timeout": 30,
+            "max_latency_s": 10,
+            "max_error_rate": 0.3,
+        },
+        "standard": {
+            "model": "gemini-2.5-flash",
+            "max_tokens": 4000,
+            "timeout": 120,
+            "max_latency_s": 40,
+            "max_error_rate": 0.3,
+            "fallback": "fast",
+        },
+        "long": {
+            "model": "gemini-2.5-flash",
+            "max_tokens": 8000,
+            "timeout": 300,
+            "max_latency_s": 90,
+            "max_error_rate": 0.3,
+            "fallback": "standard",
+        },
+    }
+
+    # Task name or agent role -> profile
+    DEFAULT_ROUTES = {
+        "planning": "fast",
+        "conflict": "fast",
+        "web": "standard",
+        "document": "standard",
+        "report": "long",
+        "default": "standard",
+    }
+
+    def __init__(
+        self,
+        profiles: dict | None = None,
+        routes: dict | None = None,
+        llm_factory=None,
+        window: int = 20,
+        min_samples: int = 5,
+        cooldown_s: float = 60.0
+    ):
+        path = os.getenv("MODEL_PROFILES_PATH")
+        config = {}
+
+        if path:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+
+        profiles = profiles or config.get("profiles") or self.DEFAULT_PROFILES
+        routes = routes or config.get("routes") or self.DEFAULT_ROUTES
+
+        for name, profile in profiles.items():
+            if profile.get("fallback") and profile["fallback"] not in profiles:
+                raise ValueError(f"Profile '{name}' falls back to unknown '{profile['fallback']}'")
+
+        for key, name in routes.items():
+            if name not in profiles:
+                raise ValueError(f"Route '{key}' points to unknown profile '{name}'")
+
+        factory = llm_factory or default_llm_factory(LLMCache())
+        llms = {name: factory(profile) for name, profile in profiles.items()}
+
+        default = routes.get("default") or next(iter(profiles))
+
+        # Unrouted attributes (mode, cache, stop, ...) are read from the
+        # default profile and written to every profile (__setattr__)
+        super().__init__(llms[default])
+
+        for name, value in {
+            "profiles": profiles,
+            "routes": routes,
+            "llms": llms,
+            "default_profile": default,
+            "window": window,
+            "min_samples": min_samples,
+            "cooldown_s": cooldown_s,
+            "health": {
+                name: {"calls": deque(maxlen=window), "tripped_at": None}
+                for name in profiles
+            },
+            "decisions": [],
+            "_routed": {},
+            # Re-entrant: decisions are logged while routing holds it
+            "_lock": threading.RLock(),
+            "_local": threading.local(),
+        }.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        # crewAI sets e.g. llm.stop on the agent's LLM; every profile
+        # must get it, not just the default one
+        if name not in self.__dict__ and hasattr(self.inner, name):
+            for llm in self.llms.values():
+                setattr(llm, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    # -------------------------------------------------
+    # HEALTH
+    # -------------------------------------------------
+
+    def _log(self, message: str):
+        with self._lock:
+            self.decisions.append(f"Model router: {message}")
+
+    def drain_decisions(self) -> list:
+        """
+        Decisions since the last drain, oldest first.
+        """
+
+        with self._lock:
+            decisions = list(self.decisions)
+            self.decisions.clear()
+
+        return decisions
+
+    def _healthy(self, name: str) -> bool:
+
+        health = self.health[name]
+
+        if health["tripped_at"] is None:
+            return True
+
+        if time.monotonic() - health["tripped_at"] < self.cooldown_s:
+            return False
+
+        # Cooldown over: probe the profile again with a fresh window
+        health["tripped_at"] = None
+        health["calls"].clear()
+        self._log(f"'{name}' cooldown over, routing to it again.")
+
+        return True
+
+    def _observe(self, name: str, latency: float, failed: bool):
+
+        profile = self.profiles[name]
+
+        with self._lock:
+
+            health = self.health[name]
+            health["calls"].append((latency, failed))
+
+            calls = health["calls"]
+            if health["tripped_at"] is not None or len(calls) < self.min_samples:
+                return
+
+            mean_latency = sum(c[0] for c in calls) / len(calls)
+            error_rate = sum(c[1] for c in calls) / len(calls)
+
+            reason = None
+            if error_rate > profile.get("max_error_rate", 1.0):
+                reason = f"error rate {error_rate:.0%}"
+            elif mean_latency > profile.get("max_latency_s", float("inf")):
+                reason = f"mean latency {mean_latency:.1f}s"
+
+            if reason and profile.get("fallback"):
+                health["tripped_at"] = time.monotonic()
+                self._log(
+                    f"'{name}' ({profile['model']}) {reason} over the last "
+                    f"{len(calls)} calls; falling back to '{profile['fallback']}' "
+                    f"for {self.cooldown_s:.0f}s."
+                )
+
+    def routing_stats(self) -> dict:
+        """
+        Per profile: model, recent calls, mean latency, error rate, tripped.
+        """
+
+        with self._lock:
+            return {
+                name: {
+                    "model": self.profiles[name]["model"],
+                    "recent_calls": len(h["calls"]),
+                    "mean_latency_s": round(
+                        sum(c[0] for c in h["calls"]) / len(h["calls"]), 3
+                    ) if h["calls"] else None,
+                    "error_rate": round(
+                        sum(c[1] for c in h["calls"]) / len(h["calls"]), 3
+                    ) if h["calls"] else None,
+                    "tripped": h["tripped_at"] is not None,
+                }
+                for name, h in self.health.items()
+            }
+
+    # -------------------------------------------------
+    # ROUTING
+    # -------------------------------------------------
+
+    def route(self, from_task=None, from_agent=None) -> str:
+        """
+        Profile for a call: by task name, then agent role, then default;
+        unhealthy profiles hand over to their fallback chain.
+        """
+
+        key = getattr(from_task, "name", None)
+        if key not in self.routes:
+            key = getattr(from_agent, "role", None)
+        if key not in self.routes:
+            key = "default"
+
+        name = self.routes.get(key, self.default_profile)
+
+        with self._lock:
+
+            chosen, seen = name, {name}
+            while not self._healthy(chosen):
+                fallback = self.profiles[chosen].get("fallback")
+                if not fallback or fallback in seen:
+                    break
+                chosen = fallback
+                seen.add(chosen)
+
+            # Log a route once, and again whenever it changes
+            if self._routed.get(key) != chosen:
+                self._routed[key] = chosen
+                self._log(
+                    f"'{key}' → '{chosen}' ({self.profiles[chosen]['model']}, "
+                    f"max_tokens {self.profiles[chosen]['max_tokens']})"
+                    + (f" instead of '{name}'." if chosen != name else ".")
+                )
+
+        return chosen
+
+    @property
+    def last_call_cached(self) -> bool:
+        llm = getattr(self._local, "llm", None)
+        return getattr(llm, "last_call_cached", False)
+
+    def _fallback_for(self, name: str, error: Exception, tried: set):
+
+        fallback = self.profiles[name].get("fallback")
+
+        if fallback in tried:
+            fallback = None
+
+        if fallback:
+            tried.add(fallback)
+            with self._lock:
+                self._log(
+                    f"'{name}' call failed ({type(error).__name__}); "
+                    f"retrying on '{fallback}'."
+                )
+
+        return fallback
+
+    def call(self, messages, *args, from_task=None, from_agent=None, **kwargs):
+
+        name = self.route(from_task, from_agent)
+        tried = {name}
+
+        while True:
+            self._local.llm = self.llms[name]
+            start = time.perf_counter()
+
+            try:
+                response = self.llms[name].call(
+                    messages, *args, from_task=from_task, from_agent=from_agent, **kwargs
+                )
+            except Exception as e:
+                self._observe(name, time.perf_counter() - start, True)
+                fallback = self._fallback_for(name, e, tried)
+                if not fallback:
+                    raise
+                name = fallback
+                continue
+
+            if not self.last_call_cached:
+                self._observe(name, time.perf_counter() - start, False)
+
+            return response
+
+    async def acall(self, messages, *args, from_task=None, from_agent=None, **kwargs):
+
+        name = self.route(from_task, from_agent)
+        tried = {name}
+
+        while True:
+            self._local.llm = self.llms[name]
+            start = time.perf_counter()
+
+            try:
+                response = await self.llms[name].acall(
+                    messages, *args, from_task=from_task, from_agent=from_agent, **kwargs
+                )
+            except Exception as e:
+                self._observe(name, time.perf_counter() - start, True)
+                fallback = self._fallback_for(name, e, tried)
+                if not fallback:
+                    raise
+                name = fallback
+                continue
+
+            if not self.last_call_cached:
+                self._observe(name, time.perf_counter() - start, False)
+
+            return response
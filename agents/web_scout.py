@@ -2,6 +2,8 @@ from crewai import Agent
 from .base_llm import llm
 
 from tools.web_search_tool import WebSearchToolWrapper
+from tools.page_fetcher import PageFetcher
+from tools.disk_cache import DiskCache
 from tools.credibility_tool import CredibilityScorer
 from dotenv import load_dotenv
 
@@ -10,40 +12,67 @@ load_dotenv()
 
 class WebScoutAgent:
 
-    def __init__(self):
+    # Rephrasings searched alongside the query itself
+    QUERY_VARIANTS = ("{query}", "{query} research study", "{query} statistics")
+
+    def __init__(self, max_queries: int = 12, max_pages: int = 8):
         self.search_tool = WebSearchToolWrapper()
+        self.max_queries = max_queries
+
+        # Full text of the top results, cached by URL / ETag
+        self.page_fetcher = PageFetcher(
+            cache=DiskCache(
+                "vector_db/page_cache.sqlite",
+                ttl=7 * 86400,
+                max_bytes=200_000_000
+            )
+        )
+        self.max_pages = max_pages
         self.credibility_scorer = CredibilityScorer()
 
+        # No search tool: the flow already searched (perform_search) and
+        # hands the agent the packed results in its task description
         self.agent = Agent(
             role="Live Web Intelligence Scout",
-            goal="Perform live web research and extract structured factual claims. ALWAYS use web search tool to gather real internet data.",
+            goal="Extract structured factual claims from the live web search results provided in the task.",
             backstory=(
                 "You specialize in identifying authoritative sources "
                 "and extracting verifiable claims from structured web results. "
-                "ALWAYS use the search tool for real web data."
+                "You only report claims backed by the provided results."
             ),
-            tools=[self.search_tool.tool],   # MOST IMPORTANT LINE
             llm=llm,
             verbose=True
         )
 
-    def perform_search(self, query: str):
+    def search_queries(self, query: str, sub_questions=None, variants: bool = True) -> list:
+        """
+        Variants of the main query (unless variants=False), then the
+        planner's sub-questions, capped at max_queries.
+        """
 
-        raw_results = self.search_tool.search(query)
+        queries = [v.format(query=query) for v in self.QUERY_VARIANTS] if variants else []
+        queries += [q for q in (sub_questions or []) if q]
 
-        structured_claims = []
+        return list(dict.fromkeys(queries))[:self.max_queries]
 
-        for item in raw_results:
+    def perform_search(self, query: str, sub_questions=None, variants: bool = True):
 
-            if "error" in item:
-                continue
+        # All queries run concurrently; results come back merged by URL
+        raw_results = self.search_tool.search_many(
+            self.search_queries(query, sub_questions, variants=variants)
+        )
 
-            snippet = item.get("snippet") or item.get("title")
+        results = [item for item in raw_results if "error" not in item]
 
-            credibility = self.credibility_scorer.score(
-                url=item.get("url", ""),
-                publication_date=None
-            )
+        credibilities = self.credibility_scorer.score_many(
+            [item.get("url") or "" for item in results]
+        )
+
+        structured_claims = []
+
+        for item, credibility in zip(results, credibilities):
+
+            snippet = item.get("snippet") or item.get("title")
 
             structured_claims.append({
                 "claim": snippet,
@@ -54,3 +83,9 @@ class WebScoutAgent:
             })
 
         return structured_claims
+
+    def fetch_pages(self, urls: list) -> list:
+        """
+        Main text of up to max_pages result pages, fetched concurrently.
+        """
+        return self.page_fetcher.fetch_many(urls[:self.max_pages])
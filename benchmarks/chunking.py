@@ -0,0 +1,125 @@
+"""
+Microbenchmark: token-aware offset chunker vs the previous
+character-based chunker, on the bundled PDFs.
+
+Reports time per page, chunk counts and how many chunks exceed the
+embedding model's max sequence length (silently truncated at encode).
+
+Usage:
+    python -m benchmarks.chunking --repeats 5
+"""
+
+import argparse
+import glob
+import re
+import time
+
+import fitz
+
+from tools.chunking_tool import TextChunker
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list:
+    """
+    The character-based chunker this module replaced, kept for comparison.
+    """
+
+    if not text:
+        return []
+
+    text = re.sub(r"\s+", " ", text).strip()
+
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+
+    chunks = []
+    current_chunk = ""
+
+    for sentence in sentences:
+
+        if len(current_chunk) + len(sentence) <= chunk_size:
+            current_chunk += " " + sentence
+        else:
+            chunks.append(current_chunk.strip())
+
+            overlap_text = current_chunk[-overlap:]
+            current_chunk = overlap_text + " " + sentence
+
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+
+    return [c for c in chunks if len(c) > 50]
+
+
+def load_pages() -> list:
+
+    pages = []
+
+    for path in sorted(glob.glob("input_pdfs/*.pdf")):
+        try:
+            with fitz.open(path) as doc:
+                pages.extend(page.get_text() for page in doc)
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+
+    return pages
+
+
+def timed(fn, pages: list, repeats: int):
+
+    best = float("inf")
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = [c for page in pages for c in fn(page)]
+        best = min(best, time.perf_counter() - start)
+
+    return chunks, best
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-seq-length", type=int, default=256)
+    args = parser.parse_args()
+
+    pages = load_pages()
+
+    if not pages:
+        print("No pages found in input_pdfs/.")
+        return
+
+    chunker = TextChunker()
+    params = chunker.params()
+
+    # Token counts use the same tokenizer the chunker sizes with
+    def token_count(text):
+        return len(chunker._token_offsets(text)[0])
+
+    results = {
+        "legacy (chars)": timed(legacy_chunk_text, pages, args.repeats),
+        "offsets (tokens)": timed(chunker.chunk_text, pages, args.repeats),
+        "offsets, spans only": timed(chunker.chunk_spans, pages, args.repeats),
+    }
+
+    print(f"\n{len(pages)} pages, tokenizer {params['tokenizer']}, "
+          f"chunk_size {params['chunk_size']} tokens\n")
+    print(f"{'chunker':<20} {'ms/page':>8} {'chunks':>7} {'max tok':>8} {'truncated':>10}")
+
+    for name, (chunks, elapsed) in results.items():
+
+        if name == "offsets, spans only":
+            print(f"{name:<20} {elapsed / len(pages) * 1000:>8.3f} {len(chunks):>7}")
+            continue
+
+        counts = [token_count(c) for c in chunks]
+        truncated = sum(c > args.max_seq_length - 2 for c in counts)
+
+        print(
+            f"{name:<20} {elapsed / len(pages) * 1000:>8.3f} {len(chunks):>7} "
+            f"{max(counts, default=0):>8} {truncated:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
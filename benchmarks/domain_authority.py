@@ -0,0 +1,104 @@
+"""
+Domain-authority scoring: the previous per-claim urlparse + substring
+scans against the shared suffix-trie engine (score_many).
+
+URLs are synthetic: hosts drawn from the bundled data file plus
+unlisted and look-alike hosts ("weblogger.io"), with distinct paths.
+
+Usage:
+    python -m benchmarks.domain_authority --urls 100000
+"""
+
+import argparse
+import json
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from tools.domain_authority import get_domain_authority
+
+
+LEGACY_HIGH = [
+    ".gov", ".edu", "nature.com", "sciencedirect.com", "ieee.org",
+    "springer.com", "who.int", "worldbank.org",
+]
+LEGACY_LOW = ["blog", "medium.com", "wordpress", "opinion"]
+
+
+def legacy_score(url: str) -> float:
+    """
+    The substring-scan authority part of the old CredibilityScorer.
+    """
+
+    domain = urlparse(url).netloc.lower()
+    score = 0.0
+
+    for trusted in LEGACY_HIGH:
+        if trusted in domain:
+            score += 0.3
+
+    for weak in LEGACY_LOW:
+        if weak in domain:
+            score -= 0.2
+
+    return score
+
+
+def make_urls(count: int, seed: int = 42) -> list:
+
+    authority = get_domain_authority()
+
+    with open(authority.path, encoding="utf-8") as f:
+        listed = list(json.load(f)["domains"])
+
+    hosts = (
+        [f"www.{d}" for d in listed]
+        + [f"sub{i}.example{i % 50}.com" for i in range(500)]
+        + ["weblogger.io", "myblog.net", "blog.example.org", "opinionpoll.com"]
+    )
+
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(hosts), count)
+
+    return [f"https://{hosts[p]}/article/{i}" for i, p in enumerate(picks)]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--urls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls)
+    authority = get_domain_authority()
+
+    start = time.perf_counter()
+    [legacy_score(u) for u in urls]
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    authority.score_many(urls)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    authority.score_many(urls)
+    warm = time.perf_counter() - start
+
+    print(f"\n{len(urls)} URLs, data file v{authority.version}\n")
+    print(f"{'scorer':<22} {'ms total':>9} {'µs/url':>8}")
+
+    for name, elapsed in [
+        ("legacy substring scan", legacy),
+        ("trie score_many (cold)", cold),
+        ("trie score_many (warm)", warm),
+    ]:
+        print(f"{name:<22} {elapsed * 1000:>9.1f} {elapsed / len(urls) * 1e6:>8.3f}")
+
+    print("\nLook-alike hosts:")
+    for url in ["https://weblogger.io/a", "https://opinionpoll.com/a", "https://blog.example.org/a"]:
+        print(f"  {url:<28} legacy {legacy_score(url):+.2f}  trie {authority.score(url):+.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Parity check and throughput benchmark for the embedding backends.
+
+Usage:
+    python -m benchmarks.embedding_backends --limit 512 --threads 4
+"""
+
+import argparse
+import glob
+import time
+
+import numpy as np
+
+from tools.pdf_tool import PDFProcessor
+from tools.embedding_service import EmbeddingService
+from tools.onnx_embedding import OnnxEmbeddingService
+
+
+def load_corpus(limit: int) -> list:
+    """
+    Chunk texts from the bundled PDFs (input_pdfs/).
+    """
+
+    texts = []
+
+    for pdf_data in PDFProcessor().iter_extract(sorted(glob.glob("input_pdfs/*.pdf"))):
+        texts.extend(chunk["text"] for chunk in pdf_data.get("chunks", []))
+
+        if len(texts) >= limit:
+            break
+
+    return texts[:limit]
+
+
+def parity_check(reference, candidate, texts: list) -> dict:
+    """
+    Cosine agreement of candidate embeddings against the reference backend.
+    """
+
+    a = reference.encode(texts, normalize=True)
+    b = candidate.encode(texts, normalize=True)
+
+    cosine = np.sum(a * b, axis=1)
+
+    # Does the candidate keep the same nearest neighbour for each text?
+    nn_a = np.argsort(-(a @ a.T), axis=1)[:, 1]
+    nn_b = np.argsort(-(b @ b.T), axis=1)[:, 1]
+
+    return {
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        "p01_cosine": float(np.percentile(cosine, 1)),
+        "nn_agreement": float(np.mean(nn_a == nn_b)),
+    }
+
+
+def benchmark(service, texts: list, batch_size: int = 64, repeats: int = 3) -> float:
+    """
+    Best-of-N throughput in docs/sec (after one warm-up pass).
+    """
+
+    service.encode(texts[:batch_size], batch_size=batch_size)
+
+    best = float("inf")
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        service.encode(texts, batch_size=batch_size)
+        best = min(best, time.perf_counter() - start)
+
+    return len(texts) / best
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.limit)
+
+    if not texts:
+        print("No chunks found in input_pdfs/.")
+        return
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    backends = {
+        "torch-fp32": EmbeddingService(),
+        "onnx-fp32": OnnxEmbeddingService(threads=args.threads, quantize=False),
+        "onnx-int8": OnnxEmbeddingService(threads=args.threads, quantize=True),
+    }
+
+    reference = backends["torch-fp32"]
+
+    print(f"\n{len(texts)} chunks, batch size {args.batch_size}\n")
+    print(f"{'backend':<12} {'docs/sec':>10} {'mean cos':>10} {'min cos':>10} {'nn agree':>10}")
+
+    for name, service in backends.items():
+
+        rate = benchmark(service, texts, args.batch_size, args.repeats)
+
+        parity = (
+            parity_check(reference, service, texts)
+            if service is not reference
+            else {"mean_cosine": 1.0, "min_cosine": 1.0, "nn_agreement": 1.0}
+        )
+
+        print(
+            f"{name:<12} {rate:>10.1f} {parity['mean_cosine']:>10.4f} "
+            f"{parity['min_cosine']:>10.4f} {parity['nn_agreement']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
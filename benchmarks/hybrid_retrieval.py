@@ -0,0 +1,140 @@
+"""
+Latency and recall of candidate-narrowed retrieval (BM25 candidates,
+top-section candidates, or both, scored densely and fused with RRF)
+against dense-only search.
+
+Queries are word windows sampled from chunks of the bundled PDFs; a
+query counts as recalled when its source chunk is in the top k.
+
+Usage:
+    python -m benchmarks.hybrid_retrieval --queries 200 --top-k 5 --index numpy
+"""
+
+import argparse
+import glob
+import tempfile
+import time
+
+import numpy as np
+
+from tools.ingestion_pipeline import IngestionPipeline
+from tools.pdf_tool import PDFProcessor
+from tools.vector_store import VectorStore
+
+
+def sample_queries(texts: list, count: int, words: int = 10, seed: int = 42):
+    """
+    (query, index of the source chunk) pairs.
+    """
+
+    rng = np.random.default_rng(seed)
+    pairs = []
+
+    for idx in rng.permutation(len(texts)):
+
+        tokens = texts[idx].split()
+
+        if len(tokens) < words * 2:
+            continue
+
+        start = int(rng.integers(0, len(tokens) - words))
+        pairs.append((" ".join(tokens[start:start + words]), int(idx)))
+
+        if len(pairs) == count:
+            break
+
+    return pairs
+
+
+def recall_at_k(results: dict, expected: list) -> float:
+    return float(np.mean([
+        doc_id in ids for ids, doc_id in zip(results["ids"], expected)
+    ]))
+
+
+def timed(fn, repeats: int):
+
+    best = float("inf")
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    return result, best
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--top-sections", type=int, default=5)
+    parser.add_argument("--index", default="numpy")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    pdf_files = sorted(glob.glob("input_pdfs/*.pdf"))
+
+    if not pdf_files:
+        print("No PDFs found in input_pdfs/.")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        store = VectorStore(index_backend=args.index, path=tmp)
+
+        # Same path as the flow, so chunks carry section metadata
+        file_ids = {}
+        IngestionPipeline(PDFProcessor(), store).run(
+            pdf_files, on_file_done=lambda path, ids, error: file_ids.update({path: ids})
+        )
+        store.flush()
+
+        ids = [
+            doc_id for path in pdf_files for doc_id in file_ids.get(path, [])
+            if "#section_" not in doc_id
+        ]
+        texts = store.index.get(ids)["documents"]
+
+        pairs = sample_queries(texts, args.queries)
+        query_texts = [q for q, _ in pairs]
+        expected = [ids[i] for _, i in pairs]
+
+        embeddings = store.embed_texts(query_texts)
+
+        modes = {
+            "dense": lambda: store.index.search(embeddings, args.top_k),
+            "lexical": lambda: store.hybrid_search(
+                query_texts, embeddings, args.top_k,
+                candidates=args.candidates, top_sections=0
+            ),
+            "sections": lambda: store.hybrid_search(
+                query_texts, embeddings, args.top_k,
+                lexical=False, top_sections=args.top_sections
+            ),
+            "hybrid": lambda: store.hybrid_search(
+                query_texts, embeddings, args.top_k,
+                candidates=args.candidates, top_sections=args.top_sections
+            ),
+        }
+
+        print(
+            f"\n{len(texts)} chunks in {store.section_index.count()} sections, "
+            f"{len(pairs)} queries, top_k {args.top_k}\n"
+        )
+        print(f"{'mode':<10} {'recall':>8} {'ms/query':>10}")
+
+        for name, search in modes.items():
+
+            results, elapsed = timed(search, args.repeats)
+
+            print(
+                f"{name:<10} {recall_at_k(results, expected):>8.3f} "
+                f"{elapsed / len(pairs) * 1000:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Per-task model routing against local stand-in models (no API calls).
+
+Each stand-in sleeps for a fixed latency plus a per-token cost scaled
+by its profile's max_tokens and can fail at a given rate. A simulated
+research run calls the five crew tasks several times; half-way through,
+the "standard" model slows down (--degrade-factor) so the router's
+latency fallback kicks in. Reports wall time with one model for every
+task versus per-task routing, calls per profile, and the decisions the
+router logged for the reasoning trace.
+
+Usage:
+    python -m benchmarks.model_routing --rounds 8 --degrade-factor 6
+"""
+
+import argparse
+import random
+import time
+
+from agents.model_router import ModelRouter
+
+
+class StandInLLM:
+    """
+    A model that answers after `latency_ms` + max_tokens * `per_token_ms`.
+    """
+
+    def __init__(self, profile: dict, latency_ms: float, per_token_ms: float,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.model = profile["model"]
+        self.max_tokens = profile["max_tokens"]
+        self.latency_ms = latency_ms
+        self.per_token_ms = per_token_ms
+        self.error_rate = error_rate
+        self.slowdown = 1.0
+        self.rng = random.Random(seed)
+
+    def call(self, messages, *args, **kwargs):
+
+        time.sleep(self.slowdown * (self.latency_ms + self.max_tokens * self.per_token_ms) / 1000)
+
+        if self.rng.random() < self.error_rate:
+            raise TimeoutError(f"{self.model} timed out")
+
+        return f"answer from {self.model}"
+
+
+class Named:
+    def __init__(self, name):
+        self.name = name
+
+
+TASKS = ["planning", "web", "document", "conflict", "report"]
+
+# Stand-in speed per model: (fixed ms, ms per max_token)
+SPEEDS = {
+    "gemini-2.5-flash-lite": (20, 0.005),
+    "gemini-2.5-flash": (40, 0.010),
+}
+
+
+def make_router(routes: dict | None, error_rate: float, fallback: bool = True):
+
+    seeds = iter(range(100))
+
+    def factory(profile):
+        latency, per_token = SPEEDS[profile["model"]]
+        return StandInLLM(profile, latency, per_token, error_rate, seed=next(seeds))
+
+    # Thresholds scaled to the stand-in latencies
+    profiles = {
+        name: {
+            **{k: v for k, v in profile.items() if fallback or k != "fallback"},
+            "max_latency_s": 0.2,
+        }
+        for name, profile in ModelRouter.DEFAULT_PROFILES.items()
+    }
+
+    router = ModelRouter(
+        profiles=profiles, routes=routes, llm_factory=factory,
+        window=6, min_samples=3, cooldown_s=30
+    )
+
+    return router
+
+
+def run(router, rounds: int, degrade_factor: float):
+    """
+    Returns (wall seconds, failed calls).
+    """
+
+    failed = 0
+    start = time.perf_counter()
+
+    for i in range(rounds):
+
+        if i == rounds // 2:
+            router.llms["standard"].slowdown = degrade_factor
+
+        for task in TASKS:
+            try:
+                router.call([{"role": "user", "content": "..."}], from_task=Named(task))
+            except TimeoutError:
+                failed += 1
+
+    return time.perf_counter() - start, failed
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=8)
+    parser.add_argument("--degrade-factor", type=float, default=6.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    single = make_router({"default": "standard"}, args.error_rate, fallback=False)
+    single_s, single_failed = run(single, args.rounds, args.degrade_factor)
+
+    routed = make_router(None, args.error_rate)
+    routed_s, routed_failed = run(routed, args.rounds, args.degrade_factor)
+
+    print(f"\n{args.rounds} rounds x {len(TASKS)} tasks; 'standard' {args.degrade_factor:g}x "
+          f"slower from round {args.rounds // 2 + 1}\n")
+    print(f"{'setup':<22} {'wall s':>8} {'failed':>7}")
+    print(f"{'one model, all tasks':<22} {single_s:>8.3f} {single_failed:>7}")
+    print(f"{'per-task routing':<22} {routed_s:>8.3f} {routed_failed:>7}")
+
+    print(f"\n{'profile':<10} {'model':<24} {'recent':>6} {'mean s':>8} {'tripped':>8}")
+    for name, stats in routed.routing_stats().items():
+        mean = stats["mean_latency_s"]
+        print(f"{name:<10} {stats['model']:<24} {stats['recent_calls']:>6} "
+              f"{mean if mean is not None else '-':>8} {str(stats['tripped']):>8}")
+
+    print("\nDecisions (reasoning trace):")
+    for decision in routed.drain_decisions():
+        print(f"  {decision}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Memory per vector and recall@k for the compressed vector indexes.
+
+By default builds int8 and IVF-PQ indexes over synthetic clustered
+vectors in a temporary directory; --index evaluates an existing
+{collection}.npindex directory (e.g. vector_db/pdf_collection.npindex).
+
+Usage:
+    python -m benchmarks.vector_compression --n 100000 --dim 384 --top-k 10
+    python -m benchmarks.vector_compression --index vector_db/pdf_collection.npindex
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from tools.numpy_index import NumpyIndex
+from tools.quantized_index import QuantizedIndex
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 256, seed: int = 42) -> np.ndarray:
+    """
+    Gaussian blobs around random centres, roughly like sentence embeddings.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+
+    return centres[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def build_index(path: str, vectors: np.ndarray, batch: int = 10000):
+
+    index = NumpyIndex(path)
+
+    for start in range(0, len(vectors), batch):
+        stop = min(start + batch, len(vectors))
+        index.upsert(
+            [f"v{i}" for i in range(start, stop)],
+            [""] * (stop - start),
+            vectors[start:stop],
+            [{}] * (stop - start)
+        )
+
+
+def sample_queries(path: str, count: int, seed: int = 7) -> np.ndarray:
+    """
+    Stored vectors plus noise, so queries have real neighbours.
+    """
+
+    index = NumpyIndex(path)
+    index._refresh()
+
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(np.nonzero(index._live)[0], count, replace=False))
+    vectors = np.asarray(index._vectors[rows], dtype=np.float32)
+
+    return vectors + 0.05 * rng.standard_normal(vectors.shape).astype(np.float32)
+
+
+def evaluate(path: str, queries: np.ndarray, top_k: int, **options):
+
+    for mode in ("int8", "ivfpq"):
+
+        index = QuantizedIndex(path, mode=mode, train_min=1, **options)
+
+        start = time.perf_counter()
+        index.flush()
+        train_time = time.perf_counter() - start
+
+        report = index.evaluate(queries, top_k)
+
+        if "error" in report:
+            print(f"{mode:<6} {report['error']}")
+            continue
+
+        start = time.perf_counter()
+        index.search(queries, top_k)
+        latency = (time.perf_counter() - start) / len(queries) * 1000
+
+        k = min(top_k, index.count())
+
+        print(
+            f"{mode:<6} {report['bytes_per_vector']:>10.1f} "
+            f"{report['compression_vs_float32']:>8.1f}x "
+            f"{report[f'recall@{k}']:>10.3f} {report[f'recall@{k}_no_rerank']:>10.3f} "
+            f"{latency:>10.2f} {train_time:>9.1f}"
+        )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index", default=None)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--rerank", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        path = args.index
+
+        if path is None:
+            path = tmp
+            print(f"Building synthetic index: {args.n} x {args.dim}")
+            build_index(path, synthetic_vectors(args.n, args.dim))
+
+        queries = sample_queries(path, args.queries)
+
+        index = NumpyIndex(path)
+        print(
+            f"\n{index.count()} vectors, dim {queries.shape[1]}, "
+            f"float32 {queries.shape[1] * 4} B/vector, "
+            f"float16 {queries.shape[1] * 2} B/vector\n"
+        )
+
+        print(
+            f"{'mode':<6} {'B/vector':>10} {'ratio':>9} {'recall':>10} "
+            f"{'no rerank':>10} {'ms/query':>10} {'train s':>9}"
+        )
+
+        evaluate(
+            path, queries, args.top_k,
+            m=args.m, nprobe=args.nprobe, rerank=args.rerank
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Wall time of a multi-query web search: one query at a time vs the
+concurrent AsyncSearchClient fan-out, then a repeat of the same
+queries answered from the on-disk SearchCache.
+
+Runs against a local Serper stand-in (no API key or network needed)
+that answers every /search after a random delay, so the concurrent
+wall time should approach the slowest single request.
+
+Usage:
+    python -m benchmarks.web_search --queries 8 --delay-ms 200
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.web_search_tool import AsyncSearchClient, SearchCache
+
+
+def make_handler(delay_ms: float, jitter_ms: float):
+
+    class StandInHandler(BaseHTTPRequestHandler):
+
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            query = body.get("q", "")
+
+            time.sleep((delay_ms + random.uniform(0, jitter_ms)) / 1000)
+
+            # Overlapping URLs across queries exercise the merge
+            payload = json.dumps({"organic": [
+                {
+                    "title": f"{query} result {i}",
+                    "link": f"https://example.org/{(hash(query) + i) % 20}",
+                    "snippet": f"Snippet {i} for {query}",
+                    "position": i + 1,
+                }
+                for i in range(body.get("num", 10))
+            ]}).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StandInHandler
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), make_handler(args.delay_ms, args.jitter_ms)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    queries = [f"query {i}" for i in range(args.queries)]
+
+    client = AsyncSearchClient(
+        api_key="stand-in", base_url=base_url, rate=args.rate, burst=args.queries
+    )
+
+    try:
+        # Warm the pool so both runs reuse connections
+        client.search_many(queries[:1])
+
+        start = time.perf_counter()
+        for query in queries:
+            client.search_many([query])
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        merged = client.search_many(queries)
+        concurrent = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmp:
+
+            cache = SearchCache(os.path.join(tmp, "search_cache.sqlite"))
+            client.cache = cache
+
+            client.search_many(queries)
+
+            start = time.perf_counter()
+            client.search_many(queries)
+            cached = time.perf_counter() - start
+
+            stats = cache.stats()
+            cache._conn.close()
+
+    finally:
+        client.close()
+        server.shutdown()
+
+    errors = sum("error" in item for item in merged)
+    slowest = (args.delay_ms + args.jitter_ms) / 1000
+
+    print(f"\n{len(queries)} queries, {args.delay_ms:.0f}±{args.jitter_ms:.0f} ms per request\n")
+    print(f"{'mode':<12} {'wall s':>8}")
+    print(f"{'sequential':<12} {sequential:>8.3f}")
+    print(f"{'concurrent':<12} {concurrent:>8.3f}   (slowest request ≤ {slowest:.3f})")
+    print(f"{'cached':<12} {cached:>8.3f}   ({stats['hits']} hits, {stats['misses']} misses)")
+    print(f"\n{len(merged) - errors} unique URLs after merge, {errors} errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,45 @@ from agents.web_scout import WebScoutAgent
 from agents.document_specialist import DocumentSpecialistAgent
 from agents.conflict_detector import conflict_detector
 from agents.report_generator import report_generator
+from agents.llm_wrapper import CONTEXT_DIVIDER
+
+from crews.task_scheduler import TaskScheduler
 
 
 class ResearchCrew:
     """
     Builds a fresh, fully structured multi-agent research crew
     for each research iteration.
+
+    With follow_ups (queries built from detected conflicts) the crew only
+    re-plans, searches, analyzes and re-checks those follow-ups. The
+    report is a separate one-task crew, built once after the last
+    iteration from the collected stage outputs.
+
+    Planning can run ahead as its own one-task crew (build_planning), so
+    the flow can search and retrieve for the planned sub-questions; the
+    stage crew built afterwards reads the finished plan as context.
+
+    evidence maps a task key ("web", "document") to the packed evidence
+    text (memory/evidence_packer.py) that the task works from.
     """
 
-    def __init__(self, query: str):
+    def __init__(
+        self,
+        query: str,
+        max_parallel: int | None = None,
+        follow_ups: list | None = None,
+        prior_conflicts: list | None = None,
+        evidence: dict | None = None,
+        plan_task: Task | None = None
+    ):
         self.query = query
+        self.max_parallel = max_parallel
+        self.follow_ups = follow_ups or []
+        self.prior_conflicts = prior_conflicts or []
+        self.evidence = evidence or {}
+        self.plan_task = plan_task
+        self.scheduler = None
 
         # Instantiate wrappers per crew instance (safer)
         self.web_agent_wrapper = WebScoutAgent()
@@ -27,9 +56,86 @@ class ResearchCrew:
     # TASK FACTORY
     # -------------------------------------------------
 
+    def _focus(self) -> str:
+
+        if not self.follow_ups:
+            return ""
+
+        lines = "\n".join(f"- {q}" for q in self.follow_ups)
+
+        return f"""
+This is a follow-up iteration. Earlier findings are kept; cover ONLY
+these unresolved conflict questions:
+
+{lines}
+"""
+
+    def _evidence(self, key: str) -> str:
+
+        packed = self.evidence.get(key)
+
+        if not packed:
+            return """
+No evidence was gathered for this task. Return an empty JSON list.
+"""
+
+        return f"""
+Work ONLY from the evidence below. Every item must come from it; cite
+the item ids you used.
+
+{packed}
+"""
+
+    def _create_follow_up_planning_task(self):
+
+        conflicts = "\n".join(f"- {c}" for c in self.prior_conflicts) or "- (none recorded)"
+
+        return Task(
+            name="planning",
+            description=f"""
+Research query:
+
+"{self.query}"
+
+The previous iteration found these conflicts:
+
+{conflicts}
+{self._focus()}
+Write 1–2 targeted follow-up questions per conflict that would resolve it.
+
+STRICTLY return ONLY valid JSON:
+
+{{
+  "sub_questions": ["...", "..."]
+}}
+
+No explanation. No markdown.
+""",
+            expected_output="Strict JSON follow-up questions.",
+            agent=research_planner
+        )
+
+    def create_planning_task(self):
+
+        if self.follow_ups:
+            return self._create_follow_up_planning_task()
+
+        return self._create_planning_task()
+
     def create_tasks(self):
 
-        planning_task = Task(
+        # Planned already (build_planning): the stages read that output
+        if self.plan_task is not None:
+            tasks = self._create_stage_tasks(self.plan_task)
+            del tasks["planning"]
+            return tasks
+
+        return self._create_stage_tasks(self.create_planning_task())
+
+    def _create_planning_task(self):
+
+        return Task(
+            name="planning",
             description=f"""
 You are given the research query:
 
@@ -57,17 +163,20 @@ No explanation. No markdown.
             agent=research_planner
         )
 
+    def _create_stage_tasks(self, planning_task):
+
         web_task = Task(
+            name="web",
             description=f"""
 Using the structured research plan, extract verified web claims
 related to:
 
 "{self.query}"
-
+{self._focus()}{self._evidence("web")}
 For each claim include:
 
 - claim
-- source
+- source (the item's URL from SOURCES)
 - publication_date
 - source_type
 - credibility_score (0–1)
@@ -78,6 +187,7 @@ STRICTLY return ONLY JSON list:
   {{
     "claim": "...",
     "source": "...",
+    "evidence_ids": ["W1"],
     "publication_date": "...",
     "source_type": "...",
     "credibility_score": 0.0
@@ -92,16 +202,18 @@ No markdown. No explanation.
         )
 
         document_task = Task(
+            name="document",
             description=f"""
 Analyze relevant academic or technical evidence related to:
 
 "{self.query}"
-
+{self._focus()}{self._evidence("document")}
 Extract structured insights:
 
 [
   {{
     "document_title": "...",
+    "evidence_ids": ["D1", "D2"],
     "key_findings": "...",
     "statistics": "...",
     "methodology": "...",
@@ -118,10 +230,18 @@ No commentary.
             context=[planning_task]
         )
 
+        previously = (
+            "\nConflicts already reported in an earlier iteration "
+            "(say whether the new evidence resolves them):\n"
+            + "\n".join(f"- {c}" for c in self.prior_conflicts) + "\n"
+            if self.prior_conflicts else ""
+        )
+
         conflict_task = Task(
+            name="conflict",
             description="""
 Compare structured web claims and document insights.
-
+""" + previously + """
 Detect:
 
 - Contradictory claims
@@ -148,7 +268,27 @@ No explanation outside JSON.
             context=[web_task, document_task]
         )
 
-        report_task = Task(
+        return {
+            "planning": planning_task,
+            "web": web_task,
+            "document": document_task,
+            "conflict": conflict_task,
+        }
+
+    def create_report_task(self, evidence: dict):
+        """
+        evidence: stage name -> collected output text of all iterations.
+        """
+
+        # Divider-separated, so the report's token budget can trim each
+        # section (agents/llm_wrapper.py ContextBudget)
+        sections = "".join(
+            f"{CONTEXT_DIVIDER}=== {name.upper()} ===\n{text}"
+            for name, text in evidence.items() if text
+        )
+
+        return Task(
+            name="report",
             description=f"""
 Generate a structured academic research report for:
 
@@ -172,20 +312,13 @@ Integrate:
 
 Write in formal academic tone.
 Do NOT output JSON.
+
+Evidence collected across all research iterations:{sections}
 """,
             expected_output="Final structured research report.",
-            agent=report_generator,
-            context=[web_task, document_task, conflict_task]
+            agent=report_generator
         )
 
-        return {
-            "planning": planning_task,
-            "web": web_task,
-            "document": document_task,
-            "conflict": conflict_task,
-            "report": report_task,
-        }
-
     # -------------------------------------------------
     # BUILD CREW
     # -------------------------------------------------
@@ -194,17 +327,53 @@ Do NOT output JSON.
 
         tasks = self.create_tasks()
 
+        # Web and document tasks only need the plan: they run side by side
+        self.scheduler = TaskScheduler(tasks, max_parallel=self.max_parallel)
+
         crew = Crew(
             agents=[
                 research_planner,
                 self.web_scout,
                 self.document_specialist,
-                conflict_detector,
-                report_generator
+                conflict_detector
             ],
-            tasks=list(tasks.values()),
+            tasks=self.scheduler.schedule(),
+            process=Process.sequential,
+            verbose=True
+        )
+
+        return crew, tasks
+
+    def build_planning(self):
+
+        tasks = {"planning": self.create_planning_task()}
+        self.scheduler = TaskScheduler(tasks, max_parallel=1)
+
+        crew = Crew(
+            agents=[research_planner],
+            tasks=self.scheduler.schedule(),
             process=Process.sequential,
             verbose=True
         )
 
         return crew, tasks
+
+    def build_report(self, evidence: dict):
+
+        tasks = {"report": self.create_report_task(evidence)}
+        self.scheduler = TaskScheduler(tasks, max_parallel=1)
+
+        crew = Crew(
+            agents=[report_generator],
+            tasks=self.scheduler.schedule(),
+            process=Process.sequential,
+            verbose=True
+        )
+
+        return crew, tasks
+
+    def kickoff(self, crew):
+        """
+        Run the crew; tasks_output follows create_tasks() order.
+        """
+        return self.scheduler.kickoff(crew)
@@ -0,0 +1,203 @@
+import os
+
+
+class TaskScheduler:
+    """
+    Runs independent crew tasks concurrently.
+
+    The dependency graph comes from each task's `context` (a task with no
+    explicit context depends on every task before it). Tasks are grouped
+    into levels whose members only depend on earlier levels; a level is
+    split into batches of at most max_parallel tasks with distinct agents
+    (an agent runs one task at a time). Batches of several tasks use
+    crewAI's async_execution. crewAI runs consecutive async tasks
+    together until the next synchronous one, which waits for all of
+    them; a batch only gets such a barrier (its first task) when it
+    reads an output of, shares an agent with, or wouldn't fit next to
+    the async tasks still running.
+
+    schedule() sets async_execution and explicit contexts on the tasks;
+    kickoff() puts the caller's values back and returns the crew output
+    with tasks_output in the original task order, whatever order the
+    tasks ran in.
+    """
+
+    def __init__(self, tasks: dict, max_parallel: int | None = None):
+        self.tasks = tasks
+        self.max_parallel = max(1, max_parallel or int(os.getenv("CREW_MAX_PARALLEL", 2)))
+
+        # Caller's (async_execution, context) per task, until restore()
+        self._saved = {}
+
+    # -------------------------------------------------
+    # GRAPH
+    # -------------------------------------------------
+
+    def dependencies(self) -> dict:
+        """
+        task key -> keys of the tasks whose output it reads.
+        """
+
+        keys = list(self.tasks)
+        key_of = {id(task): key for key, task in self.tasks.items()}
+
+        deps = {}
+
+        for i, key in enumerate(keys):
+
+            context = self.tasks[key].context
+
+            if isinstance(context, list):
+                deps[key] = [key_of[id(t)] for t in context if id(t) in key_of]
+            elif context:
+                # Unspecified context: crewAI passes every earlier output
+                deps[key] = keys[:i]
+            else:
+                deps[key] = []
+
+        return deps
+
+    def levels(self) -> list:
+        """
+        Task keys grouped by dependency depth, in original order.
+        """
+
+        deps = self.dependencies()
+        depth = {}
+
+        for key in self.tasks:
+
+            for dep in deps[key]:
+                if dep not in depth:
+                    raise ValueError(
+                        f"Task '{key}' depends on '{dep}', which comes later or forms a cycle."
+                    )
+
+            depth[key] = 1 + max((depth[d] for d in deps[key]), default=-1)
+
+        levels = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+        for key in self.tasks:
+            levels[depth[key]].append(key)
+
+        return levels
+
+    def batches(self) -> list:
+        """
+        Levels split into groups that may run at the same time.
+        """
+
+        batches = []
+
+        for level in self.levels():
+
+            pending = list(level)
+
+            while pending:
+                batch, agents = [], set()
+
+                for key in list(pending):
+                    agent = id(self.tasks[key].agent)
+
+                    if len(batch) < self.max_parallel and agent not in agents:
+                        batch.append(key)
+                        agents.add(agent)
+                        pending.remove(key)
+
+                batches.append(batch)
+
+        return batches
+
+    # -------------------------------------------------
+    # EXECUTION
+    # -------------------------------------------------
+
+    def _needs_barrier(self, running: list, batch: list, deps: dict) -> bool:
+        """
+        Whether batch can't start while the async tasks in running are
+        still going.
+        """
+
+        if len(running) + len(batch) > self.max_parallel:
+            return True
+
+        agents = {id(self.tasks[key].agent) for key in running}
+
+        return any(
+            id(self.tasks[key].agent) in agents
+            or any(dep in running for dep in deps[key])
+            for key in batch
+        )
+
+    def schedule(self) -> list:
+        """
+        Set async_execution on every task and return them in run order.
+        """
+
+        deps = self.dependencies()
+
+        self._saved = {
+            key: (task.async_execution, task.context)
+            for key, task in self.tasks.items()
+        }
+
+        for key, task in self.tasks.items():
+            # Read outputs from the tasks themselves, so an async flush
+            # can't hide earlier outputs from an unspecified context
+            if not isinstance(task.context, list) and task.context:
+                task.context = [self.tasks[d] for d in deps[key]]
+
+        order = []
+
+        # Async tasks started since the last synchronous one
+        running = []
+
+        for batch in self.batches():
+
+            parallel = len(batch) > 1
+
+            for key in batch:
+                self.tasks[key].async_execution = parallel
+
+            if not parallel:
+                running = []
+
+            elif running and self._needs_barrier(running, batch, deps):
+                # The first task waits for the running ones, then runs
+                self.tasks[batch[0]].async_execution = False
+                running = batch[1:]
+
+            else:
+                running = running + batch
+
+            order.extend(batch)
+
+        # crewAI allows at most one async task at the end
+        if len(running) > 1:
+            self.tasks[order[-1]].async_execution = False
+
+        return [self.tasks[key] for key in order]
+
+    def restore(self):
+        """
+        Put back the async_execution and context schedule() replaced.
+        """
+
+        for key, (async_execution, context) in self._saved.items():
+            self.tasks[key].async_execution = async_execution
+            self.tasks[key].context = context
+
+        self._saved = {}
+
+    def kickoff(self, crew, inputs: dict | None = None):
+
+        try:
+            result = crew.kickoff(inputs=inputs)
+        finally:
+            self.restore()
+
+        # crewAI drops earlier outputs when it collects async ones
+        result.tasks_output = [
+            task.output for task in self.tasks.values() if task.output is not None
+        ]
+
+        return result
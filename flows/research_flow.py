@@ -7,11 +7,16 @@ from crewai.flow.flow import Flow, start, listen
 
 from memory.research_state import ResearchState
 from memory.knowledge_store import KnowledgeStore
+from memory.evidence_packer import EvidencePacker
 from crews.research_crew import ResearchCrew
 from agents.web_scout import WebScoutAgent
+from agents.base_llm import llm
 
 from tools.pdf_tool import PDFProcessor
 from tools.vector_store import VectorStore
+from tools.ingestion_manifest import IngestionManifest
+from tools.ingestion_pipeline import IngestionPipeline
+from tools.dedup_tool import NearDuplicateFilter
 from tools.clustering_tool import InsightClusterer
 
 
@@ -26,9 +31,127 @@ class ResearchFlow(Flow[ResearchState]):
 
         self.pdf_processor = PDFProcessor()
         self.vector_store = VectorStore()
+        self.dedup = NearDuplicateFilter()
+        # Re-embed everything when the chunker or embedding backend changes
+        self.manifest = IngestionManifest(
+            chunker_params={
+                **self.pdf_processor.chunker.params(),
+                "structure": self.pdf_processor.STRUCTURE_VERSION,
+                "embedding": self.vector_store.model.fingerprint,
+                "index": self.vector_store.index_backend,
+                "lexical": self.vector_store.lexical_index.VERSION,
+                "dedup": self.dedup.params(),
+            }
+        )
         self.clusterer = InsightClusterer()
+        self.evidence_packer = EvidencePacker()
+        # One scout for the whole run keeps its HTTP connections warm
+        self.web_scout = WebScoutAgent()
+        self.ingestion = IngestionPipeline(
+            self.pdf_processor, self.vector_store, dedup=self.dedup
+        )
+
+        self.pdf_indexed = False  # Prevent re-scanning during recursion
+
+    # Follow-up iterations re-research at most this many conflicts
+    MAX_FOLLOW_UPS = 5
+
+    @classmethod
+    def _follow_ups(cls, state: ResearchState) -> list:
+        """
+        Targeted queries for the next iteration: one per distinct
+        conflict issue, High severity first.
+        """
+
+        rank = {"High": 0, "Medium": 1, "Low": 2}
+        conflicts = sorted(state.conflicts, key=lambda c: rank.get(c.severity, 1))
+
+        issues = [" ".join(c.issue.split())[:200] for c in conflicts]
+
+        return [q for q in dict.fromkeys(issues) if q][:cls.MAX_FOLLOW_UPS]
+
+    @staticmethod
+    def _sub_questions(plan) -> list:
+
+        sub_questions = (
+            plan.get("sub_questions", []) if isinstance(plan, dict) else []
+        )
+
+        return [
+            q if isinstance(q, str) else q.get("question", "")
+            for q in sub_questions
+            if isinstance(q, (str, dict))
+        ]
+
+    @staticmethod
+    def _research_queries(state: ResearchState, follow_ups: list, planned: list) -> list:
+        """
+        What an iteration searches and retrieves for: the query, the
+        conflict follow-ups (if any) and the questions the planner wrote
+        for this iteration. The query stays in so follow-up iterations
+        don't drift off-topic.
+        """
+
+        queries = [state.query] + list(follow_ups) + list(planned)
+
+        return list(dict.fromkeys(q for q in (" ".join(q.split()) for q in queries) if q))
+
+    @staticmethod
+    def _parse_output(task):
+        """
+        JSON object or array from a task's raw output, None if it has
+        none.
+        """
+
+        try:
+            raw = task.output.raw.strip()
+
+            # remove markdown if LLM adds it
+            raw = raw.replace("```json", "").replace("```", "").strip()
+
+            # try direct parse first
+            try:
+                return json.loads(raw)
+            except:
+                pass
+
+            # fallback → extract JSON block (object OR array)
+            match = re.search(r"(\{.*\}|\[.*\])", raw, re.DOTALL)
+            if match:
+                return json.loads(match.group())
+
+            return None
+
+        except Exception:
+            return None
+
+    def _index_web_pages(self, urls: list, knowledge_store: KnowledgeStore):
+        """
+        Fetch result pages and chunk + embed their text into the vector
+        store, so retrieval sees full pages instead of snippets.
+        """
+
+        pages = self.web_scout.fetch_pages(urls)
+
+        fetched = [p for p in pages if "error" not in p and p.get("text")]
+        written = 0
 
-        self.pdf_indexed = False  # Prevent re-indexing during recursion
+        for page in fetched:
+            chunks = self.pdf_processor.chunker.chunk_text(page["text"])
+
+            if chunks:
+                written += len(self.vector_store.add_web_page(
+                    page["url"], page.get("title"), chunks, page["content_hash"]
+                ))
+
+        if written:
+            self.vector_store.flush()
+
+        knowledge_store.add_reasoning_step(
+            f"Fetched {len(fetched)} of {len(pages)} result pages "
+            f"({sum(p.get('cached', False) for p in fetched)} from cache); "
+            f"embedded {written} new web chunks."
+        )
 
     # -----------------------------------------------------
     # STEP 1: GET QUERY
@@ -43,6 +166,10 @@ class ResearchFlow(Flow[ResearchState]):
         self.state.recursion_count = 0
         self.state.conflicts_detected = False
 
+        # Clusters warm-start across iterations of this query only
+        self.clusterer.reset()
+        llm.reset()
+
         print(f"\nResearch initiated for: {self.state.query}\n")
 
         return self.state
@@ -56,22 +183,83 @@ class ResearchFlow(Flow[ResearchState]):
 
         knowledge_store = KnowledgeStore(state)
 
+        # Raw outputs of every iteration, per stage; the report is
+        # written once from all of them after the loop
+        stage_outputs = {"web": [], "document": [], "conflict": []}
+
+        # Empty on the first iteration; later ones only cover these
+        follow_ups = []
+        prior_conflicts = []
+
         while True:
 
             print(f"\n--- Research Iteration {state.recursion_count + 1} ---\n")
 
+            # Token accounting is kept per iteration
+            llm.iteration = state.recursion_count + 1
+
+            # =====================================================
+            # 0️⃣ Planning (before search, so sub-questions are searched)
+            # =====================================================
+
+            try:
+                planner = ResearchCrew(
+                    state.query,
+                    follow_ups=follow_ups,
+                    prior_conflicts=prior_conflicts
+                )
+                crew, plan_tasks = planner.build_planning()
+                planner.kickoff(crew)
+            except Exception as e:
+                knowledge_store.add_reasoning_step(
+                    f"Planning failed: {str(e)}"
+                )
+                break
+            finally:
+                for decision in llm.drain_decisions():
+                    knowledge_store.add_reasoning_step(decision)
+
+            # A follow-up plan extends the original one
+            plan_output = self._parse_output(plan_tasks["planning"])
+            if plan_output and follow_ups and isinstance(state.research_plan, dict):
+                state.research_plan.setdefault("follow_up_questions", []).extend(
+                    self._sub_questions(plan_output)
+                )
+            elif plan_output:
+                state.research_plan = plan_output
+
+            planned = self._sub_questions(plan_output)
+            queries = self._research_queries(state, follow_ups, planned)
+
+            knowledge_store.add_reasoning_step(
+                f"Planned {len(planned)} sub-questions; researching "
+                f"{len(queries)} queries."
+            )
+
             # =====================================================
             # 1️⃣ Deterministic Web Search
             # =====================================================
 
             try:
-                web_wrapper = WebScoutAgent()
-                structured_claims = web_wrapper.perform_search(state.query)
+                # All queries concurrently; rephrasings of the query only
+                # on the first pass (later ones add follow-ups)
+                structured_claims = self.web_scout.perform_search(
+                    state.query,
+                    queries,
+                    variants=not follow_ups
+                )
 
                 for claim in structured_claims:
                     knowledge_store.add_web_claim(claim)
 
-                knowledge_store.add_reasoning_step("Web search completed.")
+                knowledge_store.add_reasoning_step(
+                    f"Web search completed ({len(structured_claims)} unique pages)."
+                )
+
+                self._index_web_pages(
+                    [claim["source"] for claim in structured_claims],
+                    knowledge_store
+                )
 
             except Exception as e:
                 knowledge_store.add_reasoning_step(
@@ -87,51 +275,68 @@ class ResearchFlow(Flow[ResearchState]):
 
                     pdf_files = glob.glob("input_pdfs/*.pdf")
 
-                    if pdf_files:
-                        print(f"Processing {len(pdf_files)} PDFs...\n")
+                    # Incremental: only new or changed PDFs are re-extracted
+                    to_index, unchanged, removed = self.manifest.plan(pdf_files)
 
-                        all_chunks = []
-                        metadata = []
+                    # Unchanged files whose dropped duplicates point at
+                    # chunks that are about to change must be re-indexed too
+                    dependents = set(self.dedup.dependents(to_index + removed))
+                    to_index += [p for p in unchanged if p in dependents]
+                    unchanged = [p for p in unchanged if p not in dependents]
 
-                        for pdf_path in pdf_files:
+                    self.dedup.forget_sources(to_index + removed)
 
-                            pdf_data = self.pdf_processor.extract_text_and_chunks(pdf_path)
+                    for pdf_path in removed:
+                        self.vector_store.delete_documents(
+                            self.manifest.forget(pdf_path)
+                        )
+
+                    if to_index:
+                        print(
+                            f"Processing {len(to_index)} PDFs "
+                            f"({len(unchanged)} unchanged)...\n"
+                        )
 
-                            if "error" in pdf_data:
+                        def record_file(pdf_path, ids, error):
+
+                            if error:
                                 knowledge_store.add_reasoning_step(
-                                    f"Error processing PDF: {pdf_path}"
+                                    f"Error processing PDF: {pdf_path} ({error})"
                                 )
-                                continue
-
-                            chunks = pdf_data.get("chunks", [])
+                                return
 
-                            for idx, chunk_data in enumerate(chunks):
+                            # Changed file → drop chunks that no longer exist
+                            stale = set(self.manifest.forget(pdf_path)) - set(ids)
+                            self.vector_store.delete_documents(list(stale))
 
-                                chunk_text = chunk_data["text"]
-                                page_number = chunk_data["page_number"]
+                            self.manifest.record(pdf_path, ids)
 
-                                chunk_id = f"{os.path.basename(pdf_path)}_chunk_{idx}"
+                        # Streaming extract → embed → upsert (bounded memory)
+                        stats = self.ingestion.run(to_index, on_file_done=record_file)
 
-                                knowledge_store.add_pdf_chunk(
-                                    chunk_id=chunk_id,
-                                    source_file=pdf_path,
-                                    text=chunk_text,
-                                )
+                        if stats["duplicates"]:
+                            saved = self.dedup.savings()
+                            vector_kb = (
+                                stats["duplicates"] * self.vector_store.model.dimension * 4 / 1024
+                            )
 
-                                all_chunks.append(chunk_text)
-                                metadata.append({
-                                    "source": pdf_path,
-                                    "chunk_id": chunk_id,
-                                    "page_number": page_number
-                                })
+                            knowledge_store.add_reasoning_step(
+                                f"Near-duplicate filter skipped {stats['duplicates']} "
+                                f"chunks ({stats['duplicates']} embeddings, "
+                                f"~{vector_kb:.0f} KB of vectors); "
+                                f"{saved['duplicate_chunks']} duplicates on record "
+                                f"({saved['text_bytes'] / 1024:.0f} KB of text)."
+                            )
 
-                        if all_chunks:
-                            self.vector_store.add_documents(all_chunks, metadata)
+                    self.vector_store.flush()
 
-                        self.pdf_indexed = True
+                    self.manifest.save()
+                    self.pdf_indexed = True
 
+                    if pdf_files:
                         knowledge_store.add_reasoning_step(
-                            "PDF indexing completed."
+                            f"PDF indexing completed: {len(to_index)} indexed, "
+                            f"{len(unchanged)} unchanged, {len(removed)} removed."
                         )
 
                     else:
@@ -139,27 +344,92 @@ class ResearchFlow(Flow[ResearchState]):
                             "No PDFs found in input_pdfs folder."
                         )
 
-                # Semantic Retrieval
-                results = self.vector_store.query(state.query)
+                # Semantic Retrieval: all queries of the iteration, in one batch
+                results = self.vector_store.query_many(queries)
 
                 retrieved_chunks = []
-
-                if results and "documents" in results:
-                    retrieved_chunks = results["documents"][0]
+                retrieved_embeddings = None
+                hits_by_text = {}
+
+                if results and results["documents"]:
+                    retrieved_chunks = results["documents"]
+                    retrieved_embeddings = results["embeddings"]
+
+                    # Chunks dropped as near-duplicates of a hit
+                    duplicate_locations = self.dedup.locations(results["ids"])
+
+                    # Register retrieved chunks as raw PDF evidence
+                    for doc_id, text, meta in zip(
+                        results["ids"],
+                        retrieved_chunks,
+                        results["metadatas"]
+                    ):
+                        knowledge_store.add_pdf_chunk(
+                            chunk_id=meta.get("chunk_id", doc_id),
+                            source_file=meta.get("source", "unknown"),
+                            text=text,
+                        )
+                        hits_by_text.setdefault(text, meta)
+
+                        # Same text elsewhere: keep those citations resolvable
+                        for location in duplicate_locations.get(doc_id, []):
+                            knowledge_store.add_pdf_chunk(
+                                chunk_id=location["chunk_id"],
+                                source_file=location["source"],
+                                text=text,
+                            )
+
+                    knowledge_store.add_reasoning_step(
+                        f"Retrieved {len(retrieved_chunks)} unique chunks for "
+                        f"{len(results['queries'])} queries."
+                    )
 
                 if retrieved_chunks:
 
-                    clustered = self.clusterer.cluster(retrieved_chunks)
+                    # Stored vectors are reused; nothing is re-encoded here.
+                    # Only a few representatives per theme are forwarded.
+                    clusters = self.clusterer.representatives(
+                        retrieved_chunks, embeddings=retrieved_embeddings
+                    )
+
+                    fit = self.clusterer.last_fit
+                    if fit and len(retrieved_chunks) > 1:
+                        knowledge_store.add_reasoning_step(
+                            f"Clustered {len(retrieved_chunks)} chunks into "
+                            f"{fit['k']} themes (silhouette {fit['silhouette']:.2f}"
+                            f"{', warm-started' if fit['warm_started'] else ''})."
+                        )
+
+                    forwarded = sum(len(c["texts"]) for c in clusters)
+                    knowledge_store.add_reasoning_step(
+                        f"Forwarding {forwarded} of {len(retrieved_chunks)} "
+                        f"chunks as cluster representatives."
+                    )
 
-                    for cluster_id, texts in clustered.items():
-                        for text in texts:
+                    for cluster in clusters:
+
+                        # Confidence follows how many chunks back the theme
+                        size = cluster["size"]
+                        confidence = (
+                            "High" if size >= 3 else "Medium" if size == 2 else "Low"
+                        )
+
+                        for text in cluster["texts"]:
+                            meta = hits_by_text.get(text, {})
                             knowledge_store.add_document_insight({
-                                "document_title": f"Cluster {cluster_id}",
+                                "document_title": f"Cluster {cluster['label']}",
                                 "key_findings": text,
+                                "source_file": meta.get("source"),
+                                "chunk_id": meta.get("chunk_id"),
+                                "page_number": meta.get("page_number"),
+                                "section_title": meta.get("section"),
+                                "cluster_id": cluster["label"],
+                                "cluster_size": size,
+                                "cluster_spread": round(cluster["spread"], 4),
                                 "statistics": None,
                                 "methodology": None,
                                 "limitations": None,
-                                "confidence_level": "High"
+                                "confidence_level": confidence
                             })
 
             except Exception as e:
@@ -171,60 +441,52 @@ class ResearchFlow(Flow[ResearchState]):
             # 3️⃣ Run Crew
             # =====================================================
 
+            # Gathered evidence goes into the task prompts, ranked and
+            # trimmed to each task's token budget
+            packed = self.evidence_packer.pack_tasks(knowledge_store, queries)
+
+            for key, evidence in packed.items():
+                knowledge_store.add_reasoning_step(
+                    f"Packed {evidence['packed']} of {evidence['total']} evidence "
+                    f"items for the {key} task (~{evidence['tokens']} tokens)."
+                )
+
             try:
-                crew_builder = ResearchCrew(state.query)
+                crew_builder = ResearchCrew(
+                    state.query,
+                    follow_ups=follow_ups,
+                    prior_conflicts=prior_conflicts,
+                    evidence={key: evidence["text"] for key, evidence in packed.items()},
+                    plan_task=plan_tasks["planning"]
+                )
                 crew, task_map = crew_builder.build()
-                result = crew.kickoff()
-                task_outputs = result.tasks_output
+                crew_builder.kickoff(crew)
             except Exception as e:
                 knowledge_store.add_reasoning_step(
                     f"Crew execution failed: {str(e)}"
                 )
                 break
+            finally:
+                for decision in llm.drain_decisions():
+                    knowledge_store.add_reasoning_step(decision)
 
             # =====================================================
             # 4️⃣ Parse Outputs Safely
             # =====================================================
 
 
-            def safe_json_parse(index):
-                try:
-                    raw = task_outputs[index].raw.strip()
-
-                    # remove markdown if LLM adds it
-                    raw = raw.replace("```json", "").replace("```", "").strip()
-
-                    # try direct parse first
-                    try:
-                        return json.loads(raw)
-                    except:
-                        pass
-
-                    # fallback → extract JSON block (object OR array)
-                    match = re.search(r"(\{.*\}|\[.*\])", raw, re.DOTALL)
-                    if match:
-                        return json.loads(match.group())
-
-                    return None
-
-                except Exception:
-                    return None
-
-
-
-            # Planning
-            plan_output = safe_json_parse(0)
-            if plan_output:
-                state.research_plan = plan_output
+            for key, outputs in stage_outputs.items():
+                if task_map[key].output is not None:
+                    outputs.append(task_map[key].output.raw.strip())
 
             # Web claims
-            web_output = safe_json_parse(1)
+            web_output = self._parse_output(task_map["web"])
             if web_output:
                 for claim in web_output:
                     knowledge_store.add_web_claim(claim)
 
             # Document insights
-            doc_output = safe_json_parse(2)
+            doc_output = self._parse_output(task_map["document"])
 
             if doc_output:
 
@@ -237,7 +499,7 @@ class ResearchFlow(Flow[ResearchState]):
 
 
             # Conflict detection
-            conflict_output = safe_json_parse(3)
+            conflict_output = self._parse_output(task_map["conflict"])
             if conflict_output and conflict_output.get("conflicts_detected") is True:
 
                 for conflict in conflict_output.get("conflict_details", []):
@@ -251,6 +513,16 @@ class ResearchFlow(Flow[ResearchState]):
 
                     print("\n⚠ Conflict detected. Running recursive research...\n")
 
+                    # Earlier stage outputs are kept; the next iteration
+                    # only researches the conflicting issues
+                    follow_ups = self._follow_ups(state)
+                    prior_conflicts = follow_ups
+
+                    knowledge_store.add_reasoning_step(
+                        f"Recursing on {len(follow_ups)} conflict follow-ups "
+                        f"(of {len(state.conflicts)} conflicts)."
+                    )
+
                     knowledge_store.increment_recursion()
                     knowledge_store.clear_conflicts()
 
@@ -270,16 +542,43 @@ class ResearchFlow(Flow[ResearchState]):
             f"Final confidence score: {confidence}%"
         )
 
+        usage = llm.usage_summary()["totals"]
+        knowledge_store.add_reasoning_step(
+            f"LLM usage: {usage['calls']} calls ({usage['cached_calls']} cached), "
+            f"{usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion "
+            f"tokens, {usage['trimmed_tokens']} context tokens trimmed, "
+            f"~${usage['cost_usd']:.4f}."
+        )
+
         # Inject confidence into state so report can use it
         if isinstance(state.research_plan, dict):
             state.research_plan["system_confidence_score"] = confidence
             state.research_plan["confidence_scale"] = "0-100"
 
+        # One report for all iterations
+        report_text = ""
+
+        if any(stage_outputs.values()):
+            try:
+                crew_builder = ResearchCrew(state.query)
+                crew, task_map = crew_builder.build_report({
+                    key: "\n\n".join(outputs)
+                    for key, outputs in stage_outputs.items()
+                })
+                crew_builder.kickoff(crew)
+                report_text = task_map["report"].output.raw.strip()
+            except Exception as e:
+                knowledge_store.add_reasoning_step(
+                    f"Report generation failed: {str(e)}"
+                )
+            finally:
+                for decision in llm.drain_decisions():
+                    knowledge_store.add_reasoning_step(decision)
+
         # Replace confidence section inside report safely
         # replace ONLY confidence line (safe)
 
-        if task_outputs:
-            report_text = task_outputs[4].raw.strip()
+        if report_text:
 
                 # Add system confidence at END (clean & safe)
             report_text += f"\n\n---\nSystem Confidence Score: {confidence}% (Calculated)\n"
@@ -320,6 +619,10 @@ class ResearchFlow(Flow[ResearchState]):
             "query": state.query,
             "confidence_score": state.confidence_score,
             "recursion_count": state.recursion_count,
+            "search_cache": self.web_scout.search_tool.cache_stats(),
+            "llm_cache": {"mode": llm.mode, **llm.cache.stats()},
+            "token_usage": llm.usage_summary(),
+            "model_routing": llm.routing_stats(),
         }
 
         with open("output/summary.json", "w", encoding="utf-8") as f:
@@ -8,14 +8,8 @@ load_dotenv()
 
 
 ##########################################################   for logs #########################################
-# Create logs folder
 from datetime import datetime
-os.makedirs("logs", exist_ok=True)
 
-# Unique log file per run
-log_filename = datetime.now().strftime("logs/run_%Y%m%d_%H%M%S.log")
-
-log_file = open(log_filename, "w", encoding="utf-8")
 
 # Redirect terminal output → file + terminal
 class Tee:
@@ -42,16 +36,30 @@ class Tee:
         return self._original_stream.encoding
 
 
-sys.stdout = Tee(sys.stdout, log_file)
-sys.stderr = Tee(sys.stderr, log_file)
+def setup_logging():
+    """
+    Tee stdout/stderr into a per-run log file.
+
+    Called from main() rather than at import time, so worker processes
+    that re-import this module (spawn start method) don't open log files.
+    """
+
+    # Create logs folder
+    os.makedirs("logs", exist_ok=True)
+
+    # Unique log file per run
+    log_filename = datetime.now().strftime("logs/run_%Y%m%d_%H%M%S.log")
+
+    log_file = open(log_filename, "w", encoding="utf-8")
+
+    sys.stdout = Tee(sys.stdout, log_file)
+    sys.stderr = Tee(sys.stderr, log_file)
 
 ##################################################### for logs end #######################################################
 
 # Ensure root path is included
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flows.research_flow import ResearchFlow
-
 
 # ---------------------------------------------------------
 # SYSTEM INITIALIZATION
@@ -96,6 +104,11 @@ def print_completion_summary(start_time):
 
 def main():
 
+    setup_logging()
+
+    # Imported here so spawned worker processes don't load the full stack
+    from flows.research_flow import ResearchFlow
+
     start_time = time.time()
 
     try:
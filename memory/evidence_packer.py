@@ -0,0 +1,325 @@
+import math
+import os
+from collections import Counter
+
+from tools.bm25_index import tokenize
+
+try:
+    import tiktoken
+except ImportError:  # optional: ~4 characters per token estimate
+    tiktoken = None
+
+
+class TokenCounter:
+    """
+    Token counts for prompt budgeting: tiktoken when it and its encoding
+    are available, otherwise an estimate of 4 characters per token.
+    """
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self.encoding_name = encoding
+        self._encoding = None
+
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception:  # encoding file not cached and no network
+                self._encoding = None
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+
+        if not text:
+            return 0
+
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+
+        return math.ceil(len(text) / 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+
+        if self.count(text) <= max_tokens:
+            return text
+
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return self._encoding.decode(tokens[:max(0, max_tokens - 1)]).rstrip() + "…"
+
+        cut = text[:max(0, max_tokens * 4 - 1)]
+        if " " in cut:
+            cut = cut.rsplit(" ", 1)[0]
+
+        return cut.rstrip() + "…"
+
+    def truncate_middle(self, text: str, max_tokens: int, tail_tokens: int = 40) -> str:
+        """
+        Like truncate(), but keeps the last tail_tokens as well (closing
+        instructions, the end of a JSON document).
+        """
+
+        if self.count(text) <= max_tokens:
+            return text
+
+        tail_tokens = min(tail_tokens, max_tokens // 2)
+
+        if tail_tokens <= 0:
+            return self.truncate(text, max_tokens)
+
+        if self._encoding is not None:
+            tail = self._encoding.decode(
+                self._encoding.encode(text, disallowed_special=())[-tail_tokens:]
+            )
+        else:
+            tail = text[-tail_tokens * 4:]
+
+        return self.truncate(text, max_tokens - tail_tokens) + " " + tail.lstrip()
+
+
+class EvidencePacker:
+    """
+    Serializes KnowledgeStore evidence into compact, id-referenced prompt
+    sections, one per crew task, each within a token budget.
+
+    Items are web claims (W1, W2, ...), retrieved PDF chunks (P1, ...)
+    and clustered document insights (D1, ...). Each line holds the item
+    id, a source id, its weight and the (truncated) text; every source
+    URL or file name is written once in a SOURCES list. Items are ranked
+    by relevance_weight * BM25 relevance to the queries (scaled to 0–1)
+    plus the rest times credibility, and added greedily until the budget
+    is used up. A chunk is packed at most once: as its insight when it
+    has one, otherwise as a P item.
+
+    Per-task budgets default to $EVIDENCE_TOKENS_WEB and
+    $EVIDENCE_TOKENS_DOCUMENT.
+    """
+
+    # Which evidence each task sees. Retrieved chunks reach the document
+    # task only as cluster representatives (insights); the rest stay in
+    # state for citation checks and confidence.
+    TASK_KINDS = {
+        "web": ("web",),
+        "document": ("insight",),
+    }
+
+    # Document evidence has no URL to score
+    INSIGHT_CREDIBILITY = {"High": 0.9, "Medium": 0.7, "Low": 0.5}
+    PDF_CREDIBILITY = 0.7
+
+    def __init__(
+        self,
+        counter: TokenCounter | None = None,
+        budgets: dict | None = None,
+        max_item_tokens: int = 120,
+        relevance_weight: float = 0.6
+    ):
+        self.counter = counter or TokenCounter()
+        self.budgets = budgets or {
+            "web": int(os.getenv("EVIDENCE_TOKENS_WEB", 1500)),
+            "document": int(os.getenv("EVIDENCE_TOKENS_DOCUMENT", 2500)),
+        }
+        self.max_item_tokens = max_item_tokens
+        self.relevance_weight = relevance_weight
+
+    # -------------------------------------------------
+    # ITEMS
+    # -------------------------------------------------
+
+    def items(self, knowledge_store, kinds: tuple) -> list:
+        """
+        Evidence of the given kinds as {prefix, source, weight, label, text}.
+        """
+
+        state = knowledge_store.state
+        items = []
+
+        if "web" in kinds and state.web_claims:
+
+            boosts = knowledge_store.authority.score_many(
+                [claim.source for claim in state.web_claims], "boost"
+            )
+
+            for claim, boost in zip(state.web_claims, boosts):
+                items.append({
+                    "prefix": "W",
+                    "source": claim.source,
+                    "weight": max(0.0, min(claim.credibility_score + boost, 1.0)),
+                    "label": claim.publication_date or "",
+                    "text": claim.claim,
+                })
+
+        # Chunk ids carried by an insight: packed once, as that insight
+        covered = set()
+
+        if "insight" in kinds:
+            for insight in state.document_insights:
+
+                # Relabelled clusters re-add the same representative
+                if insight.chunk_id:
+                    if insight.chunk_id in covered:
+                        continue
+                    covered.add(insight.chunk_id)
+
+                text = insight.key_findings
+                extras = [
+                    f"{name}: {value}"
+                    for name, value in (
+                        ("statistics", insight.statistics),
+                        ("methodology", insight.methodology),
+                        ("limitations", insight.limitations),
+                    )
+                    if value
+                ]
+                if extras:
+                    text += " (" + "; ".join(extras) + ")"
+
+                label = f"p.{insight.page_number}" if insight.page_number else ""
+                if insight.cluster_size:
+                    label = f"{label} theme of {insight.cluster_size}".strip()
+
+                items.append({
+                    "prefix": "D",
+                    "source": insight.source_file or insight.document_title,
+                    "weight": self.INSIGHT_CREDIBILITY.get(insight.confidence_level, 0.6),
+                    "label": label,
+                    "text": text,
+                })
+
+        if "pdf" in kinds:
+            for chunk in state.pdf_chunks:
+
+                if chunk.chunk_id in covered:
+                    continue
+
+                items.append({
+                    "prefix": "P",
+                    "source": chunk.source_file,
+                    "weight": self.PDF_CREDIBILITY,
+                    "label": chunk.chunk_id,
+                    "text": chunk.text,
+                })
+
+        return items
+
+    @staticmethod
+    def relevance(texts: list, queries: list, k1: float = 1.2, b: float = 0.75) -> list:
+        """
+        BM25 score of each text against all query terms, scaled to 0–1.
+        """
+
+        if not texts:
+            return []
+
+        docs = [Counter(tokenize(text)) for text in texts]
+        terms = set(tokenize(" ".join(q for q in queries if q)))
+
+        if not terms:
+            return [0.0] * len(texts)
+
+        lengths = [sum(doc.values()) for doc in docs]
+        avg_length = (sum(lengths) / len(lengths)) or 1.0
+
+        df = Counter(term for doc in docs for term in terms if term in doc)
+        idf = {
+            term: math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+            for term in terms
+        }
+
+        scores = []
+        for doc, length in zip(docs, lengths):
+            norm = k1 * (1 - b + b * length / avg_length)
+            scores.append(sum(
+                idf[term] * doc[term] * (k1 + 1) / (doc[term] + norm)
+                for term in terms if term in doc
+            ))
+
+        top = max(scores) or 1.0
+
+        return [score / top for score in scores]
+
+    # -------------------------------------------------
+    # PACKING
+    # -------------------------------------------------
+
+    def pack(self, knowledge_store, queries: list, kinds: tuple, budget: int) -> dict:
+        """
+        Returns {text, ids, tokens, packed, total}; ids maps each item id
+        to its source.
+        """
+
+        items = self.items(knowledge_store, kinds)
+
+        relevance = self.relevance([item["text"] for item in items], queries)
+        w = self.relevance_weight
+
+        ranked = sorted(
+            zip(items, relevance),
+            key=lambda pair: w * pair[1] + (1 - w) * pair[0]["weight"],
+            reverse=True
+        )
+
+        lines, sources, ids = [], {}, {}
+        counts = Counter()
+
+        header = "EVIDENCE (cite by id, e.g. [W1]):"
+        used = self.counter.count(header) + self.counter.count("SOURCES:")
+
+        for item, _ in ranked:
+
+            source = item["source"] or "unknown"
+            new_source = source not in sources
+            source_id = sources.get(source, f"S{len(sources) + 1}")
+
+            item_id = f"{item['prefix']}{counts[item['prefix']] + 1}"
+            meta = "|".join(
+                part for part in (item_id, source_id, f"{item['weight']:.2f}", item["label"])
+                if part
+            )
+
+            text = " ".join((item["text"] or "").split())
+            line = f"[{meta}] {self.counter.truncate(text, self.max_item_tokens)}"
+
+            cost = self.counter.count(line) + 1
+            if new_source:
+                cost += self.counter.count(f"{source_id} {source}") + 1
+
+            if used + cost > budget:
+                continue
+
+            used += cost
+            counts[item["prefix"]] += 1
+            lines.append(line)
+            ids[item_id] = source
+
+            if new_source:
+                sources[source] = source_id
+
+        if not lines:
+            return {"text": "", "ids": {}, "tokens": 0, "packed": 0, "total": len(items)}
+
+        text = "\n".join(
+            [header] + lines + ["SOURCES:"]
+            + [f"{source_id} {source}" for source, source_id in sources.items()]
+        )
+
+        return {
+            "text": text,
+            "ids": ids,
+            "tokens": used,
+            "packed": len(lines),
+            "total": len(items),
+        }
+
+    def pack_tasks(self, knowledge_store, queries: list) -> dict:
+        """
+        task key -> packed evidence, for every task with a budget.
+        """
+
+        return {
+            task: self.pack(knowledge_store, queries, self.TASK_KINDS[task], budget)
+            for task, budget in self.budgets.items()
+            if task in self.TASK_KINDS
+        }
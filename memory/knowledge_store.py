@@ -1,5 +1,6 @@
 from typing import List
-from urllib.parse import urlparse
+
+from tools.domain_authority import get_domain_authority
 
 from .research_state import (
     ResearchState,
@@ -14,6 +15,7 @@ class KnowledgeStore:
 
     def __init__(self, state: ResearchState):
         self.state = state
+        self.authority = get_domain_authority()
 
     # -----------------------------------
     # SOURCE AUTHORITY INTELLIGENCE (NEW)
@@ -27,52 +29,13 @@ class KnowledgeStore:
         + academic / official docs → higher confidence
         - random blogs → lower confidence
 
-        Safe, deterministic, zero dependencies.
+        Same domain categories as CredibilityScorer (tools/domain_authority.py).
         """
 
         if not url:
             return 0.0
 
-        try:
-            domain = urlparse(url).netloc.lower()
-
-            # Academic / research sources
-            if any(x in domain for x in [
-                "arxiv.org",
-                "nature.com",
-                "science.org",
-                "ieee.org",
-                "acm.org",
-                "springer.com",
-            ]):
-                return 0.15
-
-            # Official technical docs
-            if any(x in domain for x in [
-                "docs.microsoft.com",
-                "learn.microsoft.com",
-                "cloud.google.com",
-                "openai.com",
-                "huggingface.co",
-            ]):
-                return 0.12
-
-            # Company engineering blogs
-            if any(x in domain for x in [
-                "anthropic.com",
-                "deepmind.com",
-                "openai.com",
-            ]):
-                return 0.08
-
-            # Medium / personal blogs
-            if "medium.com" in domain or "blog" in domain:
-                return -0.05
-
-            return 0.0
-
-        except Exception:
-            return 0.0
+        return self.authority.score(url, "boost")
 
     # -----------------------------------
     # WEB EVIDENCE MANAGEMENT
@@ -83,11 +46,15 @@ class KnowledgeStore:
         try:
             claim = Claim(**claim_data)
 
-            # Deduplicate by source
-            if claim.source in self.state.web_sources_seen:
+            # Deduplicate by source and claim text: a source's search
+            # snippet doesn't shadow what the web task extracts from it
+            key = (claim.source, " ".join(claim.claim.lower().split()))
+
+            if key in self.state.web_claims_seen:
                 return
 
             self.state.web_claims.append(claim)
+            self.state.web_claims_seen.add(key)
             self.state.web_sources_seen.add(claim.source)
 
             # Evidence map
@@ -214,13 +181,15 @@ class KnowledgeStore:
         # --- Web credibility (UPGRADED WITH AUTHORITY) ---
         if self.state.web_claims:
 
-            adjusted_scores = []
+            # One vectorized authority lookup for all claims
+            boosts = self.authority.score_many(
+                [claim.source for claim in self.state.web_claims], "boost"
+            )
 
-            for claim in self.state.web_claims:
-                base = claim.credibility_score
-                boost = self._source_authority_boost(claim.source)
-                adjusted = max(0.0, min(base + boost, 1.0))
-                adjusted_scores.append(adjusted)
+            adjusted_scores = [
+                max(0.0, min(claim.credibility_score + boost, 1.0))
+                for claim, boost in zip(self.state.web_claims, boosts)
+            ]
 
             avg_credibility = sum(adjusted_scores) / len(adjusted_scores)
 
@@ -24,6 +24,12 @@ class DocumentInsight(BaseModel):
     source_file: str | None = None
     chunk_id: str | None = None
     page_number: int | None = None
+    section_title: str | None = None
+
+    # Set when the insight represents a cluster of retrieved chunks
+    cluster_id: int | None = None
+    cluster_size: int | None = None
+    cluster_spread: float | None = None
 
     statistics: str | None = None
     methodology: str | None = None
@@ -54,6 +60,7 @@ class ResearchState(BaseModel):
 
     # Deduplication tracking
     web_sources_seen: Set[str] = Field(default_factory=set)
+    web_claims_seen: set = Field(default_factory=set)
     chunk_ids_seen: Set[str] = Field(default_factory=set)
 
     # Evidence mapping for cross-reference
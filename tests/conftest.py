@@ -0,0 +1,106 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The LLM config is built at import; no call is ever made in the tests
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("LLM_CACHE_MODE", "off")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+
+def pytest_configure(config):
+    # Modules open their caches under ./vector_db; keep the checkout clean
+    config._workdir = tempfile.mkdtemp(prefix="insightfusion-tests-")
+    os.chdir(config._workdir)
+
+
+def pytest_unconfigure(config):
+    os.chdir(ROOT)
+    shutil.rmtree(config._workdir, ignore_errors=True)
+
+
+class StubServer:
+    """
+    Local HTTP server for client tests. respond(handler) returns
+    (status, headers, body) for each request; `requests` logs
+    (method, path, headers, body) and `max_in_flight` is the most
+    requests it was serving at once.
+    """
+
+    def __init__(self, respond, delay: float = 0.0):
+        self.respond = respond
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                with server._lock:
+                    server.requests.append((self.command, self.path, dict(self.headers), body))
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+                try:
+                    time.sleep(server.delay)
+                    status, headers, payload = server.respond(self, body)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def stub_server():
+
+    servers = []
+
+    def start(respond, delay: float = 0.0):
+        servers.append(StubServer(respond, delay))
+        return servers[-1]
+
+    yield start
+
+    for server in servers:
+        server.close()
@@ -0,0 +1,140 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from tools.bm25_index import BM25Index, _decode_postings, _encode_postings, tokenize
+
+DOCS = {
+    "a": "Lithium recycling recovers lithium from spent batteries.",
+    "b": "Battery recycling costs fell after switching suppliers.",
+    "c": "GPT-4 summarised the recycling reports in 3.5 minutes.",
+    "d": "Collection rates of spent batteries remain low.",
+}
+
+
+def reference_scores(docs: dict, query: str, k1=1.2, b=0.75) -> dict:
+    """
+    Textbook BM25 over in-memory documents.
+    """
+
+    counts = {doc_id: Counter(tokenize(text)) for doc_id, text in docs.items()}
+    avg_length = sum(sum(c.values()) for c in counts.values()) / len(counts)
+
+    scores = {}
+    for doc_id, c in counts.items():
+        length = sum(c.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in counts.values())
+            if term not in c:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * c[term] * (k1 + 1) / (c[term] + k1 * (1 - b + b * length / avg_length))
+        if score:
+            scores[doc_id] = score
+
+    return scores
+
+
+def assert_scores(index, docs, query):
+
+    ids, scores = index.search(query)
+    expected = reference_scores(docs, query)
+
+    assert set(ids) == set(expected)
+    assert list(scores) == sorted(scores, reverse=True)
+    for doc_id, score in zip(ids, scores):
+        assert score == pytest.approx(expected[doc_id], rel=1e-5)
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("The GPT-4 and bert_base models, v3.5!") == [
+        "gpt-4", "bert_base", "models", "v3.5"
+    ]
+
+
+@pytest.mark.parametrize("gap, width", [(200, 1), (60_000, 2), (70_000, 4)])
+def test_postings_round_trip(gap, width):
+
+    docs = np.array([3, 4, 4 + gap, 5 + gap], dtype=np.int64)
+    tfs = np.array([1, 2, 300, 7], dtype=np.float32)
+
+    doc_blob, tf_blob = _encode_postings(docs, tfs)
+
+    assert doc_blob[0] == width
+    assert len(doc_blob) == 1 + width * len(docs)
+
+    decoded_docs, decoded_tfs = _decode_postings(doc_blob, tf_blob)
+
+    assert decoded_docs.tolist() == docs.tolist()
+    # Term frequencies saturate at 255
+    assert decoded_tfs.tolist() == [1, 2, 255, 7]
+
+
+def test_scores_match_bm25_before_and_after_flush(tmp_path):
+
+    index = BM25Index(str(tmp_path))
+    index.add(list(DOCS), list(DOCS.values()))
+
+    # Buffered postings are searchable before they are merged
+    assert_scores(index, DOCS, "lithium recycling batteries")
+
+    index.flush()
+    assert_scores(index, DOCS, "lithium recycling batteries")
+    assert_scores(index, DOCS, "gpt-4 3.5")
+
+    reopened = BM25Index(str(tmp_path))
+    assert reopened.count() == 4
+    assert_scores(reopened, DOCS, "lithium recycling batteries")
+
+
+def test_postings_merge_across_flushes(tmp_path):
+
+    index = BM25Index(str(tmp_path))
+    index.add(["a", "b"], [DOCS["a"], DOCS["b"]])
+    index.flush()
+    index.add(["c", "d"], [DOCS["c"], DOCS["d"]])
+    index.flush()
+
+    assert_scores(BM25Index(str(tmp_path)), DOCS, "recycling spent batteries")
+
+
+def test_readd_replaces_and_delete_removes(tmp_path):
+
+    index = BM25Index(str(tmp_path), compact_ratio=1.0)
+    index.add(list(DOCS), list(DOCS.values()))
+    index.flush()
+
+    changed = dict(DOCS, a="Sodium batteries need no lithium at all.")
+    index.add(["a"], [changed["a"]])
+    index.delete(["d"])
+    del changed["d"]
+    index.flush()
+
+    assert index.count() == 3
+    assert_scores(index, changed, "lithium recycling batteries")
+    assert_scores(BM25Index(str(tmp_path)), changed, "sodium spent")
+
+
+def test_tombstones_are_purged_from_postings(tmp_path):
+
+    index = BM25Index(str(tmp_path), compact_ratio=0.3)
+    index.add(list(DOCS), list(DOCS.values()))
+    index.flush()
+
+    index.delete(["a", "b"])
+    index.flush()
+
+    conn = index._conn
+    assert conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0] == 2
+    assert conn.execute("SELECT 1 FROM postings WHERE term = 'lithium'").fetchone() is None
+
+    docs, _ = _decode_postings(*conn.execute(
+        "SELECT docs, tfs FROM postings WHERE term = 'recycling'"
+    ).fetchone())
+    assert docs.tolist() == [2]
+
+    remaining = {k: DOCS[k] for k in ("c", "d")}
+    assert_scores(index, remaining, "recycling batteries")
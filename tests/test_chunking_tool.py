@@ -0,0 +1,71 @@
+import json
+import logging
+from unittest.mock import MagicMock
+
+import huggingface_hub
+import pytest
+import transformers
+
+from tools.chunking_tool import TextChunker
+
+
+@pytest.fixture
+def hub(monkeypatch, tmp_path):
+    """
+    An offline model hub: a BERT tokenizer reading 512 tokens, and the
+    sentence-transformers config of the model (max_seq_length 256).
+    """
+
+    tokenizer = MagicMock(model_max_length=512)
+    monkeypatch.setattr(
+        transformers.AutoTokenizer, "from_pretrained", MagicMock(return_value=tokenizer)
+    )
+
+    config = tmp_path / "sentence_bert_config.json"
+    config.write_text(json.dumps({"max_seq_length": 256}))
+
+    def download(repo_id, filename):
+        if filename != config.name:
+            raise FileNotFoundError(filename)
+        return str(config)
+
+    monkeypatch.setattr(huggingface_hub, "hf_hub_download", download)
+
+    return config
+
+
+def test_chunk_size_is_capped_at_what_the_model_reads(hub):
+
+    chunker = TextChunker(chunk_size=400)
+
+    assert chunker.params()["chunk_size"] == 254
+    assert TextChunker(chunk_size=128).params()["chunk_size"] == 128
+
+
+def test_tokenizer_limit_applies_without_a_model_config(hub):
+
+    hub.unlink()
+
+    assert TextChunker(chunk_size=600).params()["chunk_size"] == 510
+
+
+def test_missing_tokenizer_is_logged_and_falls_back(monkeypatch, caplog):
+
+    monkeypatch.setattr(
+        transformers.AutoTokenizer, "from_pretrained", MagicMock(side_effect=OSError("offline"))
+    )
+
+    with caplog.at_level(logging.WARNING, logger="tools.chunking_tool"):
+        params = TextChunker().params()
+
+    assert params["tokenizer"] == "regex"
+    assert "offline" in caplog.text
+
+
+def test_mostly_whitespace_chunks_are_dropped():
+
+    chunker = TextChunker(chunk_size=8, overlap=0, tokenizer=None, min_chars=20)
+    text = "Hi." + " " * 200 + "\n\tOk. This sentence is long enough to be kept as a chunk."
+
+    # The first span is over 200 characters long, but reads "Hi. Ok."
+    assert chunker.chunk_text(text) == ["This sentence is long enough to be kept"]
@@ -0,0 +1,59 @@
+import numpy as np
+
+from tools.clustering_tool import InsightClusterer
+
+
+def blobs(n, centres=5, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    middles = rng.normal(scale=50, size=(centres, dim))
+    return (middles[np.arange(n) % centres] + rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def clusterer(**kwargs):
+    # model: never used, embeddings are passed in
+    return InsightClusterer(model=object(), pca_components=0, **kwargs)
+
+
+def test_warm_fit_refines_previous_clusters():
+
+    c = clusterer()
+
+    first = c.fit(blobs(40))
+    again = c.fit(blobs(40, seed=0) + 0.01)
+
+    assert first["k"] == 5
+    assert again["warm_started"] and again["k"] == 5
+
+
+def test_fit_with_no_more_points_than_clusters_is_cold():
+
+    # Size alone wouldn't force a cold fit
+    c = clusterer(refit_ratio=10)
+    assert c.fit(blobs(20))["k"] == 5
+
+    # Five points, k=5 from the previous fit: silhouette is undefined
+    fit = c.fit(blobs(5, seed=1))
+
+    assert not fit["warm_started"]
+    assert fit["k"] < 5
+    assert len(fit["labels"]) == 5
+
+
+def test_large_change_in_size_searches_k_again():
+
+    c = clusterer()
+    c.fit(blobs(200, centres=5))
+
+    fit = c.fit(blobs(30, centres=2, seed=1))
+
+    assert not fit["warm_started"]
+    assert fit["k"] == 2
+
+
+def test_score_is_neutral_outside_silhouette_range():
+
+    c = clusterer()
+    vectors = blobs(4)
+
+    assert c._score(vectors, np.zeros(4, dtype=int)) == 0.0
+    assert c._score(vectors, np.arange(4)) == 0.0
@@ -0,0 +1,84 @@
+import numpy as np
+
+from tools.dedup_tool import NearDuplicateFilter
+
+FOOTER = (
+    "Copyright 2024 Journal of Battery Research. All rights reserved. "
+    "Reproduction of this article without permission of the publisher is "
+    "prohibited. Visit the journal website for terms of use and licensing."
+)
+
+BODY = [
+    "Hydrometallurgical recycling recovers over ninety percent of the lithium "
+    "contained in spent cathodes, according to the pilot plant measurements.",
+    "Collection rates of spent batteries remain low across Europe, which limits "
+    "the feedstock available to recycling plants in the coming decade.",
+]
+
+
+def meta(source, chunk_id, page):
+    return {"source": source, "chunk_id": chunk_id, "page_number": page}
+
+
+def test_similar_texts_share_most_of_their_signature(tmp_path):
+
+    dedup = NearDuplicateFilter(str(tmp_path / "dedup.sqlite"))
+
+    same = dedup.signature(FOOTER)
+    near = dedup.signature(FOOTER.replace("2024", "2023"))
+    other = dedup.signature(BODY[0])
+
+    assert same.dtype == np.uint32 and len(same) == 128
+    assert np.array_equal(same, dedup.signature(FOOTER.upper()))
+    assert np.mean(same == near) > 0.6
+    assert np.mean(same == other) < 0.1
+
+
+def test_duplicates_are_dropped_within_and_across_batches(tmp_path):
+
+    path = str(tmp_path / "dedup.sqlite")
+    dedup = NearDuplicateFilter(path)
+
+    kept, duplicates = dedup.filter(
+        ["a_0", "a_1", "a_2"],
+        [BODY[0], FOOTER, FOOTER],
+        [meta("a.pdf", "a_0", 1), meta("a.pdf", "a_1", 1), meta("a.pdf", "a_2", 2)]
+    )
+
+    assert kept == [0, 1]
+    assert duplicates == [(2, "a_1", 1.0)]
+
+    # Another document, another run: matched against the stored signatures
+    dedup = NearDuplicateFilter(path)
+    kept, duplicates = dedup.filter(
+        ["b_0", "b_1"],
+        [BODY[1], FOOTER + " Page 3."],
+        [meta("b.pdf", "b_0", 1), meta("b.pdf", "b_1", 3)]
+    )
+
+    assert kept == [0]
+    assert [d[:2] for d in duplicates] == [(1, "a_1")]
+    assert duplicates[0][2] >= dedup.threshold
+
+    assert dedup.locations(["a_1", "a_0"]) == {"a_1": [
+        {"source": "a.pdf", "chunk_id": "a_2", "page_number": 2},
+        {"source": "b.pdf", "chunk_id": "b_1", "page_number": 3},
+    ]}
+    assert dedup.savings()["duplicate_chunks"] == 2
+
+
+def test_forgetting_a_source_releases_its_duplicates(tmp_path):
+
+    dedup = NearDuplicateFilter(str(tmp_path / "dedup.sqlite"))
+
+    dedup.filter(["a_0"], [FOOTER], [meta("a.pdf", "a_0", 1)])
+    dedup.filter(["b_0"], [FOOTER], [meta("b.pdf", "b_0", 1)])
+    dedup.filter(["c_0"], [FOOTER], [meta("c.pdf", "c_0", 1)])
+
+    # b and c point at a's chunk: they must be re-indexed with it
+    assert dedup.dependents(["a.pdf"]) == ["b.pdf", "c.pdf"]
+
+    dedup.forget_sources(["a.pdf", "b.pdf", "c.pdf"])
+
+    assert dedup.locations(["a_0"]) == {}
+    assert dedup.filter(["b_0"], [FOOTER], [meta("b.pdf", "b_0", 1)]) == ([0], [])
@@ -0,0 +1,66 @@
+import re
+
+from memory.evidence_packer import EvidencePacker, TokenCounter
+from memory.knowledge_store import KnowledgeStore
+from memory.research_state import ResearchState
+
+CHUNKS = {
+    "a.pdf_chunk_0": "Hydrometallurgical recycling recovers most of the lithium.",
+    "a.pdf_chunk_1": "Pyrometallurgical plants lose lithium to the slag.",
+    "b.pdf_chunk_0": "Recycling costs fell by a third after switching suppliers.",
+    "b.pdf_chunk_1": "Collection rates of spent batteries remain low in Europe.",
+}
+
+
+def retrieved(store, representatives, label=0):
+    """
+    What ResearchFlow registers: every retrieved chunk, then the cluster
+    representatives as insights.
+    """
+
+    for chunk_id, text in CHUNKS.items():
+        store.add_pdf_chunk(chunk_id, chunk_id.split("_")[0], text)
+
+    for chunk_id in representatives:
+        store.add_document_insight({
+            "document_title": f"Cluster {label}",
+            "key_findings": CHUNKS[chunk_id],
+            "source_file": chunk_id.split("_")[0],
+            "chunk_id": chunk_id,
+            "cluster_id": label,
+            "cluster_size": 2,
+            "confidence_level": "Medium",
+        })
+
+
+def packer():
+    return EvidencePacker(counter=TokenCounter(), budgets={"web": 1000, "document": 1000})
+
+
+def test_document_task_gets_each_representative_once():
+
+    store = KnowledgeStore(ResearchState())
+    retrieved(store, ["a.pdf_chunk_0", "b.pdf_chunk_0"])
+
+    # A later iteration relabels the clusters and re-adds a representative
+    retrieved(store, ["a.pdf_chunk_0"], label=3)
+
+    text = packer().pack_tasks(store, ["lithium recycling"])["document"]["text"]
+
+    for chunk_id, chunk in CHUNKS.items():
+        expected = 1 if chunk_id.endswith("_0") else 0
+        assert text.count(chunk) == expected, chunk_id
+
+    assert sorted(re.findall(r"\[(\w\d+)\|", text)) == ["D1", "D2"]
+
+
+def test_chunks_with_an_insight_are_not_packed_again():
+
+    store = KnowledgeStore(ResearchState())
+    retrieved(store, ["a.pdf_chunk_0"])
+
+    packed = packer().pack(store, ["lithium"], ("pdf", "insight"), budget=1000)
+
+    assert packed["total"] == 4
+    for chunk in CHUNKS.values():
+        assert packed["text"].count(chunk) == 1
@@ -0,0 +1,114 @@
+import os
+
+from tools.ingestion_manifest import IngestionManifest
+
+PARAMS = {"chunk_size": 128, "overlap": 16, "tokenizer": "regex", "min_chars": 50}
+
+
+def write(path, content: bytes, mtime_ns=None):
+    path.write_bytes(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def indexed(tmp_path, *files, params=PARAMS):
+    """
+    A saved manifest with every file recorded, reloaded from disk.
+    """
+
+    manifest_path = str(tmp_path / "db" / "manifest.json")
+    manifest = IngestionManifest(manifest_path, chunker_params=params)
+
+    for n, file_path in enumerate(files):
+        manifest.record(file_path, [f"chunk_{n}_0", f"chunk_{n}_1"])
+    manifest.save()
+
+    return manifest_path
+
+
+def test_unchanged_files_are_skipped_after_reload(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a")
+    b = write(tmp_path / "b.pdf", b"%PDF b")
+    path = indexed(tmp_path, a, b)
+
+    manifest = IngestionManifest(path, chunker_params=dict(PARAMS))
+
+    assert manifest.plan([a, b]) == ([], [a, b], [])
+    assert manifest.chunk_ids(b) == ["chunk_1_0", "chunk_1_1"]
+
+
+def test_changed_chunker_params_reindex_everything(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a")
+    path = indexed(tmp_path, a)
+
+    manifest = IngestionManifest(path, chunker_params=dict(PARAMS, chunk_size=254))
+
+    assert manifest.plan([a]) == ([a], [], [])
+
+
+def test_changed_content_is_reindexed(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a", mtime_ns=1_000_000_000)
+    path = indexed(tmp_path, a)
+
+    # Same size, new mtime, different bytes
+    write(tmp_path / "a.pdf", b"%PDF A", mtime_ns=2_000_000_000)
+
+    assert IngestionManifest(path, chunker_params=PARAMS).plan([a]) == ([a], [], [])
+
+
+def test_touched_file_with_same_content_is_kept(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a", mtime_ns=1_000_000_000)
+    path = indexed(tmp_path, a)
+
+    os.utime(a, ns=(2_000_000_000, 2_000_000_000))
+
+    manifest = IngestionManifest(path, chunker_params=PARAMS)
+    assert manifest.plan([a]) == ([], [a], [])
+
+    # The new mtime is remembered: no hashing on the next run
+    assert manifest.files[manifest._key(a)]["mtime_ns"] == 2_000_000_000
+
+
+def test_size_change_is_reindexed_even_with_same_mtime(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a", mtime_ns=1_000_000_000)
+    path = indexed(tmp_path, a)
+
+    write(tmp_path / "a.pdf", b"%PDF a, appended", mtime_ns=1_000_000_000)
+
+    assert IngestionManifest(path, chunker_params=PARAMS).plan([a]) == ([a], [], [])
+
+
+def test_removed_files_are_reported_and_forgotten(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a")
+    b = write(tmp_path / "b.pdf", b"%PDF b")
+    path = indexed(tmp_path, a, b)
+
+    manifest = IngestionManifest(path, chunker_params=PARAMS)
+    os.remove(b)
+
+    to_index, unchanged, removed = manifest.plan([a])
+
+    assert removed == [manifest._key(b)]
+    assert manifest.forget(removed[0]) == ["chunk_1_0", "chunk_1_1"]
+    assert manifest.chunk_ids(b) == []
+
+
+def test_other_manifest_versions_are_ignored(tmp_path):
+
+    a = write(tmp_path / "a.pdf", b"%PDF a")
+    path = indexed(tmp_path, a)
+
+    with open(path, "r+", encoding="utf-8") as f:
+        content = f.read().replace('"version": 1', '"version": 0')
+        f.seek(0)
+        f.write(content)
+        f.truncate()
+
+    assert IngestionManifest(path, chunker_params=PARAMS).plan([a]) == ([a], [], [])
@@ -0,0 +1,32 @@
+from memory.knowledge_store import KnowledgeStore
+from memory.research_state import ResearchState
+
+
+def claim(text, source="https://example.org/a", score=0.5):
+    return {"claim": text, "source": source, "credibility_score": score}
+
+
+def test_task_claims_are_kept_next_to_snippets_of_the_same_source():
+
+    store = KnowledgeStore(ResearchState())
+
+    # Search snippet first, then what the web task extracted from the page
+    store.add_web_claim(claim("Recycling recovers 95% of lithium ..."))
+    store.add_web_claim(claim("Hydrometallurgy recovers 95% of the lithium.", score=0.8))
+
+    assert [c.claim for c in store.state.web_claims] == [
+        "Recycling recovers 95% of lithium ...",
+        "Hydrometallurgy recovers 95% of the lithium.",
+    ]
+    assert store.state.web_sources_seen == {"https://example.org/a"}
+
+
+def test_repeated_claims_are_dropped():
+
+    store = KnowledgeStore(ResearchState())
+
+    store.add_web_claim(claim("Costs fell by a third."))
+    store.add_web_claim(claim("  costs fell BY a third. "))
+    store.add_web_claim(claim("Costs fell by a third.", source="https://example.org/b"))
+
+    assert len(store.state.web_claims) == 2
@@ -0,0 +1,108 @@
+import copy
+
+import pytest
+
+from agents.llm_wrapper import CONTEXT_DIVIDER, CONTEXT_MARKER, ContextBudget
+from memory.evidence_packer import TokenCounter
+
+
+@pytest.fixture
+def budget():
+    # No such encoding: the 4-characters-per-token estimate, on any machine
+    counter = TokenCounter(encoding="no-such-encoding")
+    return ContextBudget(budgets={"report": 300}, counter=counter)
+
+
+def words(label, n):
+    return " ".join(f"{label}{i}" for i in range(n))
+
+
+def crew_messages(*segments, marker=True):
+    """
+    A crewAI task prompt: the task, then the upstream outputs.
+    """
+
+    task = "Write the report. " + words("task", 20)
+    context = CONTEXT_DIVIDER.join(segments)
+
+    return [
+        {"role": "system", "content": "You are the report writer. " + words("role", 30)},
+        {"role": "user", "content": (
+            task + "\n\n" + CONTEXT_MARKER + context if marker
+            else task + CONTEXT_DIVIDER + context
+        )},
+    ]
+
+
+def total(budget, messages):
+    return sum(budget.counter.count(m["content"]) for m in messages)
+
+
+def test_prompt_within_budget_is_untouched(budget):
+
+    messages = crew_messages("=== WEB ===\n" + words("w", 20))
+
+    assert budget.fit("report", messages) == (messages, 0)
+
+
+def test_over_budget_context_is_trimmed_longest_first(budget):
+
+    short = "=== PLAN ===\n" + words("p", 20)
+    web = "=== WEB ===\n" + words("w", 300) + " closing web sentence."
+    document = "=== DOCUMENT ===\n" + words("d", 200) + " closing document sentence."
+
+    messages = crew_messages(short, web, document)
+    original = copy.deepcopy(messages)
+
+    fitted, trimmed = budget.fit("report", messages)
+
+    # Copied, not changed
+    assert messages == original
+
+    assert trimmed == total(budget, messages) - total(budget, fitted)
+    assert total(budget, fitted) <= 300
+
+    # System prompt and task text are never cut
+    assert fitted[0] == messages[0]
+    head, _, context = fitted[1]["content"].partition(CONTEXT_MARKER)
+    assert head == messages[1]["content"].partition(CONTEXT_MARKER)[0]
+
+    plan, web_cut, document_cut = context.split(CONTEXT_DIVIDER)
+
+    # The short segment stays whole; the long ones keep their start and end
+    assert plan == short
+    for cut, full, end in ((web_cut, web, "closing web sentence."),
+                           (document_cut, document, "closing document sentence.")):
+        assert len(cut) < len(full)
+        assert cut.startswith(full.split("\n")[0])
+        assert cut.endswith(end)
+        assert "…" in cut
+
+
+def test_divider_without_marker_keeps_text_before_it(budget):
+
+    web = "=== WEB ===\n" + words("w", 400)
+    messages = crew_messages(web, marker=False)
+
+    fitted, trimmed = budget.fit("report", messages)
+
+    assert trimmed > 0
+    task, _, cut = fitted[1]["content"].partition(CONTEXT_DIVIDER)
+    assert task == messages[1]["content"].partition(CONTEXT_DIVIDER)[0]
+    assert len(cut) < len(web)
+
+
+def test_prompt_without_context_is_left_over_budget(budget):
+
+    messages = [{"role": "user", "content": words("x", 1000)}]
+
+    assert budget.fit("report", messages) == (messages, 0)
+
+
+def test_tasks_without_budget_and_plain_strings_pass_through(budget):
+
+    messages = crew_messages("=== WEB ===\n" + words("w", 1000))
+
+    assert budget.fit("planning", messages) == (messages, 0)
+    assert budget.fit(None, messages) == (messages, 0)
+    assert budget.fit("report", "a prompt") == ("a prompt", 0)
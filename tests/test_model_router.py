@@ -0,0 +1,203 @@
+from types import SimpleNamespace
+
+import pytest
+
+import agents.model_router as model_router
+from agents.llm_wrapper import TokenAccountingLLM
+from agents.model_router import ModelRouter
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+class FakeLLM:
+    """
+    Stand-in model: answers with its profile's model name after
+    `latency` seconds on the shared clock, or raises while `failing`.
+    While `cached`, answers at once as a cache hit.
+    """
+
+    def __init__(self, profile, clock):
+        self.model = profile["model"]
+        self.clock = clock
+        self.latency = 0.0
+        self.failing = False
+        self.cached = False
+        self.last_call_cached = False
+        self.stop = []
+        self.calls = 0
+
+    def call(self, messages, *args, **kwargs):
+        self.calls += 1
+        self.last_call_cached = self.cached
+
+        if self.cached:
+            return self.model
+
+        self.clock.now += self.latency
+
+        if self.failing:
+            raise TimeoutError(self.model)
+
+        return self.model
+
+
+PROFILES = {
+    "fast": {"model": "fast-model", "max_tokens": 100, "max_latency_s": 5, "max_error_rate": 0.5},
+    "standard": {
+        "model": "standard-model", "max_tokens": 200,
+        "max_latency_s": 5, "max_error_rate": 0.5, "fallback": "fast",
+    },
+    "long": {
+        "model": "long-model", "max_tokens": 400,
+        "max_latency_s": 5, "max_error_rate": 0.5, "fallback": "standard",
+    },
+}
+
+ROUTES = {"planning": "fast", "report": "long", "default": "standard"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(model_router, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def router(clock):
+    return ModelRouter(
+        profiles=PROFILES,
+        routes=ROUTES,
+        llm_factory=lambda profile: FakeLLM(profile, clock),
+        window=4,
+        min_samples=2,
+        cooldown_s=60
+    )
+
+
+def task(name):
+    return SimpleNamespace(name=name)
+
+
+def test_routes_by_task_then_agent_role_then_default(router):
+
+    assert router.call("hi", from_task=task("planning")) == "fast-model"
+    assert router.call("hi", from_task=task("report")) == "long-model"
+    assert router.call("hi", from_agent=SimpleNamespace(role="report")) == "long-model"
+    assert router.call("hi", from_task=task("unknown")) == "standard-model"
+
+    decisions = router.drain_decisions()
+    assert decisions[0] == "Model router: 'planning' → 'fast' (fast-model, max_tokens 100)."
+    assert router.drain_decisions() == []
+
+
+def test_failed_call_retries_down_the_fallback_chain(router):
+
+    router.llms["long"].failing = True
+    router.llms["standard"].failing = True
+
+    assert router.call("hi", from_task=task("report")) == "fast-model"
+    assert [router.llms[n].calls for n in ("long", "standard", "fast")] == [1, 1, 1]
+
+    decisions = router.drain_decisions()
+    assert "'long' call failed (TimeoutError); retrying on 'standard'." in decisions[-2]
+    assert "'standard' call failed (TimeoutError); retrying on 'fast'." in decisions[-1]
+
+
+def test_last_profile_failure_is_raised(router):
+
+    router.llms["fast"].failing = True
+
+    with pytest.raises(TimeoutError):
+        router.call("hi", from_task=task("planning"))
+
+
+def test_slow_profile_trips_and_is_probed_after_cooldown(router, clock):
+
+    router.llms["standard"].latency = 10
+
+    for _ in range(2):
+        assert router.call("hi") == "standard-model"
+
+    # Mean latency over the window exceeds max_latency_s
+    assert router.routing_stats()["standard"]["tripped"]
+    assert router.call("hi") == "fast-model"
+
+    clock.now += 59
+    assert router.call("hi") == "fast-model"
+
+    # Cooldown over: the profile gets traffic again, with a fresh window
+    clock.now += 2
+    router.llms["standard"].latency = 0
+    assert router.call("hi") == "standard-model"
+
+    stats = router.routing_stats()["standard"]
+    assert not stats["tripped"] and stats["recent_calls"] == 1
+    assert any("cooldown over" in d for d in router.drain_decisions())
+
+
+def test_cache_hits_do_not_mask_a_slow_provider(router):
+
+    standard = router.llms["standard"]
+    standard.latency = 10
+
+    # Instant cache hits, then real calls that are too slow
+    standard.cached = True
+    for _ in range(3):
+        assert router.call("hi") == "standard-model"
+        assert router.last_call_cached
+
+    assert router.routing_stats()["standard"]["recent_calls"] == 0
+
+    standard.cached = False
+    for _ in range(2):
+        router.call("hi")
+
+    stats = router.routing_stats()["standard"]
+    assert stats["mean_latency_s"] == 10
+    assert stats["tripped"]
+
+
+def test_error_rate_trips_profile(router):
+
+    router.llms["standard"].failing = True
+
+    for _ in range(2):
+        assert router.call("hi") == "fast-model"
+
+    assert router.routing_stats()["standard"]["error_rate"] == 1.0
+    assert router.routing_stats()["standard"]["tripped"]
+
+    # Tripped: no more calls reach it
+    router.call("hi")
+    assert router.llms["standard"].calls == 2
+
+
+def test_attribute_writes_reach_every_profile(router):
+
+    # crewAI sets stop words on the agent's LLM, here the accounting wrapper
+    llm = TokenAccountingLLM(router)
+    llm.stop = ["\nObservation:"]
+
+    assert all(l.stop == ["\nObservation:"] for l in router.llms.values())
+    assert llm.stop == ["\nObservation:"]
+
+
+def test_unknown_fallback_is_rejected(clock):
+
+    with pytest.raises(ValueError):
+        ModelRouter(
+            profiles={"a": {"model": "m", "max_tokens": 1, "fallback": "missing"}},
+            routes={"default": "a"},
+            llm_factory=lambda profile: FakeLLM(profile, clock)
+        )
@@ -0,0 +1,130 @@
+import os
+
+import numpy as np
+import pytest
+
+from tools.numpy_index import NumpyIndex
+from tools.quantized_index import QuantizedIndex
+
+
+def vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def fill(index, n=10):
+    data = vectors(n)
+    ids = [f"doc{i}" for i in range(n)]
+    index.upsert(ids, [f"text {i}" for i in range(n)], data, [{"i": i} for i in range(n)])
+    return ids, data
+
+
+def test_flush_compacts_past_ratio(tmp_path):
+
+    index = NumpyIndex(str(tmp_path), compact_ratio=0.2)
+    ids, data = fill(index)
+
+    # 30% tombstones: below delete's threshold, above flush's
+    index.delete(ids[:3])
+    assert index._info("n") == 10
+
+    index.flush()
+
+    assert index._info("n") == 7
+    assert index.count() == 7
+    assert index.vectors_path.endswith("vectors.1.f16")
+    assert not os.path.exists(tmp_path / "vectors.f16")
+
+    # Rows moved, records and vectors moved with them
+    found = index.get(["doc5", "doc9"], include_embeddings=True)
+    assert found["documents"] == ["text 5", "text 9"]
+    expected = data[[5, 9]] / np.linalg.norm(data[[5, 9]], axis=1, keepdims=True)
+    assert np.allclose(found["embeddings"], expected, atol=1e-3)
+
+    hits = index.search(data[[9]], top_k=1)
+    assert hits["ids"] == [["doc9"]]
+    assert hits["distances"][0][0] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_few_tombstones_are_kept_until_ratio(tmp_path):
+
+    index = NumpyIndex(str(tmp_path), compact_ratio=0.2)
+    ids, _ = fill(index)
+
+    index.delete(ids[:1])
+    index.flush()
+
+    assert index._info("n") == 10
+    assert index.count() == 9
+
+
+def test_delete_compacts_when_most_rows_are_dead(tmp_path):
+
+    index = NumpyIndex(str(tmp_path))
+    ids, data = fill(index)
+
+    index.delete(ids[:6])
+
+    assert index._info("n") == 4
+    assert index.search(data[[7]], top_k=4)["ids"][0][0] == "doc7"
+
+    # Appends continue after the compacted rows
+    assert index.upsert(["new"], ["new text"], vectors(1, seed=1), [{}]) == [4]
+    assert index.count() == 5
+
+
+def test_other_instances_follow_a_compaction(tmp_path):
+
+    writer = NumpyIndex(str(tmp_path))
+    ids, data = fill(writer)
+
+    reader = NumpyIndex(str(tmp_path))
+    assert reader.search(data[[8]], top_k=1)["ids"] == [["doc8"]]
+
+    assert writer.compact() == 0
+    writer.delete(ids[:2])
+    assert writer.compact() == 2
+
+    assert reader.search(data[[8]], top_k=1)["ids"] == [["doc8"]]
+    assert reader.count() == 8
+
+    reopened = NumpyIndex(str(tmp_path))
+    assert reopened.get(["doc0", "doc8"])["ids"] == ["doc8"]
+
+
+def test_quantized_codes_follow_compaction(tmp_path):
+
+    index = QuantizedIndex(str(tmp_path), mode="int8", train_min=5)
+    ids, data = fill(index, n=20)
+    index.flush()
+    assert index._codes_in_sync()
+
+    index.delete(ids[:12])
+
+    # Still searching the compressed codes, now renumbered
+    assert index._info("n") == 8
+    assert index._codes_in_sync()
+    assert len(index._codes) == 8
+    assert index.search(data[[15]], top_k=1)["ids"] == [["doc15"]]
+
+    index.flush()
+    reopened = QuantizedIndex(str(tmp_path), mode="int8", train_min=5)
+    reopened._refresh()
+    assert reopened._codes_in_sync()
+    assert reopened.search(data[[15]], top_k=1)["ids"] == [["doc15"]]
+
+
+def test_hnsw_graph_is_rebuilt_after_compaction(tmp_path):
+
+    pytest.importorskip("hnswlib")
+
+    index = NumpyIndex(str(tmp_path), hnsw_threshold=5)
+    ids, data = fill(index, n=20)
+    index.flush()
+    assert index._hnsw_in_sync()
+
+    index.delete(ids[:12])
+
+    # Graph labels are row numbers: rebuilt over the renumbered rows
+    assert index._hnsw_in_sync()
+    assert index._hnsw.get_current_count() == 8
+    assert index.search(data[[15]], top_k=1)["ids"] == [["doc15"]]
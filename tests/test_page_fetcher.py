@@ -0,0 +1,153 @@
+import pytest
+
+from tools.disk_cache import DiskCache
+from tools.page_fetcher import PageFetcher, TextExtractor
+
+ARTICLE = (
+    "<html><head><title> Battery  Recycling </title>"
+    "<script>var tracking = 'Paragraph text that must never show up anywhere';</script>"
+    "</head><body>"
+    "<header><nav><a href='/'>Home</a> <a href='/about'>About us and our long story</a></nav></header>"
+    "<main><h1>Recovery rates</h1>"
+    "<p>Hydrometallurgical recycling recovers over ninety percent of the lithium.</p>"
+    "<p>Too short.</p>"
+    "<p><a href='/a'>Related article one</a> <a href='/b'>Related article two</a> and more</p>"
+    "<p>Café owners report that costs fell by a third after switching suppliers.</p>"
+    "</main><footer><p>Copyright notice, cookie settings and privacy terms for everyone.</p></footer>"
+    "</body></html>"
+)
+
+
+def extract(html: str, **kwargs) -> TextExtractor:
+    extractor = TextExtractor(**kwargs)
+    extractor.feed(html)
+    extractor.close()
+    return extractor
+
+
+def test_extractor_keeps_main_text_only():
+
+    extractor = extract(ARTICLE)
+
+    assert extractor.title == " Battery  Recycling "
+    assert extractor.blocks == [
+        "Recovery rates",
+        "Hydrometallurgical recycling recovers over ninety percent of the lithium.",
+        "Café owners report that costs fell by a third after switching suppliers.",
+    ]
+
+
+def test_extractor_stops_at_max_chars():
+
+    extractor = extract(ARTICLE, max_chars=40)
+
+    assert extractor.full
+    assert len(extractor.text()) <= 40
+
+
+@pytest.fixture
+def site(stub_server):
+    """
+    Pages /page/<n> with an ETag (304 on a match), a Latin-1 page, a PDF
+    and a page of 2 MB.
+    """
+
+    def respond(handler, body):
+
+        path = handler.path
+
+        if path == "/latin1":
+            return 200, {"Content-Type": "text/html; charset=iso-8859-1"}, ARTICLE.encode("latin-1")
+
+        if path == "/file.pdf":
+            return 200, {"Content-Type": "application/pdf"}, b"%PDF-1.4"
+
+        if path == "/big":
+            paragraph = "<p>" + "word " * 20 + "</p>"
+            return 200, {"Content-Type": "text/html"}, (paragraph * 20_000).encode()
+
+        etag = f'"{path}"'
+        if handler.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+
+        return 200, {"Content-Type": "text/html; charset=utf-8", "ETag": etag}, ARTICLE.encode()
+
+    return stub_server(respond, delay=0.1)
+
+
+@pytest.fixture
+def fetcher_for():
+
+    fetchers = []
+
+    def build(**kwargs):
+        fetchers.append(PageFetcher(**kwargs))
+        return fetchers[-1]
+
+    yield build
+
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def test_fetches_concurrently_within_per_host_limit(site, fetcher_for):
+
+    fetcher = fetcher_for(per_host=2)
+
+    pages = fetcher.fetch_many([f"{site.url}/page/{i}" for i in range(6)] + ["ftp://x/y"])
+
+    assert len(pages) == 6
+    assert site.max_in_flight == 2
+    assert all(p["title"] == "Battery Recycling" and not p["cached"] for p in pages)
+    assert "ninety percent" in pages[0]["text"]
+
+
+def test_charset_from_headers_is_used(site, fetcher_for):
+
+    page = fetcher_for().fetch_many([f"{site.url}/latin1"])[0]
+
+    assert "Café owners" in page["text"]
+
+
+def test_unsupported_content_type_is_an_error(site, fetcher_for):
+
+    page = fetcher_for().fetch_many([f"{site.url}/file.pdf"])[0]
+
+    assert page["error"].startswith("ValueError: unsupported content type")
+
+
+def test_body_is_cut_off_at_max_bytes(site, fetcher_for):
+
+    page = fetcher_for(max_bytes=50_000).fetch_many([f"{site.url}/big"])[0]
+
+    assert page["truncated"]
+    assert page["bytes"] < 200_000
+
+
+def test_fresh_pages_come_from_cache(site, fetcher_for, tmp_path):
+
+    cache = DiskCache(str(tmp_path / "pages.sqlite"))
+    url = f"{site.url}/page/1"
+
+    first = fetcher_for(cache=cache).fetch_many([url])[0]
+    again = fetcher_for(cache=cache).fetch_many([url])[0]
+
+    assert len(site.requests) == 1
+    assert again["cached"]
+    assert again["content_hash"] == first["content_hash"]
+
+
+def test_stale_pages_are_revalidated_with_etag(site, fetcher_for, tmp_path):
+
+    cache = DiskCache(str(tmp_path / "pages.sqlite"))
+    url = f"{site.url}/page/1"
+
+    first = fetcher_for(cache=cache, fresh_for=0).fetch_many([url])[0]
+    again = fetcher_for(cache=cache, fresh_for=0).fetch_many([url])[0]
+
+    assert len(site.requests) == 2
+    assert site.requests[1][2]["If-None-Match"] == '"/page/1"'
+
+    # 304: the stored text is reused
+    assert again["cached"]
+    assert again["text"] == first["text"]
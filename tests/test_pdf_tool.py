@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from tools.chunking_tool import TextChunker
+from tools.pdf_tool import PDFProcessor
+
+fitz = pytest.importorskip("fitz")
+
+
+class SlowChunker(TextChunker):
+    """
+    Takes `delay` seconds per page, in the extraction workers too.
+    """
+
+    def __init__(self, delay: float):
+        super().__init__(tokenizer=None)
+        self.delay = delay
+
+    def chunk_spans(self, text):
+        time.sleep(self.delay)
+        return super().chunk_spans(text)
+
+
+def make_pdf(path, pages: int) -> str:
+
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_text(
+            (72, 72),
+            f"Page {n + 1}. Retrieval quality depends on how the corpus is chunked and indexed.",
+            fontsize=9
+        )
+    doc.save(str(path))
+    doc.close()
+
+    return str(path)
+
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+
+    processor = PDFProcessor(workers=2, pages_per_task=2)
+    processor.chunker = TextChunker(tokenizer=None)
+
+    paths = [make_pdf(tmp_path / f"{n}.pdf", pages) for n, pages in enumerate((5, 1, 3))]
+
+    results = processor.extract_many(paths)
+
+    assert [r["file_path"] for r in results] == paths
+    for path, result in zip(paths, results):
+        assert result == processor.extract_text_and_chunks(path)
+
+
+def test_deadline_covers_the_whole_file(tmp_path):
+
+    processor = PDFProcessor(workers=2, pages_per_task=1, timeout=1.5)
+    processor.chunker = SlowChunker(delay=0.5)
+
+    # Every range finishes well within the timeout; the file as a whole can't
+    slow = make_pdf(tmp_path / "slow.pdf", pages=10)
+    quick = make_pdf(tmp_path / "quick.pdf", pages=1)
+
+    start = time.monotonic()
+    results = processor.extract_many([slow, quick])
+    elapsed = time.monotonic() - start
+
+    assert results[0] == {"file_path": slow, "error": "Timed out after 1.5s"}
+    assert "error" not in results[1] and results[1]["chunks"]
+
+    # The slow file's remaining ranges were dropped, not run to the end
+    assert elapsed < 10 * 0.5 / 2
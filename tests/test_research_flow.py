@@ -0,0 +1,154 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import flows.research_flow as research_flow
+from flows.research_flow import ResearchFlow
+
+
+def task(raw):
+    return SimpleNamespace(output=SimpleNamespace(raw=raw))
+
+
+class FakeCrew:
+    """
+    ResearchCrew stand-in: the plan and stage outputs come from scripts,
+    one entry per iteration.
+    """
+
+    plans = []
+    conflicts = []
+    built = []
+
+    def __init__(self, query, follow_ups=None, prior_conflicts=None, evidence=None, plan_task=None):
+        self.follow_ups = follow_ups or []
+        self.plan_task = plan_task
+        FakeCrew.built.append(self)
+
+    def build_planning(self):
+        return None, {"planning": task(json.dumps(FakeCrew.plans.pop(0)))}
+
+    def build(self):
+        conflicts = FakeCrew.conflicts.pop(0)
+
+        return None, {
+            "web": task("[]"),
+            "document": task("[]"),
+            "conflict": task(json.dumps({
+                "conflicts_detected": bool(conflicts),
+                "conflict_details": [
+                    {"issue": issue, "conflicting_sources": [], "severity": "High"}
+                    for issue in conflicts
+                ],
+            })),
+        }
+
+    def build_report(self, evidence):
+        return None, {"report": task("Report.")}
+
+    def kickoff(self, crew):
+        return None
+
+
+@pytest.fixture
+def flow(monkeypatch):
+
+    for name in (
+        "PDFProcessor", "VectorStore", "IngestionManifest", "IngestionPipeline",
+        "NearDuplicateFilter", "InsightClusterer", "EvidencePacker", "WebScoutAgent",
+    ):
+        monkeypatch.setattr(research_flow, name, MagicMock())
+
+    fake_llm = MagicMock(mode="off")
+    fake_llm.drain_decisions.return_value = []
+    fake_llm.usage_summary.return_value = {"totals": {
+        "calls": 0, "cached_calls": 0, "prompt_tokens": 0,
+        "completion_tokens": 0, "trimmed_tokens": 0, "cost_usd": 0.0,
+    }}
+    fake_llm.routing_stats.return_value = {}
+    fake_llm.cache.stats.return_value = {}
+    monkeypatch.setattr(research_flow, "llm", fake_llm)
+
+    FakeCrew.plans, FakeCrew.conflicts, FakeCrew.built = [], [], []
+    monkeypatch.setattr(research_flow, "ResearchCrew", FakeCrew)
+
+    flow = ResearchFlow()
+    flow.pdf_indexed = True
+    flow.web_scout.perform_search.return_value = []
+    flow.web_scout.fetch_pages.return_value = []
+    flow.web_scout.search_tool.cache_stats.return_value = {}
+    flow.vector_store.query_many.return_value = {
+        "documents": [], "ids": [], "metadatas": [], "embeddings": None, "queries": []
+    }
+    flow.evidence_packer.pack_tasks.return_value = {}
+    flow.state.query = "battery recycling"
+
+    return flow
+
+
+def test_sub_questions_reach_retrieval(flow):
+
+    FakeCrew.plans = [{"sub_questions": ["cost of recycling", {"question": "lithium yield"}]}]
+    FakeCrew.conflicts = [[]]
+
+    flow.execute_research(flow.state)
+
+    queries = flow.vector_store.query_many.call_args.args[0]
+    assert queries == ["battery recycling", "cost of recycling", "lithium yield"]
+
+    # The stage crew reads the plan that was run ahead of it
+    stage_crew = FakeCrew.built[1]
+    assert stage_crew.plan_task.output.raw.startswith("{")
+    assert flow.state.research_plan["sub_questions"][0] == "cost of recycling"
+
+
+def test_sub_questions_reach_web_search(flow):
+
+    FakeCrew.plans = [{"sub_questions": ["cost of recycling", "lithium yield"]}]
+    FakeCrew.conflicts = [[]]
+
+    flow.execute_research(flow.state)
+
+    query, sub_questions = flow.web_scout.perform_search.call_args.args
+    assert query == "battery recycling"
+    assert sub_questions == ["battery recycling", "cost of recycling", "lithium yield"]
+    assert flow.web_scout.perform_search.call_args.kwargs["variants"] is True
+
+
+def test_follow_up_iteration_keeps_query_and_uses_replanned_questions(flow):
+
+    FakeCrew.plans = [
+        {"sub_questions": ["cost of recycling"]},
+        {"sub_questions": ["Which studies report 95% recovery?"]},
+    ]
+    FakeCrew.conflicts = [["Recovery  rates disagree\n(90% vs 95%)"], []]
+
+    flow.execute_research(flow.state)
+
+    assert flow.state.recursion_count == 1
+    assert len(FakeCrew.built) == 5  # plan + stages per iteration, report
+
+    follow_up = [
+        "battery recycling",
+        "Recovery rates disagree (90% vs 95%)",
+        "Which studies report 95% recovery?",
+    ]
+
+    first, second = flow.vector_store.query_many.call_args_list
+    assert first.args[0] == ["battery recycling", "cost of recycling"]
+    assert second.args[0] == follow_up
+
+    search = flow.web_scout.perform_search.call_args_list[1]
+    assert search.args == ("battery recycling", follow_up)
+    assert search.kwargs["variants"] is False
+
+    packed = flow.evidence_packer.pack_tasks.call_args_list[1]
+    assert packed.args[1] == follow_up
+
+    # The follow-up plan extends the original one
+    assert flow.state.research_plan["sub_questions"] == ["cost of recycling"]
+    assert flow.state.research_plan["follow_up_questions"] == [
+        "Which studies report 95% recovery?"
+    ]
@@ -0,0 +1,221 @@
+from types import SimpleNamespace
+
+import pytest
+
+from crews.task_scheduler import TaskScheduler
+
+# crewAI's default for a task without explicit context
+UNSPECIFIED = object()
+
+
+def task(name, agent, context=()):
+    return SimpleNamespace(
+        name=name, agent=agent, async_execution=False, output=None,
+        context=list(context) if context is not UNSPECIFIED else UNSPECIFIED,
+    )
+
+
+def dag(*specs):
+    """
+    (name, agent, [context names] or UNSPECIFIED) -> ordered task dict.
+    """
+
+    tasks = {}
+    for name, agent, context in specs:
+        tasks[name] = task(
+            name, agent,
+            context if context is UNSPECIFIED else [tasks[c] for c in context]
+        )
+    return tasks
+
+
+def run(scheduled, max_parallel):
+    """
+    Replays crewAI's sequential process: async tasks start and keep
+    running until the next synchronous task, which waits for them first.
+    Checks that no task starts next to an agent it shares or an output it
+    reads, and returns the groups of tasks that ran together.
+    """
+
+    groups, running = [], []
+
+    for t in scheduled:
+
+        if not t.async_execution:
+            if running:
+                groups.append([r.name for r in running])
+            running = []
+
+        context = t.context if isinstance(t.context, list) else []
+        assert not any(c in running for c in context), t.name
+        assert not any(r.agent == t.agent for r in running), t.name
+
+        running.append(t)
+        assert len(running) <= max_parallel
+
+        if not t.async_execution:
+            groups.append([t.name])
+            running = []
+
+    if running:
+        groups.append([r.name for r in running])
+
+    return groups
+
+
+def research_crew():
+    return dag(
+        ("planning", "planner", []),
+        ("web", "scout", ["planning"]),
+        ("document", "specialist", ["planning"]),
+        ("conflict", "detector", ["web", "document"]),
+    )
+
+
+def test_levels_follow_context():
+
+    scheduler = TaskScheduler(research_crew(), max_parallel=2)
+
+    assert scheduler.levels() == [["planning"], ["web", "document"], ["conflict"]]
+
+
+def test_unspecified_context_depends_on_every_earlier_task():
+
+    tasks = dag(("a", 1, []), ("b", 2, []), ("c", 3, UNSPECIFIED))
+
+    scheduler = TaskScheduler(tasks, max_parallel=2)
+
+    assert scheduler.dependencies()["c"] == ["a", "b"]
+    assert scheduler.levels() == [["a", "b"], ["c"]]
+
+
+def test_context_on_a_later_task_is_rejected():
+
+    tasks = dag(("a", 1, []), ("b", 2, []))
+    tasks["a"].context = [tasks["b"]]
+
+    with pytest.raises(ValueError, match="comes later"):
+        TaskScheduler(tasks).levels()
+
+
+def test_batches_respect_agents_and_max_parallel():
+
+    tasks = dag(("a", 1, []), ("b", 1, []), ("c", 2, []), ("d", 3, []), ("e", 4, []))
+
+    assert TaskScheduler(tasks, max_parallel=2).batches() == [["a", "c"], ["b", "d"], ["e"]]
+    assert TaskScheduler(tasks, max_parallel=8).batches() == [["a", "c", "d", "e"], ["b"]]
+
+
+def test_research_crew_runs_web_and_document_together():
+
+    scheduler = TaskScheduler(research_crew(), max_parallel=2)
+    scheduled = scheduler.schedule()
+
+    assert [t.async_execution for t in scheduled] == [False, True, True, False]
+    assert run(scheduled, 2) == [["planning"], ["web", "document"], ["conflict"]]
+
+
+def test_barrier_only_where_the_next_batch_needs_one():
+
+    tasks = dag(
+        ("a", 1, []), ("b", 2, []),
+        ("c", 3, ["a"]), ("d", 4, ["a"]),
+        ("e", 5, ["c"]), ("f", 6, ["c"]),
+        ("g", 7, ["e", "f"]),
+    )
+    scheduled = TaskScheduler(tasks, max_parallel=4).schedule()
+
+    # c reads a, so it waits for a and b; e and f only read c, which has
+    # finished by then, so they start next to d
+    assert run(scheduled, 4) == [["a", "b"], ["c"], ["d", "e", "f"], ["g"]]
+
+
+def test_barrier_when_agents_overlap_or_limit_is_reached():
+
+    tasks = dag(
+        ("a", 1, []), ("b", 2, []),
+        ("c", 3, ["a"]), ("d", 4, ["a"]),
+        ("e", 5, ["c"]), ("f", 4, ["c"]),
+        ("g", 7, ["e", "f"]),
+    )
+
+    # f would run agent 4 next to d
+    assert run(TaskScheduler(tasks, max_parallel=4).schedule(), 4) == [
+        ["a", "b"], ["c"], ["d"], ["e"], ["f"], ["g"]
+    ]
+
+    tasks = dag(("a", 1, []), ("b", 2, []), ("c", 3, []), ("d", 4, []))
+
+    assert run(TaskScheduler(tasks, max_parallel=2).schedule(), 2) == [
+        ["a", "b"], ["c"], ["d"]
+    ]
+
+
+def test_kickoff_restores_flags_and_task_order():
+
+    tasks = dag(("a", 1, []), ("b", 2, []), ("c", 3, UNSPECIFIED))
+    scheduler = TaskScheduler(tasks, max_parallel=2)
+
+    scheduled = scheduler.schedule()
+    assert tasks["c"].context == [tasks["a"], tasks["b"]]
+
+    def kickoff(inputs=None):
+        # Outputs finish out of order; crewAI only reports the last ones
+        for name in ("b", "a", "c"):
+            tasks[name].output = f"{name} out"
+        return SimpleNamespace(tasks_output=["c out"])
+
+    result = scheduler.kickoff(SimpleNamespace(kickoff=kickoff, tasks=scheduled))
+
+    assert result.tasks_output == ["a out", "b out", "c out"]
+    assert [t.async_execution for t in tasks.values()] == [False, False, False]
+    assert tasks["c"].context is UNSPECIFIED
+
+
+def test_flags_are_restored_when_kickoff_fails():
+
+    tasks = research_crew()
+    tasks["web"].async_execution = "caller's"
+    scheduler = TaskScheduler(tasks, max_parallel=2)
+    scheduler.schedule()
+
+    def kickoff(inputs=None):
+        raise RuntimeError("LLM down")
+
+    with pytest.raises(RuntimeError):
+        scheduler.kickoff(SimpleNamespace(kickoff=kickoff))
+
+    assert tasks["web"].async_execution == "caller's"
+    assert tasks["document"].async_execution is False
+
+
+def test_schedule_passes_crew_validation():
+
+    crewai = pytest.importorskip("crewai")
+    from crewai.llms.base_llm import BaseLLM
+
+    class NoLLM(BaseLLM):
+        def call(self, *args, **kwargs):
+            raise AssertionError("not run")
+
+    agents = [
+        crewai.Agent(role=f"role {i}", goal="g", backstory="b", llm=NoLLM(model="none"))
+        for i in range(7)
+    ]
+
+    tasks = {}
+    for name, agent, context in (
+        ("a", 0, []), ("b", 1, []),
+        ("c", 2, ["a"]), ("d", 3, ["a"]),
+        ("e", 4, ["c"]), ("f", 5, ["c"]),
+        ("g", 6, ["e", "f"]),
+    ):
+        tasks[name] = crewai.Task(
+            description=name, expected_output="x", agent=agents[agent],
+            context=[tasks[c] for c in context]
+        )
+
+    scheduler = TaskScheduler(tasks, max_parallel=4)
+    crew = crewai.Crew(agents=agents, tasks=scheduler.schedule())
+
+    assert [t.description for t in crew.tasks if t.async_execution] == ["a", "b", "d", "e", "f"]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from tools.vector_index import ChromaIndex
+
+chromadb = pytest.importorskip("chromadb")
+
+VECTORS = np.asarray([[1.0, 0.0], [0.0, 2.0], [3.0, 3.0]], dtype=np.float32)
+
+
+def fill(index):
+    index.upsert(["a", "b", "c"], ["A", "B", "C"], VECTORS, [{"n": i} for i in range(3)])
+
+
+def test_chroma_distances_are_cosine(tmp_path):
+
+    index = ChromaIndex(str(tmp_path), "chunks")
+    fill(index)
+
+    results = index.search([[1.0, 1.0]], top_k=3)
+
+    assert index.space == "cosine"
+    assert results["ids"][0][0] == "c"
+    assert results["distances"][0] == pytest.approx([0.0, 0.2929, 0.2929], abs=1e-3)
+    assert results.get("embeddings") is None
+
+
+def test_legacy_l2_collection_reports_cosine_distances(tmp_path):
+
+    # Created the way older versions did: Chroma's default L2 space
+    chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection("chunks")
+
+    index = ChromaIndex(str(tmp_path), "chunks")
+    fill(index)
+
+    results = index.search([[2.0, 0.0]], top_k=3)
+
+    # L2 would rank b before c
+    assert index.space == "l2"
+    assert results["ids"][0] == ["a", "c", "b"]
+    assert results["documents"][0] == ["A", "C", "B"]
+    assert results["distances"][0] == pytest.approx([0.0, 1 - 2 ** -0.5, 1.0], abs=1e-5)
+    assert results["embeddings"] is None
+
+    with_vectors = index.search([[2.0, 0.0]], top_k=1, include_embeddings=True)
+    assert np.allclose(with_vectors["embeddings"][0][0], [1.0, 0.0])
@@ -0,0 +1,85 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from memory.knowledge_store import KnowledgeStore
+from memory.research_state import ResearchState
+from tools.embedding_service import EmbeddingService
+from tools.vector_store import VectorStore
+
+
+class HashModel:
+    """
+    Stand-in sentence model: a fixed pseudo-random vector per text.
+    """
+
+    def get_sentence_embedding_dimension(self):
+        return 16
+
+    def encode(self, texts, **kwargs):
+        return np.asarray([
+            np.random.default_rng(int(hashlib.md5(t.encode()).hexdigest()[:8], 16)).normal(size=16)
+            for t in texts
+        ], dtype=np.float32)
+
+
+class HashEmbeddingService(EmbeddingService):
+
+    def _load_model(self):
+        return HashModel()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = VectorStore(index_backend="numpy", path=str(tmp_path))
+    store.model = HashEmbeddingService("hash-model")
+    return store
+
+
+def test_web_chunk_ids_are_unique_across_pages(store):
+
+    first = store.add_web_page("https://a.org/x", "A", ["a0", "a1"], "hash-a")
+    second = store.add_web_page("https://b.org/y", "B", ["b0", "b1"], "hash-b")
+    store.flush()
+
+    metadatas = store.index.get(first + second)["metadatas"]
+    chunk_ids = [meta["chunk_id"] for meta in metadatas]
+
+    assert chunk_ids == first + second
+    assert len(set(chunk_ids)) == 4
+
+    # Every page's chunks reach the knowledge store (it dedups on chunk_id)
+    knowledge_store = KnowledgeStore(ResearchState())
+    for meta, text in zip(metadatas, ["a0", "a1", "b0", "b1"]):
+        knowledge_store.add_pdf_chunk(meta["chunk_id"], meta["source"], text)
+
+    assert len(knowledge_store.state.pdf_chunks) == 4
+
+
+def test_unchanged_page_is_skipped_and_shorter_page_drops_chunks(store):
+
+    url = "https://a.org/x"
+
+    assert store.add_web_page(url, "A", ["a0", "a1", "a2"], "v1") == [
+        f"{url}_web_0", f"{url}_web_1", f"{url}_web_2"
+    ]
+    assert store.add_web_page(url, "A", ["a0", "a1", "a2"], "v1") == []
+
+    store.add_web_page(url, "A", ["new"], "v2")
+
+    assert store.index.get([f"{url}_web_1", f"{url}_web_2"])["ids"] == []
+    assert store.index.get([f"{url}_web_0"])["documents"] == ["new"]
+
+
+def test_pages_stored_with_bare_chunk_ids_are_rewritten(store):
+
+    url = "https://a.org/x"
+
+    # How older versions stored a page
+    store.add_documents(["a0"], [{
+        "source": url, "chunk_id": "web_0", "content_hash": "v1", "chunk_count": 1,
+    }])
+
+    assert store.add_web_page(url, "A", ["a0"], "v1") == [f"{url}_web_0"]
+    assert store.index.get([f"{url}_web_0"])["metadatas"][0]["chunk_id"] == f"{url}_web_0"
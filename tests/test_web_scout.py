@@ -0,0 +1,30 @@
+from agents.web_scout import WebScoutAgent
+
+
+def scout(max_queries=12):
+    # search_queries only needs the query cap
+    agent = WebScoutAgent.__new__(WebScoutAgent)
+    agent.max_queries = max_queries
+    return agent
+
+
+def test_search_queries_fan_out_over_variants_and_sub_questions():
+
+    queries = scout().search_queries("solid state batteries", ["energy density", "", "cost"])
+
+    assert queries == [
+        "solid state batteries",
+        "solid state batteries research study",
+        "solid state batteries statistics",
+        "energy density",
+        "cost",
+    ]
+
+
+def test_search_queries_are_deduplicated_and_capped():
+
+    queries = scout(max_queries=4).search_queries(
+        "q", ["q", "a", "b", "c"], variants=False
+    )
+
+    assert queries == ["q", "a", "b", "c"]
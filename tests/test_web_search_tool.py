@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from tools.web_search_tool import AsyncSearchClient, SearchCache, TokenBucket, normalize_query
+
+
+def serper(handler, body):
+    """
+    Serper stand-in: two organic results per query, one shared by all
+    queries; queries containing "fail" get a 500.
+    """
+
+    query = json.loads(body)["q"]
+
+    if "fail" in query:
+        return 500, {}, b"{}"
+
+    organic = [
+        {"title": "Shared", "link": "https://example.org/shared", "snippet": query},
+        {"title": query, "link": f"https://example.org/{query.replace(' ', '-')}", "snippet": "s"},
+    ]
+
+    return 200, {"Content-Type": "application/json"}, json.dumps({"organic": organic}).encode()
+
+
+@pytest.fixture
+def client_for(stub_server):
+
+    clients = []
+
+    def build(delay=0.0, **kwargs):
+        server = stub_server(serper, delay=delay)
+        kwargs.setdefault("rate", 1000.0)
+        kwargs.setdefault("burst", 1000)
+        clients.append(AsyncSearchClient(api_key="key", base_url=server.url, **kwargs))
+        return clients[-1], server
+
+    yield build
+
+    for client in clients:
+        client.close()
+
+
+def test_normalize_query():
+    assert normalize_query("  What's   NEW in ＡＩ? ") == "what s new in ai"
+
+
+def test_results_are_merged_by_url(client_for):
+
+    client, server = client_for()
+
+    results = client.search_many(["solar cells", "wind power", "solar cells", " "])
+
+    assert len(server.requests) == 2
+    assert server.requests[0][2]["X-API-KEY"] == "key"
+
+    # Found by both queries: first, with both queries and the longest snippet
+    assert results[0]["url"] == "https://example.org/shared"
+    assert results[0]["queries"] == ["solar cells", "wind power"]
+    assert results[0]["snippet"] == "solar cells"
+    assert {r["url"] for r in results[1:]} == {
+        "https://example.org/solar-cells", "https://example.org/wind-power"
+    }
+
+
+def test_queries_run_concurrently_within_connection_limit(client_for):
+
+    client, server = client_for(delay=0.2, max_connections=3)
+
+    start = time.perf_counter()
+    client.search_many([f"query {i}" for i in range(6)])
+    elapsed = time.perf_counter() - start
+
+    assert server.max_in_flight == 3
+    # Two rounds of three, not six requests one after another
+    assert elapsed < 6 * 0.2
+
+
+def test_token_bucket_paces_requests():
+
+    async def acquire(n):
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    # The burst is free, every further token waits 1/rate
+    assert asyncio.run(acquire(2)) < 0.05
+    assert asyncio.run(acquire(6)) >= 4 / 20 * 0.9
+
+
+def test_client_requests_wait_on_the_bucket(client_for):
+
+    client, server = client_for(rate=10, burst=1)
+
+    start = time.perf_counter()
+    client.search_many([f"query {i}" for i in range(4)])
+
+    assert time.perf_counter() - start >= 3 / 10 * 0.9
+    assert len(server.requests) == 4
+
+
+def test_cache_answers_repeated_queries_without_requests(client_for, tmp_path):
+
+    cache = SearchCache(str(tmp_path / "search.sqlite"))
+    client, server = client_for(cache=cache)
+
+    first = client.search_many(["Solar cells?"])
+    again = client.search_many(["solar   CELLS"])
+
+    assert len(server.requests) == 1
+    assert [r["url"] for r in again] == [r["url"] for r in first]
+    assert again[0]["queries"] == ["solar   CELLS"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_cached_results_expire_after_ttl(client_for, tmp_path):
+
+    client, server = client_for(cache=SearchCache(str(tmp_path / "search.sqlite"), ttl=0.2))
+
+    client.search_many(["solar cells"])
+    client.search_many(["solar cells"])
+    assert len(server.requests) == 1
+
+    time.sleep(0.3)
+    client.search_many(["solar cells"])
+    assert len(server.requests) == 2
+
+
+def test_failed_queries_are_reported_and_not_cached(client_for, tmp_path):
+
+    client, server = client_for(cache=SearchCache(str(tmp_path / "search.sqlite")))
+
+    results = client.search_many(["solar cells", "fail here"])
+
+    assert results[-1]["query"] == "fail here"
+    assert results[-1]["error"].startswith("HTTPStatusError")
+
+    client.search_many(["solar cells", "fail here"])
+
+    # Only the failed query was sent again
+    assert [json.loads(r[3])["q"] for r in server.requests] == [
+        "solar cells", "fail here", "fail here"
+    ]
@@ -0,0 +1,412 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-_][a-z0-9]+)*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or "
+    "that the this to was were which with".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercased terms; keeps identifiers like "gpt-4", "3.5" or "bert_base" whole.
+    """
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _encode_postings(docs: np.ndarray, tfs: np.ndarray):
+    """
+    Delta-encode ascending doc numbers in the narrowest unsigned type;
+    term frequencies are capped at 255 (BM25 saturates long before).
+    """
+
+    gaps = np.diff(docs, prepend=0)
+    top = int(gaps.max()) if len(gaps) else 0
+
+    dtype = np.uint8 if top < 2 ** 8 else np.uint16 if top < 2 ** 16 else np.uint32
+
+    return (
+        bytes([np.dtype(dtype).itemsize]) + gaps.astype(dtype).tobytes(),
+        np.minimum(tfs, 255).astype(np.uint8).tobytes()
+    )
+
+
+def _decode_postings(doc_blob: bytes, tf_blob: bytes):
+
+    dtype = {1: np.uint8, 2: np.uint16, 4: np.uint32}[doc_blob[0]]
+
+    docs = np.cumsum(np.frombuffer(doc_blob, dtype=dtype, offset=1), dtype=np.int64)
+    tfs = np.frombuffer(tf_blob, dtype=np.uint8).astype(np.float32)
+
+    return docs, tfs
+
+
+class BM25Index:
+    """
+    Persistent BM25 inverted index (SQLite).
+
+    Each chunk gets an internal doc number; a term's posting list is the
+    delta-encoded doc numbers plus uint8 term frequencies, stored as two
+    blobs. Adds are buffered per term and merged into the stored lists on
+    flush(); deletes tombstone the doc and are purged from the posting
+    lists once they exceed compact_ratio of all docs.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        k1: float = 1.2,
+        b: float = 0.75,
+        compact_ratio: float = 0.3,
+        cache_terms: int = 4096
+    ):
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.compact_ratio = compact_ratio
+        self.cache_terms = cache_terms
+
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(
+            os.path.join(path, "bm25.sqlite"), check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "doc INTEGER PRIMARY KEY, id TEXT UNIQUE, length INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT PRIMARY KEY, docs BLOB, tfs BLOB)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self._conn.commit()
+
+        # term -> ([doc numbers], [term frequencies]) not yet merged to disk
+        self._pending = {}
+        # term -> decoded stored postings (LRU)
+        self._cache = OrderedDict()
+
+        self._generation = None
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._live = np.zeros(0, dtype=bool)
+
+    # -------------------------------------------------
+    # SIDECAR STATE
+    # -------------------------------------------------
+
+    def _info(self, key: str, default: int = 0) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM info WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def _set_info(self, **values):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+            list(values.items())
+        )
+
+    def _refresh(self):
+        """
+        Reload doc lengths / live mask after a commit from another writer.
+        """
+
+        generation = self._info("generation")
+
+        if generation == self._generation:
+            return
+
+        n = self._info("n")
+
+        lengths = np.zeros(n, dtype=np.float32)
+        live = np.zeros(n, dtype=bool)
+
+        for doc, length in self._conn.execute(
+            "SELECT doc, length FROM docs WHERE id IS NOT NULL"
+        ):
+            lengths[doc] = length
+            live[doc] = True
+
+        self._lengths = lengths
+        self._live = live
+        self._cache.clear()
+        self._generation = generation
+
+    def _select(self, sql: str, keys: list) -> list:
+
+        result = []
+
+        # SQLite caps bound parameters per statement
+        for i in range(0, len(keys), 500):
+            part = list(keys[i:i + 500])
+            result.extend(self._conn.execute(
+                sql.format(",".join("?" * len(part))), part
+            ).fetchall())
+
+        return result
+
+    def _commit(self):
+        generation = self._info("generation") + 1
+        self._set_info(generation=generation)
+        self._conn.commit()
+        self._generation = generation
+
+    # -------------------------------------------------
+    # WRITES
+    # -------------------------------------------------
+
+    def add(self, ids: list, documents: list):
+        """
+        Index documents; re-adding an id replaces its previous version.
+        """
+
+        if not ids:
+            return
+
+        with self._lock:
+
+            self._refresh()
+            self._tombstone(ids)
+
+            n = self._info("n")
+            rows = []
+            lengths = []
+
+            for doc_id, text in zip(ids, documents):
+
+                counts = Counter(tokenize(text or ""))
+
+                for term, tf in counts.items():
+                    docs, tfs = self._pending.setdefault(term, ([], []))
+                    docs.append(n)
+                    tfs.append(tf)
+
+                length = sum(counts.values())
+                rows.append((n, doc_id, length))
+                lengths.append(length)
+                n += 1
+
+            self._conn.executemany(
+                "INSERT INTO docs (doc, id, length) VALUES (?, ?, ?)", rows
+            )
+            self._set_info(
+                n=n, total_length=self._info("total_length") + sum(lengths)
+            )
+            self._commit()
+
+            self._lengths = np.concatenate(
+                [self._lengths, np.asarray(lengths, dtype=np.float32)]
+            )
+            self._live = np.concatenate([self._live, np.ones(len(rows), dtype=bool)])
+
+    def _tombstone(self, ids: list) -> int:
+
+        found = self._select("SELECT doc, length FROM docs WHERE id IN ({})", ids)
+
+        if not found:
+            return 0
+
+        self._conn.executemany(
+            "UPDATE docs SET id = NULL WHERE doc = ?", [(doc,) for doc, _ in found]
+        )
+        self._set_info(
+            total_length=self._info("total_length") - sum(l for _, l in found),
+            dead=self._info("dead") + len(found)
+        )
+
+        for doc, _ in found:
+            self._live[doc] = False
+            self._lengths[doc] = 0
+
+        return len(found)
+
+    def delete(self, ids: list):
+
+        if not ids:
+            return
+
+        with self._lock:
+            self._refresh()
+            if self._tombstone(ids):
+                self._commit()
+
+    def flush(self):
+        """
+        Merge buffered postings into the stored lists; compact when many
+        docs are tombstoned.
+        """
+
+        with self._lock:
+
+            self._refresh()
+
+            if self._pending:
+
+                terms = list(self._pending)
+                stored = {
+                    term: (doc_blob, tf_blob)
+                    for term, doc_blob, tf_blob in self._select(
+                        "SELECT term, docs, tfs FROM postings WHERE term IN ({})", terms
+                    )
+                }
+
+                updates = []
+
+                for term in terms:
+
+                    docs = np.asarray(self._pending[term][0], dtype=np.int64)
+                    tfs = np.asarray(self._pending[term][1], dtype=np.float32)
+
+                    if term in stored:
+                        old_docs, old_tfs = _decode_postings(*stored[term])
+                        docs = np.concatenate([old_docs, docs])
+                        tfs = np.concatenate([old_tfs, tfs])
+
+                    updates.append((term, *_encode_postings(docs, tfs)))
+                    self._cache.pop(term, None)
+
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO postings (term, docs, tfs) VALUES (?, ?, ?)",
+                    updates
+                )
+                self._pending = {}
+
+            dead = self._info("dead")
+
+            if dead and dead >= self.compact_ratio * max(self._info("n"), 1):
+                self._compact()
+
+            self._commit()
+
+    def _compact(self):
+        """
+        Drop tombstoned docs from every posting list.
+        """
+
+        updates, empty = [], []
+
+        for term, doc_blob, tf_blob in self._conn.execute(
+            "SELECT term, docs, tfs FROM postings"
+        ).fetchall():
+
+            docs, tfs = _decode_postings(doc_blob, tf_blob)
+            keep = self._live[docs]
+
+            if keep.all():
+                continue
+
+            if keep.any():
+                updates.append((*_encode_postings(docs[keep], tfs[keep]), term))
+            else:
+                empty.append((term,))
+
+        self._conn.executemany(
+            "UPDATE postings SET docs = ?, tfs = ? WHERE term = ?", updates
+        )
+        self._conn.executemany("DELETE FROM postings WHERE term = ?", empty)
+        self._conn.execute("DELETE FROM docs WHERE id IS NULL")
+        self._set_info(dead=0)
+        self._cache.clear()
+
+    # -------------------------------------------------
+    # READS
+    # -------------------------------------------------
+
+    def _postings(self, term: str):
+
+        if term in self._cache:
+            self._cache.move_to_end(term)
+            docs, tfs = self._cache[term]
+
+        else:
+            row = self._conn.execute(
+                "SELECT docs, tfs FROM postings WHERE term = ?", (term,)
+            ).fetchone()
+
+            docs, tfs = (
+                _decode_postings(*row) if row
+                else (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+            )
+
+            self._cache[term] = (docs, tfs)
+            if len(self._cache) > self.cache_terms:
+                self._cache.popitem(last=False)
+
+        if term in self._pending:
+            docs = np.concatenate([docs, np.asarray(self._pending[term][0], dtype=np.int64)])
+            tfs = np.concatenate([tfs, np.asarray(self._pending[term][1], dtype=np.float32)])
+
+        return docs, tfs
+
+    def search(self, query: str, top_k: int = 100):
+        """
+        Returns (ids, scores) of the top_k docs by BM25, best first.
+        """
+
+        with self._lock:
+
+            self._refresh()
+
+            n_live = int(self._live.sum())
+            terms = list(dict.fromkeys(tokenize(query)))
+
+            if not n_live or not terms:
+                return [], np.zeros(0, dtype=np.float32)
+
+            avg_length = max(self._info("total_length") / n_live, 1.0)
+            scores = np.zeros(len(self._live), dtype=np.float32)
+
+            for term in terms:
+
+                docs, tfs = self._postings(term)
+
+                keep = self._live[docs]
+                docs, tfs = docs[keep], tfs[keep]
+
+                if not len(docs):
+                    continue
+
+                idf = math.log(1.0 + (n_live - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * self._lengths[docs] / avg_length)
+
+                # A doc appears once per posting list, so fancy += is safe
+                scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+            matched = np.nonzero(scores)[0]
+
+            if len(matched) > top_k:
+                matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+
+            matched = matched[np.argsort(-scores[matched])]
+
+            doc_ids = dict(self._select(
+                "SELECT doc, id FROM docs WHERE doc IN ({})", [int(d) for d in matched]
+            ))
+
+            return [doc_ids[int(d)] for d in matched], scores[matched]
+
+    def search_many(self, queries: list, top_k: int = 100) -> list:
+        return [self.search(query, top_k) for query in queries]
+
+    def count(self) -> int:
+
+        with self._lock:
+            self._refresh()
+            return int(self._live.sum())
@@ -1,40 +1,225 @@
-from typing import List
+from typing import List, Tuple
+import json
+import logging
 import re
 
+import numpy as np
+
+from tools.embedding_service import DEFAULT_MODEL
+
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_FALLBACK_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+logger = logging.getLogger(__name__)
+
+
+def _max_seq_length(name: str, hf_tokenizer) -> int:
+    """
+    Tokens the embedding model reads, special tokens included: the
+    sentence-transformers max_seq_length when the model has one (256 for
+    all-MiniLM-L6-v2), otherwise the tokenizer's model_max_length.
+    """
+
+    limit = hf_tokenizer.model_max_length
+
+    try:
+        from huggingface_hub import hf_hub_download
+
+        with open(hf_hub_download(name, "sentence_bert_config.json")) as f:
+            limit = min(limit, int(json.load(f)["max_seq_length"]))
+
+    except Exception:  # not a sentence-transformers model, or offline
+        pass
+
+    return limit
+
 
 class TextChunker:
     """
     Splits large text into semantically meaningful chunks.
+
+    Sizes are counted in the embedding model's tokens, so a chunk never
+    exceeds what the model actually reads. Chunks end on a sentence
+    boundary when one fits, otherwise on a word boundary. Consecutive
+    chunks share about `overlap` tokens. chunk_spans() returns
+    (start, end) character offsets into the source text and does not
+    copy it; chunk_text() builds the strings from those offsets.
     """
 
-    def __init__(self, chunk_size: int = 500, overlap: int = 50):
+    def __init__(
+        self,
+        chunk_size: int = 128,
+        overlap: int = 16,
+        tokenizer: str | None = DEFAULT_MODEL,
+        min_chars: int = 50
+    ):
         self.chunk_size = chunk_size
         self.overlap = overlap
+        self.min_chars = min_chars
 
-    def chunk_text(self, text: str) -> List[str]:
+        # HF tokenizer of the embedding model; None → regex word/punct tokens
+        self.tokenizer_name = tokenizer
+        self._tokenizer = None
+        self._tokenizer_json = None
+
+    def __getstate__(self):
+        # Sent to extraction workers as the tokenizer's JSON, so workers
+        # rebuild it with `tokenizers` alone (no transformers/torch import
+        # under their memory cap) and agree with the parent's choice
+        self._get_tokenizer()
+
+        state = self.__dict__.copy()
+        state["_tokenizer"] = None
+        state["_tokenizer_json"] = (
+            self._tokenizer.to_str() if self._tokenizer is not None else None
+        )
+        return state
+
+    def _get_tokenizer(self):
+
+        if self._tokenizer is None and self._tokenizer_json:
+            from tokenizers import Tokenizer
+            self._tokenizer = Tokenizer.from_str(self._tokenizer_json)
+            self._tokenizer_json = None
+
+        if self._tokenizer is None and self.tokenizer_name:
+
+            try:
+                from transformers import AutoTokenizer
+
+                name = self.tokenizer_name
+                if "/" not in name:
+                    name = f"sentence-transformers/{name}"
+
+                hf_tokenizer = AutoTokenizer.from_pretrained(name)
+
+                tokenizer = hf_tokenizer.backend_tokenizer
+                tokenizer.no_truncation()
+                tokenizer.no_padding()
+
+                # Leave room for [CLS] / [SEP]
+                self.chunk_size = min(
+                    self.chunk_size, _max_seq_length(name, hf_tokenizer) - 2
+                )
+                self._tokenizer = tokenizer
+
+            except Exception as e:
+                logger.warning(
+                    "Tokenizer %s unavailable (%s); sizing chunks by regex tokens.",
+                    self.tokenizer_name, e
+                )
+                self.tokenizer_name = None
+
+        return self._tokenizer
+
+    def params(self) -> dict:
+        """
+        Parameters that change chunk boundaries (recorded in the ingestion manifest).
+        """
+
+        # Resolve the tokenizer first: a fallback changes the boundaries
+        self._get_tokenizer()
+
+        return {
+            "chunk_size": self.chunk_size,
+            "overlap": self.overlap,
+            "tokenizer": self.tokenizer_name or "regex",
+            "min_chars": self.min_chars,
+        }
+
+    # -------------------------------------------------
+    # TOKENS
+    # -------------------------------------------------
+
+    def _token_offsets(self, text: str):
+        """
+        (starts, ends) character offsets of every token in text.
+        """
+
+        tokenizer = self._get_tokenizer()
+
+        if tokenizer is not None:
+            offsets = [
+                o for o in tokenizer.encode(text, add_special_tokens=False).offsets
+                if o[1] > o[0]
+            ]
+        else:
+            offsets = [m.span() for m in _FALLBACK_TOKEN.finditer(text)]
+
+        if not offsets:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        spans = np.asarray(offsets, dtype=np.int64)
+        return spans[:, 0], spans[:, 1]
+
+    # -------------------------------------------------
+    # CHUNKING
+    # -------------------------------------------------
+
+    def chunk_spans(self, text: str) -> List[Tuple[int, int]]:
 
         if not text:
             return []
 
-        text = re.sub(r"\s+", " ", text).strip()
+        starts, ends = self._token_offsets(text)
+        n = len(starts)
 
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        if n == 0:
+            return []
+
+        # Tokens that begin a word (preceded by whitespace or text start)
+        word_start = np.ones(n, dtype=bool)
+        word_start[1:] = starts[1:] > ends[:-1]
+
+        # Token indices where a new sentence begins
+        sentence_start = np.searchsorted(
+            starts, [m.end() for m in _SENTENCE_BREAK.finditer(text)]
+        )
+
+        word_starts = np.nonzero(word_start)[0]
 
-        chunks = []
-        current_chunk = ""
+        spans = []
+        i = 0
 
-        for sentence in sentences:
+        while i < n:
+
+            limit = i + self.chunk_size
+
+            if limit >= n:
+                end = n
 
-            if len(current_chunk) + len(sentence) <= self.chunk_size:
-                current_chunk += " " + sentence
             else:
-                chunks.append(current_chunk.strip())
+                # Prefer the last sentence break, then the last word break
+                k = np.searchsorted(sentence_start, limit, side="right") - 1
+
+                if k >= 0 and sentence_start[k] > i:
+                    end = int(sentence_start[k])
 
-                # Overlap mechanism
-                overlap_text = current_chunk[-self.overlap:]
-                current_chunk = overlap_text + " " + sentence
+                else:
+                    k = np.searchsorted(word_starts, limit, side="right") - 1
+                    end = int(word_starts[k]) if k >= 0 and word_starts[k] > i else limit
 
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+            spans.append((int(starts[i]), int(ends[end - 1])))
 
-        return [c for c in chunks if len(c) > 50]
+            if end == n:
+                break
+
+            # Next chunk starts `overlap` tokens back, on a word boundary
+            k = np.searchsorted(word_starts, end - self.overlap)
+            next_start = int(word_starts[k]) if k < len(word_starts) else end
+
+            i = next_start if i < next_start <= end else end
+
+        # Measured as materialized, so mostly-whitespace spans are dropped
+        return [
+            (s, e) for s, e in spans
+            if len(self.materialize(text, (s, e))) > self.min_chars
+        ]
+
+    def materialize(self, text: str, span: Tuple[int, int]) -> str:
+        # Whitespace collapsed, as the embedding model sees it
+        return " ".join(text[span[0]:span[1]].split())
+
+    def chunk_text(self, text: str) -> List[str]:
+        return [self.materialize(text, span) for span in self.chunk_spans(text)]
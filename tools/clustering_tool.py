@@ -1,18 +1,184 @@
-from sklearn.cluster import KMeans
-from sentence_transformers import SentenceTransformer
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score
 import numpy as np
 
+from tools.embedding_service import get_embedding_service
+
 
 class InsightClusterer:
     """
     Clusters document chunks into thematic groups.
+
+    - Small inputs use KMeans; from minibatch_threshold texts on,
+      MiniBatchKMeans.
+    - Embeddings are optionally reduced with PCA first (pca_components).
+    - The cluster count is picked between min_clusters and max_clusters
+      by silhouette score on a sample of at most silhouette_sample points.
+    - With warm_start, the next call starts from the previous call's
+      centroids and keeps its k, its PCA basis and therefore its label
+      numbering. Recursive research iterations refine the clusters
+      instead of recomputing them. When the number of points changes by
+      more than refit_ratio (either way) or no longer exceeds k, the
+      cluster count is searched again. reset() forgets that state.
+    - representatives() keeps a few chunks per cluster (medoid, then
+      maximal marginal relevance picks) so only those reach the agents.
     """
 
-    def __init__(self, model=None, max_clusters=5):
-        self.model = model or SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(
+        self,
+        model=None,
+        max_clusters=8,
+        embedding_backend=None,
+        min_clusters=2,
+        minibatch_threshold=512,
+        pca_components=64,
+        silhouette_sample=1000,
+        warm_start=True,
+        refit_ratio=2.0,
+        random_state=42
+    ):
+        self.model = model or get_embedding_service(backend=embedding_backend)
         self.max_clusters = max_clusters
+        self.min_clusters = min_clusters
+        self.minibatch_threshold = minibatch_threshold
+        self.pca_components = pca_components
+        self.silhouette_sample = silhouette_sample
+        self.warm_start = warm_start
+        self.refit_ratio = refit_ratio
+        self.random_state = random_state
+
+        self._pca = None
+        self._centroids = None
+        self._fit_n = 0
+
+        # Labels, centroids, reduced vectors and score of the last call
+        self.last_fit = None
+
+    def reset(self):
+        self._pca = None
+        self._centroids = None
+        self._fit_n = 0
+        self.last_fit = None
+
+    # -------------------------------------------------
+    # FITTING
+    # -------------------------------------------------
+
+    def _reduce(self, embeddings: np.ndarray) -> np.ndarray:
+
+        # Different embedding model → previous state doesn't apply
+        if self._pca is not None and self._pca.n_features_in_ != embeddings.shape[1]:
+            self.reset()
+
+        if self._pca is None:
+
+            n, dim = embeddings.shape
+            components = self.pca_components
+
+            if not components or dim <= components or n <= components:
+                return embeddings
+
+            self._pca = PCA(
+                n_components=components, random_state=self.random_state
+            ).fit(embeddings)
+
+        return self._pca.transform(embeddings).astype(np.float32)
+
+    def _kmeans(self, k: int, n: int, init=None):
+
+        if n >= self.minibatch_threshold:
+            return MiniBatchKMeans(
+                n_clusters=k,
+                init=init if init is not None else "k-means++",
+                n_init=1 if init is not None else 3,
+                batch_size=1024,
+                random_state=self.random_state
+            )
+
+        return KMeans(
+            n_clusters=k,
+            init=init if init is not None else "k-means++",
+            n_init=1 if init is not None else 4,
+            random_state=self.random_state
+        )
+
+    def _score(self, vectors: np.ndarray, labels: np.ndarray) -> float:
+
+        # Silhouette is only defined for 2 <= k <= n - 1
+        k = len(set(labels))
+        if k < 2 or k >= len(vectors):
+            return 0.0
+
+        return float(silhouette_score(
+            vectors, labels,
+            sample_size=min(len(vectors), self.silhouette_sample),
+            random_state=self.random_state
+        ))
+
+    def fit(self, embeddings, n_clusters: int | None = None) -> dict:
+        """
+        Returns {"labels", "centroids", "vectors", "k", "silhouette",
+        "warm_started"}; vectors are the (PCA-reduced) points clustered.
+        """
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n = len(embeddings)
+
+        vectors = self._reduce(embeddings)
+
+        warm = (
+            self.warm_start
+            and n_clusters is None
+            and self._centroids is not None
+            and self._centroids.shape[1] == vectors.shape[1]
+            and len(self._centroids) < n
+            and self._fit_n / self.refit_ratio <= n <= self._fit_n * self.refit_ratio
+        )
+
+        if warm:
+            model = self._kmeans(len(self._centroids), n, init=self._centroids)
+            labels = model.fit_predict(vectors)
+            best = (model, labels, self._score(vectors, labels))
+
+        else:
+            upper = min(self.max_clusters, n - 1)
+            candidates = (
+                [min(n_clusters, n)] if n_clusters
+                else list(range(min(self.min_clusters, upper), upper + 1)) or [1]
+            )
+
+            best = None
+
+            for k in candidates:
+                model = self._kmeans(k, n)
+                labels = model.fit_predict(vectors)
+                score = self._score(vectors, labels) if len(candidates) > 1 else 0.0
+
+                if best is None or score > best[2]:
+                    best = (model, labels, score)
+
+        model, labels, score = best
 
-    def cluster(self, texts):
+        self._centroids = model.cluster_centers_.astype(np.float32)
+        self._fit_n = n
+
+        self.last_fit = {
+            "labels": labels,
+            "centroids": self._centroids,
+            "vectors": vectors,
+            "k": len(self._centroids),
+            "silhouette": score,
+            "warm_started": warm,
+        }
+
+        return self.last_fit
+
+    def cluster(self, texts, embeddings=None):
+        """
+        Group texts by theme. Pass embeddings (e.g. returned by
+        VectorStore.query) to skip re-encoding the texts.
+        """
 
         if not texts:
             return {}
@@ -20,15 +186,102 @@ class InsightClusterer:
         if len(texts) == 1:
             return {0: texts}
 
-        embeddings = self.model.encode(texts)
-
-        n_clusters = min(self.max_clusters, len(texts))
+        if embeddings is None:
+            embeddings = self.model.encode(texts)
 
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        labels = kmeans.fit_predict(embeddings)
+        labels = self.fit(embeddings)["labels"]
 
         clustered = {}
         for idx, label in enumerate(labels):
-            clustered.setdefault(label, []).append(texts[idx])
+            clustered.setdefault(int(label), []).append(texts[idx])
 
         return clustered
+
+    # -------------------------------------------------
+    # REPRESENTATIVES
+    # -------------------------------------------------
+
+    def _pick(self, unit: np.ndarray, per_cluster: int, diversity: float) -> list:
+        """
+        Positions into one cluster's unit vectors: the medoid first, then
+        MMR picks (close to the cluster, far from what is already picked).
+        """
+
+        m = len(unit)
+        centre = unit.mean(axis=0)
+        centre /= np.linalg.norm(centre) or 1.0
+        relevance = unit @ centre
+
+        # Exact medoid for small clusters, nearest-to-centre otherwise
+        if m <= 512:
+            medoid = int(np.argmax((unit @ unit.T).sum(axis=1)))
+        else:
+            medoid = int(np.argmax(relevance))
+
+        picked = [medoid]
+        closest = unit @ unit[medoid]
+
+        while len(picked) < min(per_cluster, m):
+
+            score = (1 - diversity) * relevance - diversity * closest
+            score[picked] = -np.inf
+
+            best = int(np.argmax(score))
+            picked.append(best)
+            closest = np.maximum(closest, unit @ unit[best])
+
+        return picked
+
+    def representatives(
+        self,
+        texts,
+        embeddings=None,
+        per_cluster: int = 3,
+        diversity: float = 0.5
+    ) -> list:
+        """
+        Cluster texts and keep per_cluster of each cluster.
+
+        Returns [{"label", "size", "spread", "indices", "texts"}] sorted
+        by size; indices point into texts, medoid first. spread is the
+        mean cosine distance of the members to the cluster centre.
+        """
+
+        if not texts:
+            return []
+
+        if embeddings is None:
+            embeddings = self.model.encode(texts)
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        unit = embeddings / np.maximum(
+            np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12
+        )
+
+        labels = (
+            self.fit(embeddings)["labels"] if len(texts) > 1
+            else np.zeros(1, dtype=np.int64)
+        )
+
+        selected = []
+
+        for label in np.unique(labels):
+
+            members = np.nonzero(labels == label)[0]
+            picked = members[self._pick(unit[members], per_cluster, diversity)]
+
+            centre = unit[members].mean(axis=0)
+            centre /= np.linalg.norm(centre) or 1.0
+
+            selected.append({
+                "label": int(label),
+                "size": len(members),
+                "spread": float(np.mean(1.0 - unit[members] @ centre)),
+                "indices": [int(i) for i in picked],
+                "texts": [texts[i] for i in picked],
+            })
+
+        selected.sort(key=lambda c: -c["size"])
+
+        return selected
@@ -1,28 +1,15 @@
 from datetime import datetime
-from urllib.parse import urlparse
+
+import numpy as np
+
+from tools.domain_authority import get_domain_authority
 
 
 class CredibilityScorer:
 
-    def __init__(self):
-
-        self.high_authority_domains = [
-            ".gov",
-            ".edu",
-            "nature.com",
-            "sciencedirect.com",
-            "ieee.org",
-            "springer.com",
-            "who.int",
-            "worldbank.org"
-        ]
-
-        self.low_authority_indicators = [
-            "blog",
-            "medium.com",
-            "wordpress",
-            "opinion"
-        ]
+    def __init__(self, authority=None):
+        # Domain weights come from the shared authority data file
+        self.authority = authority or get_domain_authority()
 
     def score(self, url: str, publication_date: str | None = None) -> float:
 
@@ -31,20 +18,11 @@ class CredibilityScorer:
 
         score = 0.5
 
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-
         # HTTPS boost
-        if parsed.scheme == "https":
+        if url.lower().startswith("https://"):
             score += 0.05
 
-        for trusted in self.high_authority_domains:
-            if trusted in domain:
-                score += 0.3
-
-        for weak in self.low_authority_indicators:
-            if weak in domain:
-                score -= 0.2
+        score += self.authority.score(url, "credibility")
 
         # Recency factor
         if publication_date:
@@ -62,3 +40,22 @@ class CredibilityScorer:
                 pass
 
         return round(max(0.0, min(score, 1.0)), 2)
+
+    def score_many(self, urls: list, publication_dates: list | None = None) -> list:
+
+        if publication_dates is not None:
+            return [self.score(u, d) for u, d in zip(urls, publication_dates)]
+
+        scores = (
+            0.5
+            + 0.05 * np.fromiter(
+                ((u or "")[:8].lower() == "https://" for u in urls),
+                dtype=bool, count=len(urls)
+            )
+            + self.authority.score_many(urls, "credibility")
+        )
+
+        scores = np.round(np.clip(scores, 0.0, 1.0), 2)
+        scores[[not u for u in urls]] = 0.0
+
+        return scores.tolist()
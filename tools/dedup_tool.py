@@ -0,0 +1,317 @@
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+import numpy as np
+
+
+_WORD_RE = re.compile(r"\w+")
+_PRIME = (1 << 61) - 1
+
+
+class NearDuplicateFilter:
+    """
+    Drops near-duplicate chunks (repeated headers, footers, boilerplate,
+    reference blocks) before they are embedded.
+
+    Each chunk gets a MinHash signature over word shingles. Candidates
+    come from LSH buckets (bands x rows of the signature) and count as
+    duplicates when the estimated Jaccard similarity is >= threshold.
+    Signatures and buckets of kept chunks persist in SQLite, so matches
+    span pages, documents and runs. Every dropped chunk is recorded with
+    the id of the chunk it duplicates, so its source, page and chunk id
+    still resolve through locations().
+    """
+
+    def __init__(
+        self,
+        path: str = "vector_db/dedup.sqlite",
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        # a, b < 2^31 keep a * hash + b inside uint64
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            "id TEXT PRIMARY KEY, source TEXT, signature BLOB)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key INTEGER, id TEXT)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_id ON buckets (id)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS duplicates ("
+            "id TEXT PRIMARY KEY, canonical TEXT, source TEXT, "
+            "chunk_id TEXT, page_number INTEGER, similarity REAL, size INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates (canonical)"
+        )
+        self._conn.commit()
+
+    def params(self) -> dict:
+        """
+        Settings that change which chunks are kept (recorded in the manifest).
+        """
+        return {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "shingle_size": self.shingle_size,
+        }
+
+    # -------------------------------------------------
+    # SIGNATURES
+    # -------------------------------------------------
+
+    def signature(self, text: str) -> np.ndarray:
+
+        words = _WORD_RE.findall(text.lower())
+        size = self.shingle_size
+
+        shingles = (
+            {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+            if len(words) >= size
+            else {" ".join(words)}
+        )
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode()) for s in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+
+        return (permuted.min(axis=1) & 0xFFFFFFFF).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+
+        rows = self.num_perm // self.bands
+
+        # Band hash in the high bits, band index in the low byte
+        return [
+            (zlib.crc32(signature[b * rows:(b + 1) * rows].tobytes()) << 8) | b
+            for b in range(self.bands)
+        ]
+
+    def _select(self, sql: str, keys: list) -> list:
+
+        result = []
+
+        # SQLite caps bound parameters per statement
+        for i in range(0, len(keys), 500):
+            part = list(keys[i:i + 500])
+            result.extend(self._conn.execute(
+                sql.format(",".join("?" * len(part))), part
+            ).fetchall())
+
+        return result
+
+    # -------------------------------------------------
+    # FILTERING
+    # -------------------------------------------------
+
+    def filter(self, ids: list, documents: list, metadata: list):
+        """
+        Returns (kept positions, duplicates) for one batch.
+
+        duplicates is a list of (position, canonical id, similarity);
+        kept chunks are registered as canonical for later batches.
+        """
+
+        if not ids:
+            return [], []
+
+        signatures = [self.signature(text) for text in documents]
+        band_keys = [self._band_keys(sig) for sig in signatures]
+
+        with self._lock:
+
+            # Stored candidates for the whole batch in one lookup
+            bucket_ids = {}
+            for key, doc_id in self._select(
+                "SELECT key, id FROM buckets WHERE key IN ({})",
+                list({k for keys in band_keys for k in keys})
+            ):
+                bucket_ids.setdefault(key, set()).add(doc_id)
+
+            stored = {
+                doc_id: np.frombuffer(blob, dtype=np.uint32)
+                for doc_id, blob in self._select(
+                    "SELECT id, signature FROM signatures WHERE id IN ({})",
+                    list({i for found in bucket_ids.values() for i in found})
+                )
+            }
+
+            kept, duplicates = [], []
+            new_signatures, new_buckets = [], []
+
+            for pos, (doc_id, sig, keys) in enumerate(zip(ids, signatures, band_keys)):
+
+                candidates = {
+                    c for key in keys for c in bucket_ids.get(key, ())
+                    if c != doc_id and c in stored
+                }
+
+                best, best_sim = None, 0.0
+
+                for candidate in candidates:
+                    sim = float(np.mean(stored[candidate] == sig))
+                    if sim > best_sim:
+                        best, best_sim = candidate, sim
+
+                if best is not None and best_sim >= self.threshold:
+                    duplicates.append((pos, best, best_sim))
+                    continue
+
+                kept.append(pos)
+
+                # Later chunks of this batch can match this one
+                stored[doc_id] = sig
+                for key in keys:
+                    bucket_ids.setdefault(key, set()).add(doc_id)
+
+                new_signatures.append(
+                    (doc_id, metadata[pos].get("source"), sig.tobytes())
+                )
+                new_buckets.extend((key, doc_id) for key in keys)
+
+            self._conn.executemany(
+                "DELETE FROM buckets WHERE id = ?", [(row[0],) for row in new_signatures]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signatures (id, source, signature) VALUES (?, ?, ?)",
+                new_signatures
+            )
+            self._conn.executemany(
+                "INSERT INTO buckets (key, id) VALUES (?, ?)", new_buckets
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duplicates "
+                "(id, canonical, source, chunk_id, page_number, similarity, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        ids[pos], canonical,
+                        metadata[pos].get("source"),
+                        metadata[pos].get("chunk_id"),
+                        metadata[pos].get("page_number"),
+                        sim, len(documents[pos].encode())
+                    )
+                    for pos, canonical, sim in duplicates
+                ]
+            )
+            self._conn.commit()
+
+        return kept, duplicates
+
+    # -------------------------------------------------
+    # REGISTRY
+    # -------------------------------------------------
+
+    def dependents(self, sources: list) -> list:
+        """
+        Files whose dropped chunks point at chunks of `sources`
+        (transitively); they must be re-indexed when `sources` change.
+        """
+
+        with self._lock:
+
+            pending = set(sources)
+            found = set()
+
+            while pending:
+                rows = self._select(
+                    "SELECT DISTINCT d.source FROM duplicates d "
+                    "JOIN signatures s ON s.id = d.canonical "
+                    "WHERE s.source IN ({})",
+                    list(pending)
+                )
+
+                pending = {r for (r,) in rows} - found - set(sources)
+                found |= pending
+
+            return sorted(found)
+
+    def forget_sources(self, sources: list):
+        """
+        Drop signatures and duplicate records of these files before they
+        are re-indexed or removed.
+        """
+
+        if not sources:
+            return
+
+        with self._lock:
+
+            ids = [i for (i,) in self._select(
+                "SELECT id FROM signatures WHERE source IN ({})", sources
+            )]
+
+            self._select("DELETE FROM buckets WHERE id IN ({})", ids)
+            self._select("DELETE FROM signatures WHERE source IN ({})", sources)
+            self._select("DELETE FROM duplicates WHERE source IN ({})", sources)
+            self._conn.commit()
+
+    def locations(self, canonical_ids: list) -> dict:
+        """
+        canonical id -> [{"source", "chunk_id", "page_number"}] of the
+        chunks dropped as its duplicates.
+        """
+
+        with self._lock:
+
+            found = {}
+
+            for canonical, source, chunk_id, page_number in self._select(
+                "SELECT canonical, source, chunk_id, page_number FROM duplicates "
+                "WHERE canonical IN ({}) ORDER BY source, page_number",
+                canonical_ids
+            ):
+                found.setdefault(canonical, []).append({
+                    "source": source,
+                    "chunk_id": chunk_id,
+                    "page_number": page_number,
+                })
+
+            return found
+
+    def savings(self) -> dict:
+        """
+        Totals over the registry: chunks never embedded and their text bytes.
+        """
+
+        with self._lock:
+
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM duplicates"
+            ).fetchone()
+
+            return {"duplicate_chunks": count, "text_bytes": size}
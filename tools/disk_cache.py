@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    Persistent key → JSON value cache (SQLite) with a TTL and
+    size-bounded LRU eviction.
+
+    Entries older than `ttl` seconds are misses and are dropped on read.
+    When more than `max_entries` entries or `max_bytes` of values are
+    stored, the least recently read ones are evicted. hits / misses
+    count lookups made by this instance.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+        max_bytes: int | None = None
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT, created REAL, "
+            "accessed REAL, size INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._conn.commit()
+
+    # -------------------------------------------------
+    # READ / WRITE
+    # -------------------------------------------------
+
+    def get(self, key: str):
+        """
+        Cached value, or None on a miss.
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list) -> dict:
+        """
+        key -> value for the keys that hit, in one transaction.
+        """
+
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found, expired = {}, []
+
+        with self._lock:
+
+            # SQLite caps bound parameters per statement
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+
+                for key, value, created in self._conn.execute(
+                    "SELECT key, value, created FROM entries WHERE key IN "
+                    f"({','.join('?' * len(part))})",
+                    part
+                ).fetchall():
+
+                    if self.ttl is not None and now - created > self.ttl:
+                        expired.append((key,))
+                    else:
+                        found[key] = value
+
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", expired)
+            self._conn.executemany(
+                "UPDATE entries SET accessed = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def put(self, key: str, value):
+
+        data = json.dumps(value)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, now, now, len(data))
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str):
+
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    # -------------------------------------------------
+    # EVICTION
+    # -------------------------------------------------
+
+    def _evict(self):
+
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,)
+            )
+
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+        if self.max_bytes is not None:
+            # Keep the most recently read entries that fit in max_bytes
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER "
+                "(ORDER BY accessed DESC, key) AS total FROM entries) "
+                "WHERE total > ?)",
+                (self.max_bytes,)
+            )
+
+    def clear(self):
+
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
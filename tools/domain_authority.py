@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "data", "domain_authority.json")
+
+
+def host_of(url: str) -> str:
+    """
+    Lower-cased host of a URL (scheme optional), without credentials,
+    port or trailing dot.
+    """
+
+    if not url:
+        return ""
+
+    rest = url.strip()
+    scheme_end = rest.find("://")
+    if scheme_end >= 0:
+        rest = rest[scheme_end + 3:]
+
+    for sep in "/?#":
+        rest = rest.split(sep, 1)[0]
+
+    host = rest.rsplit("@", 1)[-1].split(":", 1)[0]
+
+    return host.lower().rstrip(".")
+
+
+class DomainAuthority:
+    """
+    Source-authority lookup shared by CredibilityScorer and KnowledgeStore.
+
+    Domains from the versioned data file are stored in a trie keyed by
+    reversed host labels (edu → stanford → cs), so a host matches whole
+    labels only and the most specific listed suffix wins. A host with no
+    listed registered domain (two or more labels) falls back to
+    whole-label rules (blog.example.com) and then to a listed top-level
+    suffix (.gov, .edu). Each category maps to one weight per call site
+    ("credibility", "boost"); per-host categories are memoized.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.path = path
+        self.version = data.get("version", 1)
+        self.categories = data.get("categories", {})
+        self.host_labels = data.get("host_labels", {})
+
+        self._trie = {}
+        for domain, category in data.get("domains", {}).items():
+            node = self._trie
+            for label in reversed(domain.lower().split(".")):
+                node = node.setdefault(label, {})
+            node["$"] = category
+
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # LOOKUP
+    # -------------------------------------------------
+
+    def _match(self, host: str) -> str | None:
+
+        labels = host.split(".")
+
+        node = self._trie
+        found, depth = None, 0
+
+        for i, label in enumerate(reversed(labels)):
+            node = node.get(label)
+            if node is None:
+                break
+            if "$" in node:
+                found, depth = node["$"], i + 1
+
+        if depth >= 2:
+            return found
+
+        for label in labels[:-1]:
+            if label in self.host_labels:
+                return self.host_labels[label]
+
+        return found
+
+    def category(self, url: str) -> str | None:
+
+        host = host_of(url)
+
+        category = self._memo.get(host, False)
+
+        if category is False:
+            category = self._match(host) if host else None
+
+            with self._lock:
+                self._memo[host] = category
+
+        return category
+
+    # -------------------------------------------------
+    # SCORING
+    # -------------------------------------------------
+
+    def score(self, url: str, field: str = "credibility") -> float:
+        category = self.category(url)
+        return self.categories.get(category, {}).get(field, 0.0) if category else 0.0
+
+    def score_many(self, urls: list, field: str = "credibility") -> np.ndarray:
+        """
+        Weights of many URLs at once; each distinct host is looked up once.
+        """
+
+        weights = {
+            category: values.get(field, 0.0)
+            for category, values in self.categories.items()
+        }
+
+        # Authority part of each URL (may still hold userinfo / port /
+        # query); host_of() normalizes it once per distinct value
+        authorities = [
+            (url.partition("://")[2] or url).partition("/")[0] if url else ""
+            for url in urls
+        ]
+
+        table = {
+            authority: weights.get(self.category(authority), 0.0)
+            for authority in set(authorities)
+        }
+
+        return np.fromiter(
+            map(table.__getitem__, authorities), dtype=np.float64, count=len(urls)
+        )
+
+
+_authority = None
+_authority_lock = threading.Lock()
+
+
+def get_domain_authority() -> DomainAuthority:
+    """
+    The shared DomainAuthority, loaded from $DOMAIN_AUTHORITY_PATH or
+    the bundled data file.
+    """
+
+    global _authority
+
+    if _authority is None:
+        with _authority_lock:
+            if _authority is None:
+                _authority = DomainAuthority(
+                    os.getenv("DOMAIN_AUTHORITY_PATH") or DEFAULT_PATH
+                )
+
+    return _authority
@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent content-hash → embedding cache (SQLite).
+
+    Used for text embedded outside the vector store (queries, web
+    snippets), so the same text is never encoded twice across runs.
+    """
+
+    def __init__(self, path: str = "vector_db/embedding_cache.sqlite"):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: list) -> dict:
+
+        found = {}
+
+        if not keys:
+            return found
+
+        with self._lock:
+            # SQLite caps bound parameters per statement
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+
+                rows = self._conn.execute(
+                    "SELECT key, dim, vector FROM embeddings WHERE key IN "
+                    f"({','.join('?' * len(part))})",
+                    part
+                ).fetchall()
+
+                for key, dim, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+
+        return found
+
+    def put_many(self, keys: list, vectors):
+
+        rows = [
+            (key, len(vector), np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in zip(keys, vectors)
+        ]
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
@@ -0,0 +1,158 @@
+import os
+import threading
+
+import numpy as np
+
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+class EmbeddingService:
+    """
+    Process-wide sentence embedding model, loaded on first use.
+
+    The lock is only taken while the model is being loaded; afterwards
+    every thread reads the loaded model without synchronisation.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        batch_size: int = 64,
+        normalize: bool = False
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize = normalize
+
+        # Identifies the vectors this backend produces (cache keys, manifest)
+        self.fingerprint = model_name
+
+        self._model = None
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # MODEL LOADING
+    # -------------------------------------------------
+
+    def _load_model(self):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def model(self):
+
+        model = self._model
+
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load_model()
+                model = self._model
+
+        return model
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    # -------------------------------------------------
+    # ENCODING
+    # -------------------------------------------------
+
+    def _encode_batch(self, texts: list, batch_size: int, normalize: bool):
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+
+    def encode(
+        self,
+        texts,
+        batch_size: int | None = None,
+        normalize: bool | None = None,
+        sort_by_length: bool = True
+    ) -> np.ndarray:
+        """
+        Embed texts, returning a float32 matrix in input order.
+
+        With sort_by_length, texts are batched longest-first so each batch
+        pads to similar lengths.
+        """
+
+        if isinstance(texts, str):
+            texts = [texts]
+
+        texts = list(texts)
+
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        batch_size = batch_size or self.batch_size
+        normalize = self.normalize if normalize is None else normalize
+
+        if not sort_by_length:
+            return np.asarray(
+                self._encode_batch(texts, batch_size, normalize),
+                dtype=np.float32
+            )
+
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+
+        sorted_embeddings = np.asarray(
+            self._encode_batch([texts[i] for i in order], batch_size, normalize),
+            dtype=np.float32
+        )
+
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+
+        return embeddings
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def _create_service(model_name: str, backend: str) -> EmbeddingService:
+
+    if backend == "torch":
+        return EmbeddingService(model_name)
+
+    if backend in ("onnx", "onnx-int8", "onnx-fp32"):
+        from tools.onnx_embedding import OnnxEmbeddingService
+
+        return OnnxEmbeddingService(
+            model_name,
+            threads=int(os.getenv("EMBEDDING_THREADS", "0")) or None,
+            quantize=backend != "onnx-fp32"
+        )
+
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def get_embedding_service(
+    model_name: str = DEFAULT_MODEL,
+    backend: str | None = None
+) -> EmbeddingService:
+    """
+    Return the shared embedding service for model_name (one per process
+    and backend). backend is "torch" (fp32 sentence-transformers) or
+    "onnx" (int8 onnxruntime); it defaults to $EMBEDDING_BACKEND or torch.
+    """
+
+    backend = (backend or os.getenv("EMBEDDING_BACKEND") or "torch").lower()
+    key = (model_name, backend)
+
+    service = _services.get(key)
+
+    if service is None:
+        with _services_lock:
+            if key not in _services:
+                _services[key] = _create_service(model_name, backend)
+            service = _services[key]
+
+    return service
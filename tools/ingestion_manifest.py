@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+
+
+class IngestionManifest:
+    """
+    Persistent record of indexed PDFs, keyed by content hash, mtime and
+    chunker parameters. Lets ingestion skip files that haven't changed
+    since the last run and clean up chunks of changed or removed files.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: str = "vector_db/ingestion_manifest.json",
+        chunker_params: dict | None = None
+    ):
+        self.path = path
+        self.chunker_params = chunker_params or {}
+
+        self.files = self._load()
+        self._hashes = {}
+
+    # -------------------------------------------------
+    # PERSISTENCE
+    # -------------------------------------------------
+
+    def _load(self):
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            if data.get("version") != self.VERSION:
+                return {}
+
+            return data.get("files", {})
+
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        tmp_path = self.path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.VERSION, "files": self.files},
+                f,
+                indent=4
+            )
+
+        # Atomic replace so a crash never leaves a half-written manifest
+        os.replace(tmp_path, self.path)
+
+    # -------------------------------------------------
+    # CHANGE DETECTION
+    # -------------------------------------------------
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normpath(file_path).replace("\\", "/")
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+
+        digest = hashlib.sha256()
+
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    def plan(self, file_paths):
+        """
+        Split file_paths into (to_index, unchanged, removed).
+
+        Files whose size and mtime match the manifest are trusted without
+        hashing; otherwise the content hash decides.
+        """
+
+        to_index = []
+        unchanged = []
+        current = set()
+
+        for file_path in file_paths:
+
+            key = self._key(file_path)
+            current.add(key)
+
+            entry = self.files.get(key)
+
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+
+            if not entry or entry.get("chunker") != self.chunker_params:
+                to_index.append(file_path)
+                continue
+
+            if (
+                entry.get("mtime_ns") == stat.st_mtime_ns
+                and entry.get("size") == stat.st_size
+            ):
+                unchanged.append(file_path)
+                continue
+
+            # Touched on disk → compare content
+            content_hash = self.file_hash(file_path)
+            self._hashes[key] = content_hash
+
+            if content_hash == entry.get("sha256"):
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                unchanged.append(file_path)
+            else:
+                to_index.append(file_path)
+
+        removed = [key for key in self.files if key not in current]
+
+        return to_index, unchanged, removed
+
+    # -------------------------------------------------
+    # ENTRIES
+    # -------------------------------------------------
+
+    def chunk_ids(self, file_path: str) -> list:
+        entry = self.files.get(self._key(file_path))
+        return list(entry.get("chunk_ids", [])) if entry else []
+
+    def record(self, file_path: str, chunk_ids: list):
+
+        key = self._key(file_path)
+        stat = os.stat(file_path)
+
+        content_hash = self._hashes.pop(key, None) or self.file_hash(file_path)
+
+        self.files[key] = {
+            "sha256": content_hash,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "chunker": self.chunker_params,
+            "chunk_ids": list(chunk_ids),
+        }
+
+    def forget(self, file_path: str) -> list:
+        """
+        Drop a file's entry, returning the store ids of its chunks.
+        """
+        entry = self.files.pop(self._key(file_path), None)
+        return list(entry.get("chunk_ids", [])) if entry else []
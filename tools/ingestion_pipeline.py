@@ -0,0 +1,242 @@
+import os
+import queue
+import threading
+
+
+_DONE = object()
+
+
+class IngestionPipeline:
+    """
+    Streaming extract → chunk → embed → upsert pipeline.
+
+    Extraction, embedding and Chroma writes each run in their own thread,
+    connected by bounded queues. Chunks flow through in fixed-size batches,
+    so extraction of the next file overlaps embedding and writing of the
+    previous batches, and peak memory is set by batch_size * queue_size
+    rather than by corpus size.
+
+    With a NearDuplicateFilter (tools/dedup_tool.py), near-duplicate
+    chunks are dropped before the embed step and only recorded.
+    """
+
+    def __init__(
+        self,
+        pdf_processor,
+        vector_store,
+        batch_size: int = 64,
+        queue_size: int = 4,
+        dedup=None
+    ):
+        self.pdf_processor = pdf_processor
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.dedup = dedup
+
+    # -------------------------------------------------
+    # STAGES
+    # -------------------------------------------------
+
+    def _put(self, q, item, stop):
+        # Blocking put that gives up once another stage has failed
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _extract_stage(self, file_paths, out_q, stop):
+        """
+        Stream chunks into batches of batch_size (spanning files).
+
+        Each batch carries the files whose last chunk it contains, so a
+        file is reported done only once all its chunks have been written.
+        """
+
+        ids, documents, metadata, done_files = [], [], [], []
+
+        def flush():
+            nonlocal ids, documents, metadata, done_files
+
+            ok = self._put(out_q, (ids, documents, metadata, done_files), stop)
+            ids, documents, metadata, done_files = [], [], [], []
+            return ok
+
+        extraction = self.pdf_processor.iter_extract(
+            file_paths, include_text=False
+        )
+
+        try:
+            for pdf_data in extraction:
+
+                pdf_path = pdf_data["file_path"]
+
+                if "error" in pdf_data:
+                    done_files.append((pdf_path, pdf_data["error"]))
+                    continue
+
+                section, section_id = None, -1
+
+                for idx, chunk_data in enumerate(pdf_data.get("chunks", [])):
+
+                    # Consecutive chunks under one heading form a section
+                    if idx == 0 or chunk_data.get("section") != section:
+                        section = chunk_data.get("section")
+                        section_id += 1
+
+                    meta = {
+                        "source": pdf_path,
+                        "chunk_id": f"{os.path.basename(pdf_path)}_chunk_{idx}",
+                        "page_number": chunk_data["page_number"],
+                        "section_id": section_id
+                    }
+
+                    if section:
+                        meta["section"] = section
+
+                    ids.extend(self.vector_store.document_ids([meta]))
+                    documents.append(chunk_data["text"])
+                    metadata.append(meta)
+
+                    if len(documents) >= self.batch_size and not flush():
+                        return
+
+                done_files.append((pdf_path, None))
+
+            if documents or done_files:
+                flush()
+
+        finally:
+            # Stops extraction workers early if a later stage failed
+            extraction.close()
+
+    def _embed_stage(self, in_q, out_q, stop, stats):
+
+        while not stop.is_set():
+
+            try:
+                item = in_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if item is _DONE:
+                self._put(out_q, _DONE, stop)
+                return
+
+            ids, documents, metadata, done_files = item
+
+            if self.dedup is not None and ids:
+                kept, duplicates = self.dedup.filter(ids, documents, metadata)
+
+                stats["duplicates"] += len(duplicates)
+
+                ids = [ids[i] for i in kept]
+                documents = [documents[i] for i in kept]
+                metadata = [metadata[i] for i in kept]
+
+            embeddings = (
+                self.vector_store.embed_documents(documents) if documents else []
+            )
+
+            if not self._put(
+                out_q, (ids, documents, embeddings, metadata, done_files), stop
+            ):
+                return
+
+    # -------------------------------------------------
+    # RUN
+    # -------------------------------------------------
+
+    def run(self, file_paths, on_file_done=None) -> dict:
+        """
+        Ingest file_paths, calling on_file_done(file_path, ids, error)
+        once each file's chunks are all written (ids is [] on error).
+
+        Returns counts of files, failures, chunks written, write batches
+        and near-duplicate chunks skipped.
+        """
+
+        stats = {"files": 0, "failed": 0, "chunks": 0, "batches": 0, "duplicates": 0}
+
+        if not file_paths:
+            return stats
+
+        stop = threading.Event()
+        errors = []
+
+        chunk_q = queue.Queue(maxsize=self.queue_size)
+        embed_q = queue.Queue(maxsize=self.queue_size)
+
+        def guarded(target, *args, done_q=None):
+            def runner():
+                try:
+                    target(*args)
+                    if done_q is not None:
+                        self._put(done_q, _DONE, stop)
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+            return threading.Thread(target=runner, daemon=True)
+
+        threads = [
+            guarded(self._extract_stage, file_paths, chunk_q, stop, done_q=chunk_q),
+            guarded(self._embed_stage, chunk_q, embed_q, stop, stats),
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        file_ids = {}
+
+        try:
+            # Write stage runs on the calling thread
+            while True:
+
+                try:
+                    item = embed_q.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+
+                if item is _DONE:
+                    break
+
+                ids, documents, embeddings, metadata, done_files = item
+
+                if ids:
+                    self.vector_store.upsert(ids, documents, embeddings, metadata)
+                    stats["chunks"] += len(ids)
+                    stats["batches"] += 1
+
+                    for doc_id, meta in zip(ids, metadata):
+                        file_ids.setdefault(meta["source"], []).append(doc_id)
+
+                for pdf_path, error in done_files:
+                    stats["files"] += 1
+
+                    if error:
+                        stats["failed"] += 1
+
+                    # Section centroids are complete once the file's last chunk is in
+                    section_ids = (
+                        [] if error else self.vector_store.write_sections(pdf_path)
+                    )
+
+                    if on_file_done:
+                        on_file_done(
+                            pdf_path, file_ids.pop(pdf_path, []) + section_ids, error
+                        )
+
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return stats
@@ -0,0 +1,607 @@
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from tools.vector_index import VectorIndex
+
+try:
+    import hnswlib
+except ImportError:  # optional: exact search only
+    hnswlib = None
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class NumpyIndex(VectorIndex):
+    """
+    In-process vector index for read-heavy workloads.
+
+    Unit-normalised vectors live in a memory-mapped float16 matrix
+    (vectors.f16); ids, documents and metadata live in a SQLite sidecar
+    (meta.sqlite). Rows are append-only: deletes leave tombstones and
+    updates overwrite in place, so row numbers are stable between
+    compactions and any number of processes can map the same file
+    read-only and share it through the OS page cache.
+
+    compact() drops tombstoned rows: live rows are renumbered densely
+    into a new vectors file, so maps held by other processes stay valid
+    until they re-map. flush() compacts once more than compact_ratio of
+    the rows are tombstones, delete() once more than half are.
+
+    Search is exact cosine top-k (blocked matmul + argpartition). When
+    hnswlib is installed and the index holds at least hnsw_threshold
+    vectors, flush() builds an HNSW graph that search uses whenever it is
+    in sync with the vectors.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        block_rows: int = 262144,
+        hnsw_threshold: int = 50000,
+        hnsw_ef: int = 128,
+        compact_ratio: float = 0.2
+    ):
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.vectors_path = self._vectors_file(0)
+        self.hnsw_path = os.path.join(path, "hnsw.bin")
+
+        self.block_rows = block_rows
+        self.hnsw_threshold = hnsw_threshold
+        self.hnsw_ef = hnsw_ef
+        self.compact_ratio = compact_ratio
+
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(
+            os.path.join(path, "meta.sqlite"), check_same_thread=False
+        )
+        # WAL: readers in other processes never block the writer
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "row INTEGER PRIMARY KEY, id TEXT UNIQUE, document TEXT, metadata TEXT)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER)"
+        )
+        self._conn.commit()
+
+        self._generation = None
+        self._vectors = None
+        self._live = np.zeros(0, dtype=bool)
+        self._n = 0
+        self.dim = None
+
+        self._hnsw = None
+        self._hnsw_generation = None
+
+    # -------------------------------------------------
+    # SIDECAR STATE
+    # -------------------------------------------------
+
+    def _info(self, key: str, default: int = 0) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM info WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def _set_info(self, **values):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+            list(values.items())
+        )
+
+    def _vectors_file(self, version: int) -> str:
+        # Each compaction writes the next version
+        name = f"vectors.{version}.f16" if version else "vectors.f16"
+        return os.path.join(self.path, name)
+
+    def _refresh(self):
+        """
+        Re-map vectors and reload the live mask if another writer
+        (this or another process) committed since the last look.
+        """
+
+        # One snapshot of counters and rows (a compaction changes both)
+        snapshot = not self._conn.in_transaction
+        if snapshot:
+            self._conn.execute("BEGIN")
+
+        try:
+            info = dict(self._conn.execute("SELECT key, value FROM info").fetchall())
+            generation = info.get("generation", 0)
+
+            if generation == self._generation:
+                return
+
+            rows = [r for (r,) in self._conn.execute(
+                "SELECT row FROM rows WHERE id IS NOT NULL"
+            )]
+
+        finally:
+            if snapshot:
+                self._conn.execute("COMMIT")
+
+        self._n = info.get("n", 0)
+        capacity = info.get("capacity", 0)
+        self.dim = info.get("dim") or None
+        self.vectors_path = self._vectors_file(info.get("file", 0))
+
+        self._vectors = (
+            np.memmap(
+                self.vectors_path, dtype=np.float16, mode="r",
+                shape=(capacity, self.dim)
+            )
+            if capacity and self.dim
+            else None
+        )
+
+        live = np.zeros(self._n, dtype=bool)
+        live[rows] = True
+        self._live = live
+
+        self._generation = generation
+
+    def _ensure_capacity(self, rows_needed: int):
+
+        capacity = self._info("capacity")
+
+        if rows_needed <= capacity:
+            return capacity
+
+        capacity = max(rows_needed, capacity * 2, 1024)
+
+        # Drop our own map before resizing (required on Windows); maps held
+        # by other processes stay valid because the file only grows
+        self._vectors = None
+        self._generation = None
+
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 2)
+
+        self._set_info(capacity=capacity)
+
+        return capacity
+
+    # -------------------------------------------------
+    # WRITES
+    # -------------------------------------------------
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        """
+        Write vectors and records; returns the row numbers used.
+        """
+
+        if not ids:
+            return []
+
+        vectors = _normalize(embeddings)
+
+        with self._lock:
+
+            self._refresh()
+
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._set_info(dim=self.dim)
+
+            existing = dict(self._select(
+                "SELECT id, row FROM rows WHERE id IN ({})", ids
+            ))
+
+            n = self._info("n")
+            rows = []
+
+            for doc_id in ids:
+                if doc_id in existing:
+                    rows.append(existing[doc_id])
+                else:
+                    existing[doc_id] = n
+                    rows.append(n)
+                    n += 1
+
+            capacity = self._ensure_capacity(n)
+
+            writable = np.memmap(
+                self.vectors_path, dtype=np.float16, mode="r+",
+                shape=(capacity, self.dim)
+            )
+            writable[rows] = vectors.astype(np.float16)
+            writable.flush()
+            del writable
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (row, id, document, metadata) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (row, doc_id, document, json.dumps(meta or {}))
+                    for row, doc_id, document, meta
+                    in zip(rows, ids, documents, metadatas)
+                ]
+            )
+
+            generation = self._info("generation") + 1
+            self._set_info(n=n, generation=generation)
+            self._conn.commit()
+
+            if self._load_hnsw():
+                if n > self._hnsw.get_max_elements():
+                    self._hnsw.resize_index(max(n, self._hnsw.get_max_elements() * 2))
+                self._hnsw.add_items(vectors, rows)
+                self._advance_hnsw(generation)
+
+            return rows
+
+    def delete(self, ids):
+
+        if not ids:
+            return
+
+        with self._lock:
+            self._tombstone(ids)
+            self._compact_above(max(self.compact_ratio, 0.5))
+
+    def _tombstone(self, ids):
+
+        with self._lock:
+
+            rows = [r for (_, r) in self._select(
+                "SELECT id, row FROM rows WHERE id IN ({})", ids
+            )]
+
+            # Tombstone: the row stays allocated, the id is released
+            self._conn.executemany(
+                "UPDATE rows SET id = NULL, document = NULL, metadata = NULL "
+                "WHERE row = ?",
+                [(r,) for r in rows]
+            )
+            generation = self._info("generation") + 1
+            self._set_info(generation=generation)
+            self._conn.commit()
+
+            if rows and self._load_hnsw():
+                for row in rows:
+                    self._hnsw.mark_deleted(row)
+                self._advance_hnsw(generation)
+
+    def _compact_above(self, ratio: float):
+
+        self._refresh()
+
+        if self._n and (self._n - int(self._live.sum())) / self._n > ratio:
+            self.compact()
+
+    def compact(self) -> int:
+        """
+        Drop tombstoned rows; returns how many were reclaimed.
+
+        Live rows keep their order and are copied into the next vectors
+        file; the sidecar is renumbered in the same transaction that
+        switches to it. A loaded HNSW graph is rebuilt.
+        """
+
+        with self._lock:
+
+            self._refresh()
+
+            keep = np.nonzero(self._live)[0]
+            reclaimed = self._n - len(keep)
+
+            if not reclaimed:
+                return 0
+
+            old_path = self.vectors_path
+            rebuild = hnswlib is not None and (
+                self._hnsw is not None or os.path.exists(self.hnsw_path)
+            )
+            version = self._info("file") + 1
+            capacity = max(len(keep), 1024)
+
+            writable = np.memmap(
+                self._vectors_file(version), dtype=np.float16, mode="w+",
+                shape=(capacity, self.dim)
+            )
+            for start in range(0, len(keep), self.block_rows):
+                part = keep[start:start + self.block_rows]
+                writable[start:start + len(part)] = self._vectors[part]
+            writable.flush()
+            del writable
+
+            # Ascending order: a row only ever moves down onto a free number
+            self._conn.execute("DELETE FROM rows WHERE id IS NULL")
+            self._conn.executemany(
+                "UPDATE rows SET row = ? WHERE row = ?",
+                [(new, int(old)) for new, old in enumerate(keep) if new != old]
+            )
+            self._set_info(
+                n=len(keep), capacity=capacity, file=version,
+                generation=self._info("generation") + 1
+            )
+            self._conn.commit()
+
+            self._vectors = None
+            self._hnsw = None
+            self._refresh()
+
+            try:
+                os.remove(old_path)
+            except OSError:  # still mapped elsewhere (Windows)
+                pass
+
+            if rebuild:
+                self._build_hnsw()
+                self._save_hnsw()
+
+            return reclaimed
+
+    def flush(self):
+        """
+        Compact past compact_ratio tombstones, then build or save the
+        HNSW graph and mark it in sync with the vectors.
+        """
+
+        with self._lock:
+            self._compact_above(self.compact_ratio)
+
+        if hnswlib is None:
+            return
+
+        with self._lock:
+
+            self._refresh()
+
+            if not self._load_hnsw():
+
+                if int(self._live.sum()) < self.hnsw_threshold:
+                    return
+
+                self._build_hnsw()
+
+            self._save_hnsw()
+
+    # -------------------------------------------------
+    # HNSW
+    # -------------------------------------------------
+
+    def _save_hnsw(self):
+
+        self._hnsw.save_index(self.hnsw_path)
+
+        self._set_info(hnsw_generation=self._generation)
+        self._conn.commit()
+        self._hnsw_generation = self._generation
+
+    def _build_hnsw(self):
+
+        graph = hnswlib.Index(space="ip", dim=self.dim)
+        graph.init_index(max_elements=max(self._n, 1), ef_construction=200, M=16)
+
+        for start in range(0, self._n, self.block_rows):
+            stop = min(start + self.block_rows, self._n)
+            rows = np.nonzero(self._live[start:stop])[0] + start
+
+            if len(rows):
+                graph.add_items(
+                    np.asarray(self._vectors[rows], dtype=np.float32), rows
+                )
+
+        graph.set_ef(self.hnsw_ef)
+        self._hnsw = graph
+
+    def _load_hnsw(self) -> bool:
+        """
+        Load the persisted graph if present; True when a graph is available.
+        """
+
+        if hnswlib is None:
+            return False
+
+        if self._hnsw is not None:
+            return True
+
+        if not os.path.exists(self.hnsw_path) or not self.dim:
+            return False
+
+        graph = hnswlib.Index(space="ip", dim=self.dim)
+        graph.load_index(self.hnsw_path, max_elements=max(self._info("n"), 1))
+        graph.set_ef(self.hnsw_ef)
+
+        self._hnsw = graph
+        self._hnsw_generation = self._info("hnsw_generation", -1)
+
+        return True
+
+    def _advance_hnsw(self, generation: int):
+        # The in-memory graph absorbed this write; still in sync if it was before
+        if self._hnsw_generation == generation - 1:
+            self._hnsw_generation = generation
+
+    def _hnsw_in_sync(self) -> bool:
+        """
+        The graph is only trusted when it reflects the latest write.
+        """
+
+        if not self._load_hnsw():
+            return False
+
+        if self._hnsw_generation != self._generation:
+            # A writer may have saved a newer graph since we loaded ours
+            if self._info("hnsw_generation", -1) == self._generation:
+                self._hnsw = None
+                return self._load_hnsw() and self._hnsw_generation == self._generation
+            return False
+
+        return True
+
+    # -------------------------------------------------
+    # READS
+    # -------------------------------------------------
+
+    def _select(self, sql: str, keys: list) -> list:
+
+        result = []
+
+        # SQLite caps bound parameters per statement
+        for i in range(0, len(keys), 500):
+            part = list(keys[i:i + 500])
+            result.extend(self._conn.execute(
+                sql.format(",".join("?" * len(part))), part
+            ).fetchall())
+
+        return result
+
+    def _records(self, rows) -> dict:
+        return {
+            row: (doc_id, document, json.loads(metadata) if metadata else {})
+            for row, doc_id, document, metadata in self._select(
+                "SELECT row, id, document, metadata FROM rows WHERE row IN ({})",
+                [int(r) for r in rows]
+            )
+        }
+
+    def _exact_top_k(self, queries: np.ndarray, top_k: int):
+        """
+        Cosine top-k over live rows. Blocks of block_rows are upcast to
+        float32 for BLAS; corpora below block_rows take a single matmul.
+        """
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, self._n, self.block_rows):
+
+            stop = min(start + self.block_rows, self._n)
+
+            block = np.asarray(self._vectors[start:stop], dtype=np.float32)
+            scores = queries @ block.T
+            scores[:, ~self._live[start:stop]] = -np.inf
+
+            k = min(top_k, stop - start)
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+            best_scores = np.concatenate(
+                [best_scores, np.take_along_axis(scores, part, axis=1)], axis=1
+            )
+            best_rows = np.concatenate([best_rows, part + start], axis=1)
+
+            if best_scores.shape[1] > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1, axis=1)[:, :top_k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+
+        return (
+            np.take_along_axis(best_rows, order, axis=1),
+            np.take_along_axis(best_scores, order, axis=1)
+        )
+
+    def _top_k(self, queries: np.ndarray, top_k: int):
+        """
+        Per query: row numbers and cosine scores, best first.
+        """
+
+        if self._hnsw_in_sync():
+            labels, distances = self._hnsw.knn_query(queries, k=top_k)
+            return labels.astype(np.int64), 1.0 - distances
+
+        return self._exact_top_k(queries, top_k)
+
+    def search(self, query_embeddings, top_k=5, include_embeddings=False):
+
+        queries = _normalize(query_embeddings)
+
+        with self._lock:
+
+            self._refresh()
+
+            live_count = int(self._live.sum())
+            k = min(top_k, live_count)
+
+            results = {
+                "ids": [], "documents": [], "metadatas": [],
+                "distances": [], "embeddings": [] if include_embeddings else None
+            }
+
+            if k == 0:
+                for key in ("ids", "documents", "metadatas", "distances"):
+                    results[key] = [[] for _ in queries]
+                if include_embeddings:
+                    results["embeddings"] = [np.empty((0, self.dim or 0)) for _ in queries]
+                return results
+
+            rows, scores = self._top_k(queries, k)
+
+            records = self._records(
+                np.unique(np.concatenate([np.ravel(r) for r in rows]))
+            )
+
+            for query_rows, query_scores in zip(rows, scores):
+
+                hits = [
+                    (row, score) for row, score in zip(query_rows, query_scores)
+                    if row in records and records[row][0] is not None
+                ]
+
+                results["ids"].append([records[r][0] for r, _ in hits])
+                results["documents"].append([records[r][1] for r, _ in hits])
+                results["metadatas"].append([records[r][2] for r, _ in hits])
+                # Cosine distance
+                results["distances"].append([float(1.0 - s) for _, s in hits])
+
+                if include_embeddings:
+                    results["embeddings"].append(
+                        np.asarray(self._vectors[[r for r, _ in hits]], dtype=np.float32)
+                    )
+
+            return results
+
+    def get(self, ids, include_embeddings=False):
+
+        with self._lock:
+
+            self._refresh()
+
+            found = {
+                doc_id: (row, document, json.loads(metadata) if metadata else {})
+                for doc_id, row, document, metadata in self._select(
+                    "SELECT id, row, document, metadata FROM rows WHERE id IN ({})",
+                    ids
+                )
+            }
+
+            hits = [doc_id for doc_id in ids if doc_id in found]
+
+            result = {
+                "ids": hits,
+                "documents": [found[i][1] for i in hits],
+                "metadatas": [found[i][2] for i in hits],
+                "embeddings": None,
+            }
+
+            if include_embeddings:
+                result["embeddings"] = np.asarray(
+                    self._vectors[[found[i][0] for i in hits]]
+                    if hits else np.empty((0, self.dim or 0)),
+                    dtype=np.float32
+                )
+
+            return result
+
+    def count(self):
+
+        with self._lock:
+            self._refresh()
+            return int(self._live.sum())
@@ -0,0 +1,208 @@
+import json
+import os
+
+import numpy as np
+
+from tools.embedding_service import EmbeddingService, DEFAULT_MODEL
+
+
+class _OnnxModel:
+    """
+    Loaded ONNX session + fast tokenizer + pooling config.
+    """
+
+    def __init__(self, session, tokenizer, config):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.config = config
+        self.input_names = [i.name for i in session.get_inputs()]
+
+
+class OnnxEmbeddingService(EmbeddingService):
+    """
+    CPU embedding backend: the sentence-transformers model exported to
+    ONNX, dynamically quantised to int8 and run with onnxruntime.
+
+    The export runs once (needs torch) and is cached under cache_dir;
+    afterwards only onnxruntime and tokenizers are loaded. Output matches
+    the torch backend: same pooling, same normalisation, same API.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        batch_size: int = 64,
+        normalize: bool = False,
+        threads: int | None = None,
+        quantize: bool = True,
+        cache_dir: str = "vector_db/onnx"
+    ):
+        super().__init__(model_name, batch_size, normalize)
+
+        self.threads = threads
+        self.quantize = quantize
+        self.model_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+
+        self.fingerprint = f"{model_name}:onnx-{'int8' if quantize else 'fp32'}"
+
+    # -------------------------------------------------
+    # EXPORT
+    # -------------------------------------------------
+
+    def _export(self):
+        """
+        Export the transformer to ONNX (and int8) once; returns the model path.
+        """
+
+        fp32_path = os.path.join(self.model_dir, "model.onnx")
+        int8_path = os.path.join(self.model_dir, "model-int8.onnx")
+        config_path = os.path.join(self.model_dir, "config.json")
+
+        target = int8_path if self.quantize else fp32_path
+
+        if os.path.exists(target) and os.path.exists(config_path):
+            return target
+
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+
+        os.makedirs(self.model_dir, exist_ok=True)
+
+        st_model = SentenceTransformer(self.model_name, device="cpu")
+        transformer = st_model[0].auto_model.eval()
+        tokenizer = st_model.tokenizer
+
+        pooling = next((m for m in st_model if isinstance(m, Pooling)), None)
+        pooling_mode = (
+            pooling.get_pooling_mode_str()
+            if hasattr(pooling, "get_pooling_mode_str")
+            else getattr(pooling, "pooling_mode", "mean")
+        )
+
+        input_names = [
+            name for name in ("input_ids", "attention_mask", "token_type_ids")
+            if name in tokenizer.model_input_names
+        ]
+
+        class _Wrapper(torch.nn.Module):
+
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                kwargs = dict(zip(input_names, inputs))
+                return self.model(**kwargs, return_dict=False)[0]
+
+        sample = tokenizer(["export sample"], return_tensors="pt")
+
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        torch.onnx.export(
+            _Wrapper(transformer),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False
+        )
+
+        if self.quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+        tokenizer.save_pretrained(self.model_dir)
+
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "max_seq_length": st_model.max_seq_length,
+                "dimension": st_model.get_sentence_embedding_dimension(),
+                "pooling": "cls" if pooling_mode == "cls" else "mean",
+                "normalize": any(isinstance(m, Normalize) for m in st_model),
+            }, f, indent=4)
+
+        return target
+
+    # -------------------------------------------------
+    # MODEL LOADING
+    # -------------------------------------------------
+
+    def _load_model(self):
+
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = self._export()
+
+        with open(os.path.join(self.model_dir, "config.json"), encoding="utf-8") as f:
+            config = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+
+        session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        tokenizer.enable_padding()
+
+        return _OnnxModel(session, tokenizer, config)
+
+    @property
+    def dimension(self) -> int:
+        return self.model.config["dimension"]
+
+    # -------------------------------------------------
+    # ENCODING
+    # -------------------------------------------------
+
+    def _encode_batch(self, texts: list, batch_size: int, normalize: bool):
+
+        model = self.model
+        outputs = []
+
+        for i in range(0, len(texts), batch_size):
+
+            encodings = model.tokenizer.encode_batch(texts[i:i + batch_size])
+
+            features = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array(
+                    [e.attention_mask for e in encodings], dtype=np.int64
+                ),
+                "token_type_ids": np.array(
+                    [e.type_ids for e in encodings], dtype=np.int64
+                ),
+            }
+
+            hidden = model.session.run(
+                None, {name: features[name] for name in model.input_names}
+            )[0]
+
+            if model.config["pooling"] == "cls":
+                pooled = hidden[:, 0]
+            else:
+                mask = features["attention_mask"][:, :, None].astype(np.float32)
+                pooled = (hidden * mask).sum(axis=1) / np.clip(
+                    mask.sum(axis=1), 1e-9, None
+                )
+
+            if normalize or model.config["normalize"]:
+                pooled = pooled / np.clip(
+                    np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None
+                )
+
+            outputs.append(pooled.astype(np.float32))
+
+        return np.concatenate(outputs, axis=0)
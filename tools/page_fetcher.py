@@ -0,0 +1,316 @@
+from html.parser import HTMLParser
+from typing import List, Dict
+from urllib.parse import urlparse
+import asyncio
+import codecs
+import hashlib
+import time
+
+import httpx
+
+from tools.disk_cache import DiskCache
+from tools.web_search_tool import BackgroundLoop
+
+
+# Subtrees that never hold article text
+_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "canvas",
+    "nav", "header", "footer", "aside", "form", "button", "select",
+}
+
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table",
+    "tr", "td", "th", "pre", "blockquote", "dd", "dt", "figcaption", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+}
+
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "source", "track", "wbr",
+}
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental boilerplate stripper: feed() it HTML as it arrives.
+
+    Text inside navigation, scripts, forms and similar tags is skipped.
+    The rest is split into blocks at block-level tags; a block is kept
+    when it has at least min_words words (headings always) and at most
+    max_link_density of its characters are link text. Stops collecting
+    once max_chars of text are kept (`full`).
+    """
+
+    def __init__(
+        self,
+        min_words: int = 6,
+        max_link_density: float = 0.5,
+        max_chars: int = 100_000
+    ):
+        super().__init__(convert_charrefs=True)
+
+        self.min_words = min_words
+        self.max_link_density = max_link_density
+        self.max_chars = max_chars
+
+        self.title = ""
+        self.blocks = []
+        self.size = 0
+
+        self._skip = 0
+        self._links = 0
+        self._in_title = False
+        self._heading = False
+        self._parts = []
+        self._link_chars = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+
+        if tag in _SKIP_TAGS and tag not in _VOID_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            self._links += 1
+
+        if tag in _BLOCK_TAGS:
+            self._end_block()
+            self._heading = tag in _HEADING_TAGS
+
+    def handle_endtag(self, tag):
+
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag == "a" and self._links:
+            self._links -= 1
+
+        if tag in _BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data):
+
+        if self._in_title:
+            self.title += data
+            return
+
+        if self._skip or self.full:
+            return
+
+        self._parts.append(data)
+
+        if self._links:
+            self._link_chars += len(data.strip())
+
+    def _end_block(self):
+
+        text = " ".join("".join(self._parts).split())
+        heading = self._heading
+
+        self._parts = []
+        self._heading = False
+        link_chars, self._link_chars = self._link_chars, 0
+
+        if not text or self.full:
+            return
+
+        if link_chars > self.max_link_density * len(text):
+            return
+
+        if not heading and len(text.split()) < self.min_words:
+            return
+
+        self.blocks.append(text)
+        self.size += len(text)
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+    def text(self) -> str:
+        return "\n\n".join(self.blocks)[:self.max_chars]
+
+
+class PageFetcher:
+    """
+    Downloads web result pages concurrently and keeps their main text.
+
+    One pooled keep-alive client on a background loop; at most per_host
+    requests per host at a time. Bodies are streamed into TextExtractor
+    and cut off at max_bytes or after timeout seconds. Pages are cached
+    by URL: within fresh_for seconds no request is made, afterwards the
+    stored ETag / Last-Modified are revalidated and a 304 reuses the text.
+    """
+
+    def __init__(
+        self,
+        cache: DiskCache | None = None,
+        max_bytes: int = 2_000_000,
+        max_chars: int = 100_000,
+        timeout: float = 10.0,
+        per_host: int = 2,
+        max_connections: int = 20,
+        fresh_for: float = 86400,
+        user_agent: str = "InsightFusion/1.0 (research engine)"
+    ):
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.fresh_for = fresh_for
+        self.user_agent = user_agent
+
+        self._loop = BackgroundLoop("page-fetch")
+        self._client = None
+        self._hosts = {}
+
+    # -------------------------------------------------
+    # REQUESTS (run on the fetcher's loop)
+    # -------------------------------------------------
+
+    def _get_client(self):
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.user_agent},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=self.timeout,
+                follow_redirects=True
+            )
+
+        return self._client
+
+    async def _stream(self, url: str, cached: dict | None) -> Dict:
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+
+            if response.status_code == 304 and cached:
+                return {**cached, "fetched": time.time(), "revalidated": True}
+
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "")
+            if content_type and not content_type.startswith(
+                ("text/html", "text/plain", "application/xhtml")
+            ):
+                raise ValueError(f"unsupported content type {content_type}")
+
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(
+                errors="replace"
+            )
+            extractor = TextExtractor(max_chars=self.max_chars)
+            received = 0
+
+            async for data in response.aiter_bytes():
+
+                received += len(data)
+                extractor.feed(decoder.decode(data))
+
+                if received >= self.max_bytes or extractor.full:
+                    break
+
+            extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+
+            text = extractor.text()
+
+            return {
+                "url": url,
+                "title": " ".join(extractor.title.split()),
+                "text": text,
+                "content_hash": hashlib.md5(text.encode()).hexdigest(),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "bytes": received,
+                "truncated": received >= self.max_bytes or extractor.full,
+                "fetched": time.time(),
+            }
+
+    async def _fetch_one(self, url: str, cached: dict | None) -> Dict:
+
+        host = urlparse(url).netloc
+        semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+
+        try:
+            async with semaphore:
+                # Whole-page deadline: connect, headers and body
+                return await asyncio.wait_for(self._stream(url, cached), self.timeout)
+
+        except Exception as e:
+            return {"url": url, "error": f"{type(e).__name__}: {e}"}
+
+    async def _fetch_many(self, urls: list, cached: dict) -> list:
+        return await asyncio.gather(
+            *(self._fetch_one(url, cached.get(url)) for url in urls)
+        )
+
+    async def _close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -------------------------------------------------
+    # PUBLIC API
+    # -------------------------------------------------
+
+    def fetch_many(self, urls: List[str]) -> List[Dict]:
+        """
+        One dict per distinct URL: {"url", "title", "text", "content_hash",
+        "cached", ...} or {"url", "error"}.
+        """
+
+        urls = list(dict.fromkeys(
+            u for u in urls if u and urlparse(u).scheme in ("http", "https")
+        ))
+
+        if not urls:
+            return []
+
+        cached = self.cache.get_many(urls) if self.cache is not None else {}
+
+        now = time.time()
+        pages = {
+            url: {**page, "cached": True}
+            for url, page in cached.items()
+            if now - page.get("fetched", 0) < self.fresh_for
+        }
+
+        stale = [u for u in urls if u not in pages]
+
+        if stale:
+            for url, page in zip(stale, self._loop.run(self._fetch_many(stale, cached))):
+
+                revalidated = page.pop("revalidated", False)
+
+                if "error" not in page and self.cache is not None:
+                    self.cache.put(url, page)
+
+                pages[url] = {**page, "cached": revalidated}
+
+        return [pages[u] for u in urls]
+
+    def close(self):
+
+        if not self._loop.running:
+            return
+
+        self._loop.run(self._close())
+        self._loop.stop()
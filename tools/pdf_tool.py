@@ -1,40 +1,512 @@
+import os
+import re
+import time
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+
 import fitz
 from tools.chunking_tool import TextChunker
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
-class PDFProcessor:
 
-    def __init__(self):
-        self.chunker = TextChunker()
+def _toc_sections(toc):
+    """
+    Outline entries as (page_number, title path), e.g. "Methods > Data".
+    """
 
-    def extract_text_and_chunks(self, file_path: str):
+    path = []
+    sections = []
+
+    for level, title, page in toc:
+        del path[level - 1:]
+        path.append(title.strip())
+        sections.append((page, " > ".join(path)))
+
+    return sections
+
+
+def _body_font_size(doc, sample_pages=8):
+    """
+    Most common font size (by characters) over pages sampled across the
+    whole document, so every page range agrees on it.
+    """
+
+    sizes = {}
+    step = max(1, doc.page_count // sample_pages)
+
+    for page_number in range(0, doc.page_count, step):
+        for block in doc[page_number].get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    # Whole points: justified text varies by fractions
+                    size = round(span["size"])
+                    sizes[size] = sizes.get(size, 0) + len(span["text"].strip())
+
+    return max(sizes, key=sizes.get) if sizes else 0.0
+
+
+def _detect_headings(page, body_size):
+    """
+    Heading blocks by layout: short (at most 3 lines), outside the
+    header/footer margins, and either noticeably larger than body text
+    or entirely bold ("2.1 Planning with Structured World Knowledge").
+    """
+
+    headings = []
+    height = page.rect.height
+
+    for block in page.get_text("dict")["blocks"]:
+
+        # Horizontal lines only (skips rotated margin stamps)
+        lines = [
+            line for line in block.get("lines", [])
+            if abs(line["dir"][1]) < 1e-3
+        ]
+        spans = [s for line in lines for s in line["spans"] if s["text"].strip()]
+
+        if not spans or len(lines) > 3:
+            continue
+
+        y0, y1 = block["bbox"][1], block["bbox"][3]
+        if y1 < height * 0.06 or y0 > height * 0.94:
+            continue
+
+        text = " ".join(
+            "".join(s["text"] for s in line["spans"]).strip() for line in lines
+        ).strip()
+
+        if len(text) > 120 or text[-1] in ".:,;" or not any(c.isalpha() for c in text):
+            continue
+
+        size = max(s["size"] for s in spans)
+        bold = all(s["flags"] & 16 for s in spans)
+
+        if size >= body_size * 1.15 or (bold and size >= body_size * 0.95):
+            headings.append(text)
+
+    return headings
+
+
+def _page_headings(page_text, titles, start_offset=0):
+    """
+    (offset in page_text, title) for titles found on the page, in order;
+    titles that can't be located are placed at the top of the page.
+    """
+
+    offsets = []
+    position = start_offset
+
+    for title in titles:
+        # Whitespace-insensitive: heading lines may be split in page_text
+        words = title.split(" > ")[-1].split()[:8]
+        found = re.compile(r"\s+".join(map(re.escape, words))).search(page_text, position)
+        if found:
+            position = found.start()
+        offsets.append((position, title))
+
+    return offsets
+
+
+def _extract_page_range(chunker, file_path, start=0, stop=None, include_text=True):
+    """
+    Extract pages [start, stop) of a PDF.
+
+    Returns (page_count, page_texts, chunks, section). page_texts is
+    empty when include_text is False (streaming ingestion only needs the
+    chunks).
+
+    Each chunk carries the section it falls in: from the PDF outline
+    when there is one, otherwise from detected heading lines. Chunks
+    before the first heading of a range get None; the caller fills them
+    in from the previous range's returned `section` (open at its end).
+    """
+
+    doc = fitz.open(file_path)
+
+    try:
+        page_count = doc.page_count
+        stop = page_count if stop is None else min(stop, page_count)
+
+        toc = _toc_sections(doc.get_toc())
+
+        body_size = None if toc else _body_font_size(doc)
+
+        # The outline tells us the section the range opens in
+        section = next(
+            (title for page, title in reversed(toc) if page <= start), None
+        )
+
+        page_texts = []
+        page_chunks = []
+
+        for page_number in range(start, stop):
+
+            page = doc[page_number]
+            page_text = page.get_text()
+
+            if include_text:
+                page_texts.append(page_text)
+
+            titles = (
+                [title for page, title in toc if page == page_number + 1]
+                if toc
+                else _detect_headings(page, body_size)
+            )
+            headings = _page_headings(page_text, titles)
+
+            h = 0
+
+            for span in chunker.chunk_spans(page_text):
+
+                # Section of a chunk = last heading at or before its start
+                while h < len(headings) and headings[h][0] <= span[0]:
+                    section = headings[h][1]
+                    h += 1
+
+                chunk = {
+                    "page_number": page_number + 1,
+                    "text": chunker.materialize(page_text, span),
+                    "section": section
+                }
+                page_chunks.append(chunk)
+
+            # Headings after the page's last chunk open the next page
+            if h < len(headings):
+                section = headings[-1][1]
+
+        return page_count, page_texts, page_chunks, section
+
+    finally:
+        doc.close()
+
+
+def _apply_memory_limit(memory_limit_mb):
+    """
+    Cap the address space a worker may grow by (Linux only).
+
+    The cap is applied on top of the worker's virtual size at startup,
+    so shared library mappings don't count against it.
+    """
+
+    if not memory_limit_mb or resource is None:
+        return
+
+    try:
+        with open("/proc/self/statm") as f:
+            baseline = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return
+
+    limit = baseline + memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _extraction_worker(conn, chunker, memory_limit_mb):
+
+    _apply_memory_limit(memory_limit_mb)
+
+    while True:
+
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if job is None:
+            break
+
+        job_id, file_path, start, stop, include_text = job
 
         try:
-            doc = fitz.open(file_path)
+            result = _extract_page_range(
+                chunker, file_path, start, stop, include_text
+            )
+            conn.send((job_id, result, None))
+        except Exception as e:
+            conn.send((job_id, None, str(e) or type(e).__name__))
 
-            full_text = ""
-            page_chunks = []
 
-            for page_number, page in enumerate(doc):
+class _Worker:
 
-                page_text = page.get_text()
-                full_text += page_text
+    def __init__(self, ctx, chunker, memory_limit_mb):
+        self.conn, child_conn = ctx.Pipe()
 
-                chunks = self.chunker.chunk_text(page_text)
+        self.process = ctx.Process(
+            target=_extraction_worker,
+            args=(child_conn, chunker, memory_limit_mb),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
 
-                for chunk in chunks:
-                    page_chunks.append({
-                        "page_number": page_number + 1,
-                        "text": chunk
-                    })
+        self.job = None
 
-            doc.close()
+    def submit(self, job):
+        self.job = job
+        self.conn.send(job)
+
+    def stop(self, force=False):
+        try:
+            if not force:
+                self.conn.send(None)
+                self.process.join(timeout=1)
+        except (OSError, BrokenPipeError):
+            pass
+
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=1)
+
+        self.conn.close()
+
+
+class PDFProcessor:
+
+    # Bumped when the per-chunk structure (e.g. section) metadata changes
+    STRUCTURE_VERSION = 1
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        pages_per_task: int = 16,
+        timeout: float = 300.0,
+        memory_limit_mb: int | None = 2048
+    ):
+        self.chunker = TextChunker()
+
+        # Process-pool extraction settings
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+
+    def extract_text_and_chunks(self, file_path: str):
+
+        try:
+            _, page_texts, page_chunks, _ = _extract_page_range(
+                self.chunker, file_path
+            )
 
             return {
                 "file_path": file_path,
-                "text": full_text,
+                "text": "".join(page_texts),
                 "chunks": page_chunks
             }
 
         except Exception as e:
             return {"error": str(e)}
+
+    # -------------------------------------------------
+    # PARALLEL EXTRACTION
+    # -------------------------------------------------
+
+    def extract_many(self, file_paths, **kwargs):
+        """
+        Extract many PDFs in a process pool. See iter_extract.
+        """
+        return list(self.iter_extract(file_paths, **kwargs))
+
+    def iter_extract(
+        self,
+        file_paths,
+        workers: int | None = None,
+        pages_per_task: int | None = None,
+        timeout: float | None = None,
+        memory_limit_mb: int | None = None,
+        include_text: bool = True
+    ):
+        """
+        Extract PDFs across worker processes, split by file and page range.
+
+        Each file has one deadline, `timeout` seconds after its first
+        page range starts, shared by all its ranges; each range runs
+        under the memory cap. A file that runs past its deadline, or
+        whose worker hangs, crashes or errors, yields {"file_path",
+        "error"} without affecting the others (workers still on it at the
+        deadline are killed). Results are yielded in input order with
+        chunks in page order, identical to extract_text_and_chunks.
+
+        At most `workers * 2` files are in flight ahead of the next one to
+        be yielded, so a slow file can't make the rest pile up in memory.
+        """
+
+        file_paths = list(file_paths)
+
+        if not file_paths:
+            return
+
+        workers = workers or self.workers
+        pages_per_task = pages_per_task or self.pages_per_task
+        timeout = timeout or self.timeout
+        memory_limit_mb = memory_limit_mb or self.memory_limit_mb
+
+        # forkserver keeps workers safe to start from threaded callers
+        # (the streaming pipeline); Windows falls back to spawn
+        start_method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else None
+        )
+        ctx = multiprocessing.get_context(start_method)
+
+        files = [
+            {"page_count": None, "pending": 1, "parts": {}, "error": None, "deadline": None}
+            for _ in file_paths
+        ]
+
+        jobs = deque(
+            (idx, 0, pages_per_task) for idx in range(len(file_paths))
+        )
+
+        pool = []
+        next_to_yield = 0
+        lookahead = workers * 2
+
+        def fail(file_idx, message):
+            if files[file_idx]["error"] is None:
+                files[file_idx]["error"] = message
+
+        def finish(file_idx):
+            files[file_idx]["pending"] -= 1
+
+        try:
+            while next_to_yield < len(file_paths):
+
+                # Hand out jobs to idle workers, spawning lazily
+                idle = [w for w in pool if w.job is None]
+
+                while jobs and (idle or len(pool) < workers):
+
+                    if jobs[0][0] >= next_to_yield + lookahead:
+                        break
+
+                    file_idx, start, stop = jobs.popleft()
+                    state = files[file_idx]
+
+                    if state["deadline"] is None:
+                        state["deadline"] = time.monotonic() + timeout
+
+                    elif time.monotonic() >= state["deadline"]:
+                        fail(file_idx, f"Timed out after {timeout}s")
+
+                    if state["error"] is not None:
+                        finish(file_idx)
+                        continue
+
+                    if idle:
+                        worker = idle.pop()
+                    else:
+                        worker = _Worker(ctx, self.chunker, memory_limit_mb)
+                        pool.append(worker)
+
+                    worker.submit(
+                        (file_idx, file_paths[file_idx], start, stop, include_text)
+                    )
+
+                busy = [w for w in pool if w.job is not None]
+
+                if busy:
+                    now = time.monotonic()
+                    wait_for = max(
+                        0.0,
+                        min(files[w.job[0]]["deadline"] for w in busy) - now
+                    )
+
+                    ready = wait([w.conn for w in busy], timeout=wait_for)
+
+                    for worker in busy:
+
+                        file_idx, _, start, stop, _ = worker.job
+
+                        replace = False
+
+                        if worker.conn in ready:
+                            try:
+                                _, result, error = worker.conn.recv()
+                            except (EOFError, OSError):
+                                result, error = None, "Worker process crashed"
+                                replace = True
+
+                        elif time.monotonic() >= files[file_idx]["deadline"]:
+                            result, error = None, f"Timed out after {timeout}s"
+                            replace = True
+
+                        else:
+                            continue
+
+                        worker.job = None
+
+                        if replace:
+                            # Dead or hung workers are killed; a fresh one is spawned on demand
+                            worker.stop(force=True)
+                            pool.remove(worker)
+
+                        if result is None:
+                            fail(file_idx, error)
+                            finish(file_idx)
+                            continue
+
+                        page_count, page_texts, page_chunks, section = result
+                        state = files[file_idx]
+                        state["parts"][start] = (page_texts, page_chunks, section)
+
+                        # First range reveals the page count → queue the rest
+                        if start == 0 and page_count > stop:
+                            rest = [
+                                (file_idx, s, s + pages_per_task)
+                                for s in range(stop, page_count, pages_per_task)
+                            ]
+                            state["pending"] += len(rest)
+                            jobs.extendleft(reversed(rest))
+
+                        state["page_count"] = page_count
+                        finish(file_idx)
+
+                # Yield finished files in input order
+                while (
+                    next_to_yield < len(file_paths)
+                    and files[next_to_yield]["pending"] == 0
+                ):
+                    yield self._assemble(
+                        file_paths[next_to_yield], files[next_to_yield]
+                    )
+                    files[next_to_yield] = None
+                    next_to_yield += 1
+
+        finally:
+            for worker in pool:
+                worker.stop(force=worker.job is not None)
+
+    def _assemble(self, file_path, state):
+
+        if state["error"] is not None:
+            return {"file_path": file_path, "error": state["error"]}
+
+        page_texts = []
+        page_chunks = []
+        section = None
+
+        for start in sorted(state["parts"]):
+            texts, chunks, range_section = state["parts"][start]
+
+            # Chunks before a range's first heading continue the section
+            # left open by the previous range
+            for chunk in chunks:
+                if chunk["section"] is None:
+                    chunk["section"] = section
+
+            page_texts.extend(texts)
+            page_chunks.extend(chunks)
+
+            section = range_section or section
+
+        return {
+            "file_path": file_path,
+            "text": "".join(page_texts),
+            "chunks": page_chunks
+        }
@@ -0,0 +1,491 @@
+import os
+
+import numpy as np
+
+from tools.numpy_index import NumpyIndex, _normalize
+
+
+class QuantizedIndex(NumpyIndex):
+    """
+    NumpyIndex that searches compressed codes held in RAM.
+
+    mode="int8":  per-dimension scalar quantisation, 1 byte per dimension.
+    mode="ivfpq": IVF coarse quantiser + product quantisation of the
+                  residuals, `m` bytes per vector; only `nprobe` inverted
+                  lists are scanned per query.
+
+    Candidates are scored with asymmetric distance computation (float
+    query against codes) and the best `top_k * rerank` are re-scored
+    against the full-precision float16 vectors, which stay on disk in the
+    NumpyIndex memmap. Until enough vectors exist to train (train_min),
+    search falls back to the exact NumpyIndex path.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "int8",
+        m: int = 48,
+        nlist: int | None = None,
+        nprobe: int = 8,
+        rerank: int = 4,
+        train_min: int | None = None,
+        train_sample: int = 50000,
+        **kwargs
+    ):
+        if mode not in ("int8", "ivfpq"):
+            raise ValueError(f"Unknown quantization mode: {mode}")
+
+        # Compressed codes replace the HNSW graph
+        kwargs.setdefault("hnsw_threshold", float("inf"))
+
+        super().__init__(path, **kwargs)
+
+        self.mode = mode
+        self.m = m
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.train_min = train_min or (1000 if mode == "int8" else 10000)
+        self.train_sample = train_sample
+
+        self.codes_dir = os.path.join(path, mode)
+
+        self._codebook = None
+        self._codes = None
+        self._assign = None
+        self._codes_generation = None
+        self._lists = None
+
+    # -------------------------------------------------
+    # TRAINING / ENCODING
+    # -------------------------------------------------
+
+    def _train(self, sample: np.ndarray):
+
+        if self.mode == "int8":
+            low = sample.min(axis=0)
+            high = sample.max(axis=0)
+
+            self._codebook = {
+                "offset": low.astype(np.float32),
+                "scale": np.maximum((high - low) / 255.0, 1e-8).astype(np.float32),
+            }
+            return
+
+        from sklearn.cluster import MiniBatchKMeans
+
+        dim = sample.shape[1]
+
+        # Sub-vector count must divide the dimension
+        m = max(d for d in range(1, min(self.m, dim) + 1) if dim % d == 0)
+
+        nlist = self.nlist or int(np.clip(4 * np.sqrt(len(sample)), 16, 4096))
+        nlist = min(nlist, len(sample) // 39 or 1)
+
+        coarse = MiniBatchKMeans(
+            n_clusters=nlist, batch_size=4096, n_init=1, random_state=42
+        ).fit(sample).cluster_centers_.astype(np.float32)
+
+        residuals = sample - coarse[self._nearest(sample, coarse)]
+
+        sub_dim = dim // m
+        n_codes = min(256, len(sample))
+
+        codebooks = np.stack([
+            MiniBatchKMeans(
+                n_clusters=n_codes, batch_size=4096, n_init=1, random_state=42
+            ).fit(residuals[:, j * sub_dim:(j + 1) * sub_dim]).cluster_centers_
+            for j in range(m)
+        ]).astype(np.float32)
+
+        self._codebook = {"coarse": coarse, "codebooks": codebooks}
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||² == argmin (||c||² - 2 x·c)
+        return np.argmin(
+            (centroids ** 2).sum(axis=1)[None, :] - 2.0 * vectors @ centroids.T,
+            axis=1
+        )
+
+    def _encode(self, vectors: np.ndarray):
+        """
+        Returns (codes, coarse list assignment or None).
+        """
+
+        if self.mode == "int8":
+            codes = np.rint(
+                (vectors - self._codebook["offset"]) / self._codebook["scale"]
+            )
+            return np.clip(codes, 0, 255).astype(np.uint8), None
+
+        coarse = self._codebook["coarse"]
+        codebooks = self._codebook["codebooks"]
+        m, _, sub_dim = codebooks.shape
+
+        assign = self._nearest(vectors, coarse).astype(np.int32)
+        residuals = vectors - coarse[assign]
+
+        codes = np.stack([
+            self._nearest(residuals[:, j * sub_dim:(j + 1) * sub_dim], codebooks[j])
+            for j in range(m)
+        ], axis=1).astype(np.uint8)
+
+        return codes, assign
+
+    def _encode_rows(self, start: int, stop: int):
+
+        for block_start in range(start, stop, self.block_rows):
+            block_stop = min(block_start + self.block_rows, stop)
+
+            codes, assign = self._encode(
+                np.asarray(self._vectors[block_start:block_stop], dtype=np.float32)
+            )
+
+            self._codes[block_start:block_stop] = codes
+
+            if assign is not None:
+                self._assign[block_start:block_stop] = assign
+
+    def _grow_codes(self, n: int):
+
+        if self._codes is not None and len(self._codes) >= n:
+            return
+
+        width = (
+            self._codebook["codebooks"].shape[0]
+            if self.mode == "ivfpq" else self.dim
+        )
+
+        codes = np.zeros((n, width), dtype=np.uint8)
+        assign = np.zeros(n, dtype=np.int32)
+
+        if self._codes is not None:
+            codes[:len(self._codes)] = self._codes
+            assign[:len(self._assign)] = self._assign
+
+        self._codes, self._assign = codes, assign
+
+    # -------------------------------------------------
+    # PERSISTENCE
+    # -------------------------------------------------
+
+    def _load_codes(self) -> bool:
+
+        if self._codes is not None:
+            return True
+
+        path = os.path.join(self.codes_dir, "codes.npz")
+
+        if not os.path.exists(path):
+            return False
+
+        data = np.load(path)
+
+        self._codebook = {
+            key: data[key] for key in ("offset", "scale", "coarse", "codebooks")
+            if key in data
+        }
+        self._codes = data["codes"]
+        self._assign = data["assign"]
+        self._codes_generation = self._info(f"{self.mode}_generation", -1)
+        self._lists = None
+
+        return True
+
+    def _codes_in_sync(self) -> bool:
+
+        if not self._load_codes():
+            return False
+
+        if self._codes_generation != self._generation:
+            # Another process may have saved newer codes since we loaded ours
+            if self._info(f"{self.mode}_generation", -1) == self._generation:
+                self._codes = None
+                return self._load_codes() and self._codes_generation == self._generation
+            return False
+
+        return True
+
+    def flush(self):
+        """
+        Train (once enough vectors exist) and persist the compressed codes.
+        """
+
+        super().flush()
+
+        with self._lock:
+
+            self._refresh()
+
+            if self._load_codes():
+
+                # Rows written elsewhere since our codes were loaded
+                if not self._codes_in_sync():
+                    self._grow_codes(self._n)
+                    self._encode_rows(0, self._n)
+                    self._lists = None
+
+            else:
+
+                live_rows = np.nonzero(self._live)[0]
+
+                if len(live_rows) < self.train_min:
+                    return
+
+                sample_rows = np.sort(np.random.default_rng(42).choice(
+                    live_rows, min(len(live_rows), self.train_sample), replace=False
+                ))
+
+                self._train(np.asarray(self._vectors[sample_rows], dtype=np.float32))
+                self._codes = None
+                self._grow_codes(self._n)
+                self._encode_rows(0, self._n)
+                self._lists = None
+
+            if self._info(f"{self.mode}_generation", -1) == self._generation:
+                return
+
+            os.makedirs(self.codes_dir, exist_ok=True)
+
+            tmp_path = os.path.join(self.codes_dir, "codes.tmp.npz")
+            np.savez(
+                tmp_path, codes=self._codes, assign=self._assign, **self._codebook
+            )
+            os.replace(tmp_path, os.path.join(self.codes_dir, "codes.npz"))
+
+            self._set_info(**{f"{self.mode}_generation": self._generation})
+            self._conn.commit()
+            self._codes_generation = self._generation
+
+    # -------------------------------------------------
+    # WRITES
+    # -------------------------------------------------
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+
+        with self._lock:
+
+            self._refresh()
+            in_sync = self._codes_in_sync()
+
+            rows = super().upsert(ids, documents, embeddings, metadatas)
+
+            if self._codes is not None and rows:
+                codes, assign = self._encode(_normalize(embeddings))
+
+                self._grow_codes(max(rows) + 1)
+                self._codes[rows] = codes
+
+                if assign is not None:
+                    self._assign[rows] = assign
+
+                self._lists = None
+
+                if in_sync:
+                    self._codes_generation = self._info("generation")
+
+            return rows
+
+    def _tombstone(self, ids):
+
+        with self._lock:
+
+            self._refresh()
+            in_sync = self._codes_in_sync()
+
+            super()._tombstone(ids)
+
+            # Tombstones are masked by the live mask; codes need no change
+            if in_sync:
+                self._codes_generation = self._info("generation")
+
+    def compact(self) -> int:
+
+        with self._lock:
+
+            self._refresh()
+            in_sync = self._codes_in_sync()
+            keep = np.nonzero(self._live)[0]
+
+            reclaimed = super().compact()
+
+            # Codes follow their rows; stale codes are re-encoded on flush
+            if reclaimed and in_sync:
+                self._codes = self._codes[keep]
+                self._assign = self._assign[keep]
+                self._lists = None
+                self._codes_generation = self._info("generation")
+
+            return reclaimed
+
+    # -------------------------------------------------
+    # SEARCH
+    # -------------------------------------------------
+
+    def _inverted_lists(self):
+        """
+        Rows grouped by coarse list: (rows sorted by list, list offsets).
+        """
+
+        if self._lists is None:
+            n = self._n
+            order = np.argsort(self._assign[:n], kind="stable")
+            counts = np.bincount(
+                self._assign[:n], minlength=len(self._codebook["coarse"])
+            )
+            self._lists = (order, np.concatenate([[0], np.cumsum(counts)]))
+
+        return self._lists
+
+    def _approximate_scores(self, query: np.ndarray):
+        """
+        ADC scores for one query: (candidate rows, approximate dot products).
+        """
+
+        n = self._n
+
+        if self.mode == "int8":
+            shift = float(query @ self._codebook["offset"])
+            weights = query * self._codebook["scale"]
+
+            rows_out, scores_out = [], []
+            # Codes are upcast per block; keep the float32 copy small
+            block_rows = min(self.block_rows, 32768)
+
+            for start in range(0, n, block_rows):
+                stop = min(start + block_rows, n)
+                scores = self._codes[start:stop].astype(np.float32) @ weights + shift
+                rows_out.append(np.arange(start, stop))
+                scores_out.append(scores)
+
+            rows = np.concatenate(rows_out)
+            scores = np.concatenate(scores_out)
+
+        else:
+            coarse = self._codebook["coarse"]
+            codebooks = self._codebook["codebooks"]
+            m, _, sub_dim = codebooks.shape
+
+            coarse_scores = coarse @ query
+            nprobe = min(self.nprobe, len(coarse))
+            probe = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+            order, offsets = self._inverted_lists()
+            rows = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in probe])
+
+            # Inner-product lookup table, one row per sub-quantiser
+            lut = np.einsum("md,mkd->mk", query.reshape(m, sub_dim), codebooks)
+
+            scores = (
+                coarse_scores[self._assign[rows]]
+                + lut[np.arange(m)[None, :], self._codes[rows]].sum(axis=1)
+            )
+
+        live = self._live[rows]
+        return rows[live], scores[live]
+
+    def _compressed_top_k(self, queries: np.ndarray, top_k: int, rerank: int | None = None):
+
+        rerank = self.rerank if rerank is None else rerank
+
+        all_rows, all_scores = [], []
+
+        for query in queries:
+
+            rows, scores = self._approximate_scores(query)
+
+            candidates = min(len(rows), max(top_k, top_k * rerank))
+
+            if candidates == 0:
+                all_rows.append(np.zeros(0, dtype=np.int64))
+                all_scores.append(np.zeros(0, dtype=np.float32))
+                continue
+
+            best = np.argpartition(-scores, candidates - 1)[:candidates]
+            rows, scores = rows[best], scores[best]
+
+            if rerank > 1:
+                # Re-score against full-precision vectors on disk
+                order = np.argsort(rows)
+                rows = rows[order]
+                scores = np.asarray(self._vectors[rows], dtype=np.float32) @ query
+
+            keep = np.argsort(-scores)[:top_k]
+
+            all_rows.append(rows[keep])
+            all_scores.append(scores[keep])
+
+        return all_rows, all_scores
+
+    def _top_k(self, queries, top_k):
+
+        if self._codes_in_sync():
+            return self._compressed_top_k(queries, top_k)
+
+        return super()._top_k(queries, top_k)
+
+    # -------------------------------------------------
+    # REPORTING
+    # -------------------------------------------------
+
+    def memory_per_vector(self) -> dict:
+        """
+        Bytes per vector held in RAM by the codes vs float32 / float16.
+        """
+
+        with self._lock:
+
+            self._refresh()
+
+            if not self._load_codes() or not self._n:
+                return {}
+
+            code_bytes = self._codes.nbytes + (
+                self._assign.nbytes if self.mode == "ivfpq" else 0
+            )
+            codebook_bytes = sum(v.nbytes for v in self._codebook.values())
+
+            per_vector = (code_bytes + codebook_bytes) / self._n
+
+            return {
+                "mode": self.mode,
+                "bytes_per_vector": round(per_vector, 2),
+                "float32_bytes_per_vector": self.dim * 4,
+                "float16_bytes_per_vector": self.dim * 2,
+                "compression_vs_float32": round(self.dim * 4 / per_vector, 1),
+            }
+
+    def evaluate(self, query_embeddings, top_k: int = 10) -> dict:
+        """
+        recall@k of compressed search (with and without rerank) against
+        exact search, plus memory per vector.
+        """
+
+        queries = _normalize(query_embeddings)
+
+        with self._lock:
+
+            self._refresh()
+
+            if not self._codes_in_sync():
+                return {"error": "Codes not trained or out of date; call flush()."}
+
+            k = min(top_k, int(self._live.sum()))
+
+            exact_rows, _ = self._exact_top_k(queries, k)
+            adc_rows, _ = self._compressed_top_k(queries, k, rerank=1)
+            reranked_rows, _ = self._compressed_top_k(queries, k)
+
+            def recall(found):
+                return float(np.mean([
+                    len(set(f.tolist()) & set(e.tolist())) / k
+                    for f, e in zip(found, exact_rows)
+                ]))
+
+            return {
+                f"recall@{k}": recall(reranked_rows),
+                f"recall@{k}_no_rerank": recall(adc_rows),
+                **self.memory_per_vector(),
+            }
@@ -0,0 +1,159 @@
+import os
+
+import numpy as np
+
+
+def _cosine_distances(query, vectors) -> list:
+
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, len(query))
+
+    if not len(vectors):
+        return []
+
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+
+    return (1.0 - vectors @ query / np.clip(norms, 1e-12, None)).tolist()
+
+
+class VectorIndex:
+    """
+    Storage/search interface behind VectorStore.
+
+    Results use Chroma's layout so callers don't depend on the backend:
+    search() returns {"ids", "documents", "metadatas", "distances",
+    "embeddings"} with one inner list per query embedding. Distances are
+    cosine distances (1 - cosine similarity) on every backend.
+    """
+
+    max_batch_size = 5000
+
+    def upsert(self, ids: list, documents: list, embeddings, metadatas: list):
+        raise NotImplementedError
+
+    def delete(self, ids: list):
+        raise NotImplementedError
+
+    def get(self, ids: list, include_embeddings: bool = False) -> dict:
+        raise NotImplementedError
+
+    def search(self, query_embeddings, top_k: int = 5, include_embeddings: bool = False) -> dict:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Persist any deferred state (e.g. ANN graphs) after a batch of writes.
+        """
+        return None
+
+
+class ChromaIndex(VectorIndex):
+    """
+    Chroma persistent collection (SQLite + HNSW).
+
+    Distances are cosine distances, like the NumPy backends. Collections
+    created before that use Chroma's default squared L2 space (which
+    can't be changed in place); their distances are recomputed as
+    cosine from the returned embeddings.
+    """
+
+    def __init__(self, path: str = "vector_db", collection_name: str = "pdf_collection"):
+
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(
+            collection_name, metadata={"hnsw:space": "cosine"}
+        )
+        self.space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+
+        self.max_batch_size = self.client.get_max_batch_size()
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+
+        self.collection.upsert(
+            ids=ids,
+            documents=documents,
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            metadatas=metadatas
+        )
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def get(self, ids, include_embeddings=False):
+
+        include = ["documents", "metadatas"]
+
+        if include_embeddings:
+            include.append("embeddings")
+
+        return self.collection.get(ids=ids, include=include)
+
+    def search(self, query_embeddings, top_k=5, include_embeddings=False):
+
+        include = ["documents", "metadatas", "distances"]
+
+        if include_embeddings or self.space != "cosine":
+            include.append("embeddings")
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+
+        results = self.collection.query(
+            query_embeddings=queries.tolist(),
+            n_results=top_k,
+            include=include
+        )
+
+        if self.space != "cosine":
+            keys = [k for k in ("ids", "documents", "metadatas", "embeddings") if results.get(k)]
+
+            for q_idx, query in enumerate(queries):
+
+                distances = _cosine_distances(query, results["embeddings"][q_idx])
+                order = np.argsort(distances, kind="stable")
+
+                # Same hits, re-ranked by the cosine distance
+                results["distances"][q_idx] = [distances[i] for i in order]
+                for key in keys:
+                    results[key][q_idx] = [results[key][q_idx][i] for i in order]
+
+            if not include_embeddings:
+                results["embeddings"] = None
+
+        return results
+
+    def count(self):
+        return self.collection.count()
+
+
+def create_index(
+    backend: str | None = None,
+    path: str = "vector_db",
+    collection_name: str = "pdf_collection"
+) -> VectorIndex:
+    """
+    Build the index backend: "chroma" (default), "numpy" (memory-mapped
+    float16, see tools/numpy_index.py) or "int8" / "ivfpq" (compressed
+    codes over the same files, see tools/quantized_index.py).
+    Defaults to $VECTOR_INDEX_BACKEND.
+    """
+
+    backend = (backend or os.getenv("VECTOR_INDEX_BACKEND") or "chroma").lower()
+
+    if backend == "chroma":
+        return ChromaIndex(path, collection_name)
+
+    if backend == "numpy":
+        from tools.numpy_index import NumpyIndex
+        return NumpyIndex(os.path.join(path, f"{collection_name}.npindex"))
+
+    if backend in ("int8", "ivfpq"):
+        from tools.quantized_index import QuantizedIndex
+        return QuantizedIndex(
+            os.path.join(path, f"{collection_name}.npindex"), mode=backend
+        )
+
+    raise ValueError(f"Unknown vector index backend: {backend}")
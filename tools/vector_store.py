@@ -1,56 +1,456 @@
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+import os
+import json
 import hashlib
+import numpy as np
+
+from tools.embedding_service import get_embedding_service
+from tools.embedding_cache import EmbeddingCache
+from tools.vector_index import create_index
+from tools.bm25_index import BM25Index
 
 
 class VectorStore:
 
-    def __init__(self, collection_name="pdf_collection"):
+    def __init__(
+        self,
+        collection_name="pdf_collection",
+        batch_size: int = 64,
+        embedding_backend: str | None = None,
+        index_backend: str | None = None,
+        retrieval_mode: str | None = None,
+        path: str = "vector_db"
+    ):
+
+        # Pluggable storage/search: "chroma" (default) or "numpy"
+        self.index_backend = (
+            index_backend or os.getenv("VECTOR_INDEX_BACKEND") or "chroma"
+        ).lower()
+        self.index = create_index(
+            self.index_backend, path=path, collection_name=collection_name
+        )
+
+        # One centroid vector per document section (coarse level)
+        self.section_index = create_index(
+            self.index_backend, path=path, collection_name=f"{collection_name}_sections"
+        )
+        self._sections = {}
 
-        self.client = chromadb.PersistentClient(
-                                                    path="vector_db"
-                                                )
+        # Lexical index over the same chunks. "hybrid" scores only BM25
+        # and top-section candidates densely, "sections" only top-section
+        # candidates, "dense" searches the whole vector index
+        self.lexical_index = BM25Index(os.path.join(path, f"{collection_name}.bm25"))
+        self.retrieval_mode = (
+            retrieval_mode or os.getenv("RETRIEVAL_MODE") or "hybrid"
+        ).lower()
 
+        # Shared with InsightClusterer; loaded on first encode
+        self.model = get_embedding_service(backend=embedding_backend)
 
-        self.collection = self.client.get_or_create_collection(collection_name)
+        # Embeddings of text that isn't stored as a document
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(path, "embedding_cache.sqlite")
+        )
 
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        # Embedding batch size; writes are split by the index's own limit
+        self.batch_size = batch_size
+        self.max_write_batch = self.index.max_batch_size
 
     def _generate_id(self, text: str):
         return hashlib.md5(text.encode()).hexdigest()
 
-    def add_documents(self, documents: list, metadata: list):
+    def document_ids(self, metadata: list) -> list:
+        return [
+            f"{meta.get('source', 'unknown')}_{meta.get('chunk_id', i)}"
+            for i, meta in enumerate(metadata)
+        ]
 
-        if not documents:
-            return
+    def embed_documents(self, documents: list):
+        return self.model.encode(documents, batch_size=self.batch_size)
+
+    def embed_texts(self, texts: list) -> np.ndarray:
+        """
+        Embed text kept outside the store (queries, web snippets) through
+        the persistent content-hash cache; only unseen texts are encoded.
+        """
+
+        keys = [
+            self._generate_id(f"{self.model.fingerprint}\n{text}")
+            for text in texts
+        ]
+
+        cached = self.embedding_cache.get_many(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+
+        if missing:
+            vectors = self.model.encode([texts[i] for i in missing])
+
+            self.embedding_cache.put_many([keys[i] for i in missing], vectors)
+
+            for i, vector in zip(missing, vectors):
+                cached[keys[i]] = vector
+
+        return np.asarray([cached[key] for key in keys], dtype=np.float32)
+
+    def upsert(self, ids: list, documents: list, embeddings, metadata: list):
+        """
+        Write pre-embedded documents, split to the index's max batch size.
+        """
+
+        for i in range(0, len(ids), self.max_write_batch):
+            j = i + self.max_write_batch
+
+            self.index.upsert(
+                ids[i:j], documents[i:j], embeddings[i:j], metadata[i:j]
+            )
+
+        self.lexical_index.add(ids, documents)
+
+        self._accumulate_sections(ids, embeddings, metadata)
+
+    # -------------------------------------------------
+    # SECTIONS
+    # -------------------------------------------------
+
+    def _accumulate_sections(self, ids: list, embeddings, metadata: list):
+
+        for doc_id, vector, meta in zip(ids, embeddings, metadata):
 
-        embeddings = self.model.encode(documents).tolist()
+            if "section_id" not in meta:
+                continue
 
-        ids = [
-                    f"{metadata[i].get('source','unknown')}_{metadata[i].get('chunk_id', i)}"
-                    for i in range(len(documents))
-                ]
+            vector = np.asarray(vector, dtype=np.float32)
 
+            entry = self._sections.setdefault(
+                meta.get("source", "unknown"), {}
+            ).setdefault(
+                meta["section_id"],
+                {"title": meta.get("section", ""), "sum": 0.0, "ids": []}
+            )
 
-        self.collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadata,
-            ids=ids
+            entry["sum"] = entry["sum"] + vector / max(np.linalg.norm(vector), 1e-12)
+            entry["ids"].append(doc_id)
+
+    def write_sections(self, source: str) -> list:
+        """
+        Store the centroid of each section of `source` written so far.
+        Call once the file's last chunk is in; returns the section ids.
+        """
+
+        sections = self._sections.pop(source, {})
+
+        if not sections:
+            return []
+
+        ids = [f"{source}#section_{k}" for k in sections]
+
+        self.section_index.upsert(
+            ids,
+            [entry["title"] or "(untitled)" for entry in sections.values()],
+            np.asarray([
+                entry["sum"] / max(np.linalg.norm(entry["sum"]), 1e-12)
+                for entry in sections.values()
+            ], dtype=np.float32),
+            [
+                {
+                    "source": source,
+                    "section": entry["title"] or "",
+                    "section_id": k,
+                    "chunk_ids": json.dumps(entry["ids"]),
+                }
+                for k, entry in sections.items()
+            ]
         )
 
+        return ids
+
+    def add_documents(self, documents: list, metadata: list, ids: list | None = None):
+        """
+        Embed and upsert documents. Returns the store ids written.
+
+        Ids are deterministic (<source>_<chunk_id> unless given), so
+        re-adding a re-ingested file overwrites its chunks instead of
+        duplicating them. Embedding runs in fixed-size batches rather
+        than on the whole list.
+        """
+
+        if not documents:
+            return []
+
+        ids = ids or self.document_ids(metadata)
+
+        for i in range(0, len(documents), self.batch_size):
+            j = i + self.batch_size
+
+            self.upsert(
+                ids[i:j],
+                documents[i:j],
+                self.embed_documents(documents[i:j]),
+                metadata[i:j]
+            )
+
+        for source in {meta.get("source", "unknown") for meta in metadata}:
+            self.write_sections(source)
+
+        return ids
+
+    def add_web_page(self, url: str, title: str, chunks: list, content_hash: str) -> list:
+        """
+        Store a fetched page's chunks next to the PDF chunks. Returns the
+        ids written, or [] when the same content is already stored.
+        """
+
+        if not chunks:
+            return []
+
+        # Chunk ids are the store ids: unique across pages, like the
+        # file-qualified ids of PDF chunks
+        ids = [f"{url}_web_{i}" for i in range(len(chunks))]
+
+        previous = self.index.get(ids[:1])["metadatas"]
+        previous = previous[0] if previous else {}
+
+        # Older versions stored bare "web_<i>" chunk ids: rewrite those
+        if (
+            previous.get("content_hash") == content_hash
+            and previous.get("chunk_id") == ids[0]
+        ):
+            return []
+
+        ids = self.add_documents(chunks, [
+            {
+                "source": url,
+                "chunk_id": doc_id,
+                "title": title or "",
+                "source_type": "web",
+                "content_hash": content_hash,
+                "chunk_count": len(chunks),
+            }
+            for doc_id in ids
+        ], ids=ids)
+
+        # The page got shorter: drop its trailing chunks
+        self.delete_documents([
+            f"{url}_web_{i}"
+            for i in range(len(chunks), previous.get("chunk_count", 0))
+        ])
+
+        return ids
+
+    def delete_documents(self, ids: list):
+
+        if not ids:
+            return
+
+        # Manifests record chunk and section ids together
+        self.index.delete(ids)
+        self.section_index.delete(ids)
+        self.lexical_index.delete(ids)
+
+    def flush(self):
+        """
+        Persist deferred index state once a batch of ingestion is done.
+        """
+        self.index.flush()
+        self.section_index.flush()
+        self.lexical_index.flush()
+
 
     def query(self, query_text: str, top_k: int = 5):
+        """
+        Return ids, documents, metadatas, distances and the stored
+        embeddings of the top_k chunks, so callers never re-encode them.
+        """
 
         if not query_text:
             return {}
 
-        embedding = self.model.encode([query_text]).tolist()
+        embedding = self.embed_texts([query_text])
+
+        return self.index.search(embedding, top_k, include_embeddings=True)
 
-        results = self.collection.query(
-            query_embeddings=embedding,
-            n_results=top_k
+    def _section_candidates(self, queries: np.ndarray, top_sections: int) -> list:
+        """
+        Per query: chunk ids of the top_sections sections nearest to it.
+        """
+
+        if not self.section_index.count():
+            return [[] for _ in queries]
+
+        sections = self.section_index.search(queries, top_sections)
+
+        return [
+            [
+                doc_id
+                for meta in metadatas
+                for doc_id in json.loads((meta or {}).get("chunk_ids", "[]"))
+            ]
+            for metadatas in sections["metadatas"]
+        ]
+
+    def hybrid_search(
+        self,
+        query_texts: list,
+        query_embeddings,
+        top_k: int = 5,
+        candidates: int = 200,
+        rrf_k: int = 60,
+        lexical: bool = True,
+        top_sections: int = 5
+    ) -> dict:
+        """
+        Coarse-to-fine retrieval. Candidates per query come from BM25
+        (up to `candidates` chunks, when lexical) and from the chunks of
+        the `top_sections` nearest section centroids (when top_sections).
+        Only candidates are scored densely (their stored vectors are
+        fetched in one get call); the BM25 and dense rankings are fused
+        with reciprocal rank fusion. Queries with fewer than top_k
+        candidates fall back to dense search. Results use the same
+        layout as index.search.
+        """
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries / np.clip(
+            np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None
         )
 
+        lexical_hits = (
+            [ids for ids, _ in self.lexical_index.search_many(query_texts, candidates)]
+            if lexical else [[] for _ in query_texts]
+        )
+        section_hits = (
+            self._section_candidates(queries, top_sections)
+            if top_sections else [[] for _ in query_texts]
+        )
+
+        candidate_ids = list(dict.fromkeys(
+            doc_id
+            for hits in (lexical_hits, section_hits)
+            for ids in hits
+            for doc_id in ids
+        ))
+
+        stored = (
+            self.index.get(candidate_ids, include_embeddings=True)
+            if candidate_ids else {"ids": []}
+        )
+
+        position = {doc_id: i for i, doc_id in enumerate(stored["ids"])}
+
+        if position:
+            vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+            vectors = vectors / np.clip(
+                np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None
+            )
+
+        results = {
+            key: [None] * len(queries)
+            for key in ("ids", "documents", "metadatas", "distances", "embeddings")
+        }
+        fallback = []
+
+        for q_idx in range(len(queries)):
+
+            lexical_rows = [
+                position[doc_id] for doc_id in lexical_hits[q_idx] if doc_id in position
+            ]
+            rows = list(dict.fromkeys(lexical_rows + [
+                position[doc_id] for doc_id in section_hits[q_idx] if doc_id in position
+            ]))
+
+            if len(rows) < top_k:
+                fallback.append(q_idx)
+                continue
+
+            dense = vectors[rows] @ queries[q_idx]
+
+            dense_rank = np.empty(len(rows))
+            dense_rank[np.argsort(-dense)] = np.arange(len(rows))
+
+            fused = 1.0 / (rrf_k + 1 + dense_rank)
+
+            # Lexical rank is the BM25 candidate order; section-only
+            # candidates get no lexical contribution
+            fused[:len(lexical_rows)] += 1.0 / (rrf_k + 1 + np.arange(len(lexical_rows)))
+
+            best = np.argsort(-fused)[:top_k]
+            picked = [rows[i] for i in best]
+
+            results["ids"][q_idx] = [stored["ids"][r] for r in picked]
+            results["documents"][q_idx] = [stored["documents"][r] for r in picked]
+            results["metadatas"][q_idx] = [stored["metadatas"][r] for r in picked]
+            results["distances"][q_idx] = [float(1.0 - dense[i]) for i in best]
+            results["embeddings"][q_idx] = np.asarray(stored["embeddings"])[picked]
+
+        if fallback:
+            dense_results = self.index.search(
+                queries[fallback], top_k, include_embeddings=True
+            )
+
+            for i, q_idx in enumerate(fallback):
+                for key in results:
+                    results[key][q_idx] = dense_results[key][i]
+
         return results
+
+    def query_many(self, queries: list, top_k: int = 5, mode: str | None = None) -> dict:
+        """
+        Retrieve for several queries with one encode call and one index
+        search (dense) or candidate scoring (hybrid / sections, see
+        hybrid_search), then merge hits
+        by chunk id (best distance wins).
+
+        Returns flat lists ordered by distance: ids, documents, metadatas,
+        distances, embeddings and matched_queries (indices into "queries",
+        the de-duplicated query list, that retrieved each chunk).
+        """
+
+        queries = [q for q in dict.fromkeys(queries) if q]
+
+        if not queries:
+            return {}
+
+        embeddings = self.embed_texts(queries)
+
+        mode = mode or self.retrieval_mode
+
+        if mode in ("hybrid", "sections"):
+            results = self.hybrid_search(
+                queries, embeddings, top_k, lexical=mode == "hybrid"
+            )
+        else:
+            results = self.index.search(embeddings, top_k, include_embeddings=True)
+
+        merged = {}
+
+        for q_idx in range(len(queries)):
+            for rank, doc_id in enumerate(results["ids"][q_idx]):
+
+                distance = results["distances"][q_idx][rank]
+                hit = merged.get(doc_id)
+
+                if hit is None:
+                    merged[doc_id] = hit = {
+                        "document": results["documents"][q_idx][rank],
+                        "metadata": results["metadatas"][q_idx][rank] or {},
+                        "embedding": results["embeddings"][q_idx][rank],
+                        "distance": distance,
+                        "matched_queries": [],
+                    }
+
+                hit["distance"] = min(hit["distance"], distance)
+                hit["matched_queries"].append(q_idx)
+
+        ranked = sorted(merged.items(), key=lambda item: item[1]["distance"])
+
+        return {
+            "queries": queries,
+            "ids": [doc_id for doc_id, _ in ranked],
+            "documents": [hit["document"] for _, hit in ranked],
+            "metadatas": [hit["metadata"] for _, hit in ranked],
+            "distances": [hit["distance"] for _, hit in ranked],
+            "embeddings": np.asarray(
+                [hit["embedding"] for _, hit in ranked], dtype=np.float32
+            ),
+            "matched_queries": [hit["matched_queries"] for _, hit in ranked],
+        }
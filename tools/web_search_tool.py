@@ -1,40 +1,354 @@
 from crewai_tools import SerperDevTool
 from typing import List, Dict
+import asyncio
+import os
+import re
+import threading
+import time
+import unicodedata
+
+import httpx
+
+from tools.disk_cache import DiskCache
 
 from dotenv import load_dotenv
 load_dotenv()
 
-class WebSearchToolWrapper:
 
-    def __init__(self):
-        self.tool = SerperDevTool()
+_PUNCT_RE = re.compile(r"[^\w\s]")
 
-    def search(self, query: str) -> List[Dict]:
 
-        if not query:
-            return []
+def normalize_query(query: str) -> str:
+    """
+    Cache key form of a query: Unicode-normalized, case-folded,
+    punctuation dropped, whitespace collapsed.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(_PUNCT_RE.sub(" ", query).split())
 
-        try:
-            results = self.tool.run(query)
 
-            #  Handle string output (very common)
-            if isinstance(results, str):
-                import json
-                try:
-                    results = json.loads(results)
-                except:
-                    return [{"error": "Serper returned string output"}]
+# -------------------------------------------------
+# RESULT CACHE
+# -------------------------------------------------
+
+class SearchCache(DiskCache):
+    """
+    Per-query search results on disk, keyed by endpoint, result count
+    and normalized query. TTL and entry limit default to
+    $SEARCH_CACHE_TTL (seconds) and $SEARCH_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(
+        self,
+        path: str = "vector_db/search_cache.sqlite",
+        ttl: float | None = None,
+        max_entries: int | None = None
+    ):
+        super().__init__(
+            path,
+            ttl=ttl if ttl is not None else float(os.getenv("SEARCH_CACHE_TTL", 86400)),
+            max_entries=(
+                max_entries if max_entries is not None
+                else int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 10000))
+            )
+        )
+
+    @staticmethod
+    def key(base_url: str, num_results: int, query: str) -> str:
+        return f"{base_url}|{num_results}|{normalize_query(query)}"
+
+
+# -------------------------------------------------
+# RATE LIMITING
+# -------------------------------------------------
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` requests per second on average, bursts of
+    up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+
+        async with self._lock:
+
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# -------------------------------------------------
+# EVENT LOOP
+# -------------------------------------------------
+
+class BackgroundLoop:
+    """
+    A private event loop on a daemon thread. Async HTTP clients bound to
+    it keep their connection pools across sync calls, and run() works
+    whether or not the caller is itself inside a running loop.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def run(self, coroutine):
+
+        with self._lock:
+
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name=self.name, daemon=True
+                ).start()
+
+            loop = self._loop
+
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def stop(self):
+
+        with self._lock:
+
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+
+
+# -------------------------------------------------
+# ASYNC CLIENT
+# -------------------------------------------------
+
+class AsyncSearchClient:
+    """
+    Concurrent Serper search over one pooled keep-alive HTTP client.
+
+    The client and its connection pool live on a private event loop in a
+    background thread, so sync callers (inside or outside a running
+    loop) share it across calls. Every request waits on a token bucket
+    and has its own timeout; results of all queries are merged by URL.
+
+    base_url (or $SERPER_BASE_URL) points the client at any Serper-
+    compatible server, e.g. a local stand-in for benchmarks. With a
+    cache, repeated queries are answered from disk without a request.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        num_results: int = 10,
+        rate: float = 5.0,
+        burst: int = 10,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        cache: SearchCache | None = None
+    ):
+        self.api_key = api_key or os.getenv("SERPER_API_KEY")
+        self.base_url = (
+            base_url or os.getenv("SERPER_BASE_URL", "https://google.serper.dev")
+        ).rstrip("/")
+        self.num_results = num_results
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache = cache
+
+        self._loop = BackgroundLoop("web-search")
+        self._client = None
+        self._bucket = None
+
+    # -------------------------------------------------
+    # REQUESTS (run on the client's loop)
+    # -------------------------------------------------
+
+    def _get_client(self):
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "X-API-KEY": self.api_key or "",
+                    "Content-Type": "application/json",
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=self.timeout
+            )
+            self._bucket = TokenBucket(self.rate, self.burst)
+
+        return self._client
+
+    async def _search_one(self, query: str) -> List[Dict]:
+
+        client = self._get_client()
+
+        try:
+            await self._bucket.acquire()
 
-            structured_results = []
+            response = await client.post(
+                "/search", json={"q": query, "num": self.num_results}
+            )
+            response.raise_for_status()
 
-            for item in results.get("organic", []):
-                structured_results.append({
+            return [
+                {
                     "title": item.get("title"),
                     "url": item.get("link"),
                     "snippet": item.get("snippet"),
-                })
+                    "position": item.get("position", rank + 1),
+                }
+                for rank, item in enumerate(response.json().get("organic", []))
+            ]
 
-            return structured_results
+        except Exception as e:
+            return [{"error": f"{type(e).__name__}: {e}", "query": query}]
+
+    async def _search_many(self, queries: List[str]) -> List[List[Dict]]:
+        return await asyncio.gather(*(self._search_one(q) for q in queries))
+
+    async def _close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -------------------------------------------------
+    # PUBLIC API
+    # -------------------------------------------------
+
+    def search_many(self, queries: List[str]) -> List[Dict]:
+        """
+        All queries concurrently; one entry per distinct URL with
+        "queries" (every query that found it) and its best "position".
+        Failed queries come back as {"error", "query"} entries.
+        """
+
+        queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+
+        if not queries:
+            return []
+
+        per_query = {}
+
+        if self.cache is not None:
+            keys = {
+                q: self.cache.key(self.base_url, self.num_results, q) for q in queries
+            }
+            cached = self.cache.get_many(list(keys.values()))
+            per_query = {q: cached[k] for q, k in keys.items() if k in cached}
+
+        missing = [q for q in queries if q not in per_query]
+
+        if missing:
+
+            if not self.api_key and self.base_url == "https://google.serper.dev":
+                return [{"error": "SERPER_API_KEY is not set"}]
+
+            for query, results in zip(missing, self._loop.run(self._search_many(missing))):
+
+                per_query[query] = results
+
+                # Failures are retried next time, not cached
+                if self.cache is not None and not any("error" in r for r in results):
+                    self.cache.put(
+                        self.cache.key(self.base_url, self.num_results, query), results
+                    )
+
+        merged, errors = {}, []
+
+        for query in queries:
+
+            results = per_query[query]
+
+            for item in results:
+
+                if "error" in item:
+                    errors.append(item)
+                    continue
+
+                url = item.get("url")
+                if not url:
+                    continue
+
+                entry = merged.get(url)
+
+                if entry is None:
+                    merged[url] = {**item, "queries": [query]}
+                    continue
+
+                entry["queries"].append(query)
+                entry["position"] = min(entry["position"], item["position"])
+
+                # Keep the longest snippet seen for the page
+                if len(item.get("snippet") or "") > len(entry.get("snippet") or ""):
+                    entry["snippet"] = item["snippet"]
+
+        # Pages found by more queries first, then by rank
+        ranked = sorted(
+            merged.values(), key=lambda e: (-len(e["queries"]), e["position"])
+        )
+
+        return ranked + errors
+
+    def close(self):
+
+        if not self._loop.running:
+            return
+
+        self._loop.run(self._close())
+        self._loop.stop()
+
+
+# -------------------------------------------------
+# CREW TOOL WRAPPER
+# -------------------------------------------------
+
+class WebSearchToolWrapper:
+
+    def __init__(self, client: AsyncSearchClient | None = None):
+        # Agent-facing tool; deterministic searches go through the client
+        self.tool = SerperDevTool()
+        self.client = client or AsyncSearchClient(cache=SearchCache())
+
+    def search(self, query: str) -> List[Dict]:
+
+        if not query:
+            return []
+
+        return self.search_many([query])
+
+    def search_many(self, queries: List[str]) -> List[Dict]:
+
+        try:
+            return self.client.search_many(queries)
 
         except Exception as e:
             return [{"error": str(e)}]
+
+    def cache_stats(self) -> dict | None:
+        cache = self.client.cache
+        return cache.stats() if cache is not None else None